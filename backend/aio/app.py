@@ -0,0 +1,83 @@
+"""
+asyncio variant of the EaseStay API on Quart + Motor
+Run from the backend directory: hypercorn "aio.app:create_app()" --bind 0.0.0.0:5000
+"""
+from quart import Quart, jsonify
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from quart_cors import cors
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import Config
+from services.payments import build_payment_pool
+from services.tokens import RefreshTokenStore, revocations
+from aio.auth import init_auth_routes
+from aio.rooms import init_rooms_routes
+from aio.bookings import init_bookings_routes
+from aio.feedback import init_feedback_routes
+from aio.properties import init_properties
+
+def create_app(config=Config):
+    """Async application factory, serving the same /api contracts as app.create_app"""
+    app = Quart(__name__)
+    app.config.from_object(config)
+    app = cors(app, allow_origin=config.CORS_ORIGINS, allow_credentials=True)
+
+    # Initialize MongoDB (Motor) with the same pool settings as the sync app
+    client = AsyncIOMotorClient(config.MONGO_URI, **config.mongo_client_options())
+    db = client.get_default_database()
+
+    # Refresh tokens, the revocation list, the property registry and payment enqueueing are the sync app's,
+    # on a small pymongo pool; they are called in worker threads
+    sync_client = MongoClient(config.MONGO_URI, **dict(config.mongo_client_options(), maxPoolSize=10, minPoolSize=0))
+    sync_db = sync_client.get_default_database()
+    revocations.bind(sync_db.token_revocations, config.TOKEN_REVOCATION_SYNC_SECONDS)
+    app.extensions['refresh_tokens'] = RefreshTokenStore(sync_db.refresh_tokens)
+
+    # POST /payment queues intents through the sync pool; payment_worker.py charges them
+    app.extensions['payments'] = build_payment_pool(sync_db, config)
+
+    # Each request's property (X-Hotel-Id), as in the sync app
+    init_properties(app, sync_db, config)
+
+    # Initialize and register routes
+    for init_routes in (init_auth_routes, init_rooms_routes, init_bookings_routes, init_feedback_routes):
+        app.register_blueprint(init_routes(db, app), url_prefix='/api')
+
+    # Health check endpoint
+    @app.route('/api/health', methods=['GET'])
+    async def health_check():
+        try:
+            await db.command('ping')
+            database = 'connected'
+        except Exception:
+            database = 'disconnected'
+
+        return jsonify({
+            'status': 'healthy',
+            'message': 'EaseStay API is running (async)',
+            'database': database
+        }), 200
+
+    # Error handlers
+    @app.errorhandler(404)
+    async def not_found(error):
+        return jsonify({'error': 'Endpoint not found'}), 404
+
+    @app.errorhandler(500)
+    async def internal_error(error):
+        return jsonify({'error': 'Internal server error'}), 500
+
+    @app.before_serving
+    async def ensure_indexes():
+        # Registration relies on the unique email index instead of a lookup first
+        try:
+            await db.users.create_index('email', unique=True)
+        except OperationFailure as e:
+            app.logger.warning('Could not create unique email index: %s', e)
+
+    @app.after_serving
+    async def close_client():
+        client.close()
+        sync_client.close()
+
+    return app
@@ -0,0 +1,229 @@
+import asyncio
+import jwt
+from functools import wraps
+from quart import Blueprint, request, jsonify
+from pymongo.errors import DuplicateKeyError
+from routes.auth import TokenRevokedError, decode_token, generate_token
+from aio.models import AsyncUser
+from services.login_throttle import LoginThrottle, MemoryThrottleStore
+from services.tokens import revocations
+from config import Config
+
+def token_required(f):
+    """Async decorator to require authentication token"""
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return jsonify({'error': 'Token is missing'}), 401
+        
+        try:
+            token = auth_header.split(' ')[1]  # Bearer <token>
+        except IndexError:
+            return jsonify({'error': 'Invalid token format'}), 401
+        
+        # Pull new revocations in a thread so decode_token never queries on the loop
+        if revocations.stale():
+            await asyncio.to_thread(revocations.sync)
+        
+        try:
+            current_user = decode_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired'}), 401
+        except TokenRevokedError:
+            return jsonify({'error': 'Token has been revoked'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token'}), 401
+        
+        return await f(current_user, *args, **kwargs)
+    
+    return decorated
+
+def admin_required(f):
+    """Async decorator to require admin role"""
+    @wraps(f)
+    @token_required
+    async def decorated(current_user, *args, **kwargs):
+        if current_user.get('role') != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
+        return await f(current_user, *args, **kwargs)
+    
+    return decorated
+
+def init_auth_routes(db, app):
+    """Initialize async auth routes with database connection"""
+    auth_bp = Blueprint('auth', __name__)
+    user_model = AsyncUser(db.users)
+    
+    # Same policy as the sync app; the store is in-memory so checks never block the loop
+    login_throttle = LoginThrottle(
+        MemoryThrottleStore(),
+        window=Config.LOGIN_THROTTLE_WINDOW_SECONDS,
+        max_per_email=Config.LOGIN_MAX_FAILURES_PER_EMAIL,
+        max_per_ip=Config.LOGIN_MAX_FAILURES_PER_IP,
+        lockout_base=Config.LOGIN_LOCKOUT_BASE_SECONDS,
+        lockout_max=Config.LOGIN_LOCKOUT_MAX_SECONDS,
+        lockout_reset=Config.LOGIN_LOCKOUT_RESET_SECONDS
+    )
+    
+    # create_app binds the revocation list; both stores are sync, so calls go through a thread
+    refresh_tokens = app.extensions['refresh_tokens']
+    # A revocation only has to outlive the access tokens it cancels
+    revocation_ttl = Config.JWT_ACCESS_TOKEN_EXPIRES.total_seconds() + 60
+    
+    async def issue_tokens(user, family=None):
+        """Access token plus a new refresh token (in the given family, or a new session)"""
+        user_id = str(user['_id'])
+        refresh_token, family = await asyncio.to_thread(
+            refresh_tokens.issue, user_id, Config.JWT_REFRESH_TOKEN_EXPIRES, family
+        )
+        token = generate_token(
+            user_id, user.get('role', 'guest'), user['email'],
+            sid=family, generation=user.get('token_generation', 0)
+        )
+        return {
+            'token': token,
+            'refresh_token': refresh_token,
+            'expires_in': int(Config.JWT_ACCESS_TOKEN_EXPIRES.total_seconds())
+        }
+    
+    @auth_bp.route('/register', methods=['POST'])
+    async def register():
+        try:
+            data = await request.get_json()
+            
+            # Validate required fields
+            required_fields = ['email', 'password', 'firstName', 'lastName']
+            for field in required_fields:
+                if field not in data:
+                    return jsonify({'error': f'{field} is required'}), 400
+            
+            # The unique email index rejects duplicates, even concurrent ones
+            try:
+                user = await user_model.create_user({
+                    'email': data['email'],
+                    'password': data['password'],
+                    'firstName': data['firstName'],
+                    'lastName': data['lastName'],
+                    'phone': data.get('phone', ''),
+                    'role': data.get('role', 'guest')
+                })
+            except DuplicateKeyError:
+                return jsonify({'error': 'User already exists'}), 400
+            
+            tokens = await issue_tokens(user)
+            
+            return jsonify({
+                'message': 'User registered successfully',
+                **tokens,
+                'user': {
+                    'id': str(user['_id']),
+                    'email': user['email'],
+                    'firstName': user['firstName'],
+                    'lastName': user['lastName'],
+                    'role': user['role']
+                }
+            }), 201
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @auth_bp.route('/login', methods=['POST'])
+    async def login():
+        try:
+            data = await request.get_json()
+            
+            if not data or not data.get('email') or not data.get('password'):
+                return jsonify({'error': 'Email and password are required'}), 400
+            
+            # Reject throttled attempts before touching the database or hashing
+            client_ip = request.access_route[0] if Config.TRUST_PROXY_HEADERS and request.access_route else request.remote_addr
+            retry_after = login_throttle.check(data['email'], client_ip)
+            if retry_after:
+                return jsonify({'error': 'Too many failed login attempts. Please try again later'}), 429, {'Retry-After': str(retry_after)}
+            
+            user = await user_model.find_by_email(data['email'])
+            if not user or not await user_model.verify_password(user, data['password']):
+                login_throttle.failure(data['email'], client_ip)
+                return jsonify({'error': 'Invalid credentials'}), 401
+            
+            login_throttle.success(data['email'])
+            
+            # Check role if specified
+            if data.get('role') and user.get('role') != data['role']:
+                return jsonify({'error': 'Invalid role'}), 403
+            
+            tokens = await issue_tokens(user)
+            
+            return jsonify({
+                'message': 'Login successful',
+                **tokens,
+                'user': {
+                    'id': str(user['_id']),
+                    'email': user['email'],
+                    'firstName': user.get('firstName', ''),
+                    'lastName': user.get('lastName', ''),
+                    'role': user.get('role', 'guest')
+                }
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @auth_bp.route('/token/refresh', methods=['POST'])
+    async def refresh():
+        """Swap a refresh token for a new access token and a new refresh token"""
+        try:
+            data = await request.get_json() or {}
+            if not data.get('refresh_token'):
+                return jsonify({'error': 'refresh_token is required'}), 400
+            
+            doc, family = await asyncio.to_thread(refresh_tokens.consume, data['refresh_token'])
+            if not doc:
+                if family:
+                    # A used token came back: assume it was stolen and end the session
+                    await asyncio.to_thread(refresh_tokens.revoke_family, family)
+                    await asyncio.to_thread(revocations.revoke_session, family, revocation_ttl)
+                return jsonify({'error': 'Invalid refresh token'}), 401
+            
+            user = await user_model.find_by_id(doc['user_id'])
+            if not user:
+                return jsonify({'error': 'Invalid refresh token'}), 401
+            
+            return jsonify(await issue_tokens(user, family)), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @auth_bp.route('/logout', methods=['POST'])
+    @token_required
+    async def logout(current_user):
+        """End this session: its refresh tokens and access tokens stop working"""
+        try:
+            if current_user.get('sid'):
+                await asyncio.to_thread(refresh_tokens.revoke_family, current_user['sid'])
+                await asyncio.to_thread(revocations.revoke_session, current_user['sid'], revocation_ttl)
+            
+            return jsonify({'message': 'Logged out successfully'}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @auth_bp.route('/logout/all', methods=['POST'])
+    @token_required
+    async def logout_all(current_user):
+        """End every session of the current user"""
+        try:
+            generation = await user_model.bump_token_generation(current_user['user_id'])
+            if generation is None:
+                return jsonify({'error': 'User not found'}), 404
+            
+            await asyncio.to_thread(refresh_tokens.revoke_user, current_user['user_id'])
+            await asyncio.to_thread(revocations.revoke_user, current_user['user_id'], generation, revocation_ttl)
+            
+            return jsonify({'message': 'Logged out of all sessions'}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return auth_bp
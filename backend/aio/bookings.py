@@ -0,0 +1,368 @@
+import asyncio
+import json
+import time
+import jwt
+from bson import ObjectId
+from quart import Blueprint, request, jsonify, make_response
+from aio.auth import token_required, admin_required
+from aio.models import AsyncBooking, AsyncRoom, AsyncUser
+from aio.properties import current_hotel_id
+from routes.auth import TokenRevokedError, decode_token
+from routes.payments import STREAM_MAX_SECONDS, STREAM_POLL_INTERVAL
+from services.pricing import PricingEngine, occupancy_by_night
+from services.allocator import best_fit
+from services.payments import TERMINAL_STATUSES, check_payment, serialize_intent
+from services.properties import PerHotel
+from services.read_routing import for_critical
+from services.tokens import revocations
+from config import Config
+from datetime import datetime, date, timedelta
+
+def _shift(day, days):
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+def init_bookings_routes(db, app):
+    """Initialize async bookings and payment routes with database connection"""
+    bookings_bp = Blueprint('bookings', __name__)
+    booking_model = PerHotel(AsyncBooking(db.bookings), current_hotel_id)
+    room_model = PerHotel(AsyncRoom(db.rooms), current_hotel_id)
+    user_model = AsyncUser(db.users)
+    payment_intents = for_critical(db.payment_intents)
+    # The sync payment pool (no worker threads here), created by create_app
+    payments = app.extensions['payments']
+    pricing_engine = PricingEngine.from_config(Config)
+    horizon = Config.ALLOCATOR_GAP_HORIZON_DAYS
+    
+    async def allocate(room_type, checkin_date, checkout_date):
+        """Best-fit room of a type, same policy as services.allocator.RoomAllocator"""
+        rooms = await room_model.get_available_rooms_of_type(room_type, {'roomNumber': 1})
+        room_ids = [str(room['_id']) for room in sorted(rooms, key=lambda r: r.get('roomNumber', ''))]
+        if not room_ids:
+            return None
+        
+        bookings = await booking_model.get_bookings_in_range(
+            _shift(checkin_date, -horizon), _shift(checkout_date, horizon), room_ids=room_ids
+        )
+        chosen = best_fit(room_ids, bookings, checkin_date, checkout_date, horizon)
+        return chosen[0] if chosen else None
+    
+    @bookings_bp.route('/book', methods=['POST'])
+    @token_required
+    async def create_booking(current_user):
+        try:
+            data = await request.get_json()
+            
+            # Validate required fields
+            required_fields = ['checkin_date', 'checkout_date', 'guests']
+            for field in required_fields:
+                if field not in data:
+                    return jsonify({'error': f'{field} is required'}), 400
+            
+            if not data.get('room_id') and not data.get('room_type'):
+                return jsonify({'error': 'room_id or room_type is required'}), 400
+            
+            if int(data.get('rooms', 1)) != 1:
+                return jsonify({'error': 'Use /api/book/group to book more than one room'}), 400
+            
+            room_id = data.get('room_id')
+            checkin_date = data['checkin_date']
+            checkout_date = data['checkout_date']
+            
+            # Validate dates
+            checkin = datetime.strptime(checkin_date, '%Y-%m-%d')
+            checkout = datetime.strptime(checkout_date, '%Y-%m-%d')
+            
+            if checkin >= checkout:
+                return jsonify({'error': 'Check-out date must be after check-in date'}), 400
+            
+            if checkin < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
+                return jsonify({'error': 'Check-in date cannot be in the past'}), 400
+            
+            if not room_id:
+                room_id = await allocate(data['room_type'], checkin_date, checkout_date)
+                if not room_id:
+                    return jsonify({'error': f"No {data['room_type']} rooms available for these dates"}), 400
+            
+            # Room lookup, overlap check and pricing inputs are independent
+            room, is_free, total_rooms, bookings = await asyncio.gather(
+                room_model.get_room_by_id(room_id),
+                booking_model.check_room_availability(room_id, checkin_date, checkout_date),
+                room_model.count_rooms(),
+                booking_model.get_bookings_in_range(checkin_date, checkout_date, stale_ok=True)
+            )
+            
+            if not room:
+                return jsonify({'error': 'Room not found'}), 404
+            if room.get('status') != 'available':
+                return jsonify({'error': 'Room is not available'}), 400
+            if not is_free:
+                return jsonify({'error': 'Room is already booked for these dates'}), 400
+            
+            # Calculate total price from the per-night rates
+            price_per_night = room.get('price', 0)
+            occupancy = occupancy_by_night(bookings, checkin_date, checkout_date, total_rooms)
+            nightly_rates, totals = pricing_engine.quote([price_per_night], checkin_date, checkout_date, occupancy)
+            
+            booking = await booking_model.create_booking({
+                'user_id': current_user['user_id'],
+                'room_id': room_id,
+                'room_number': room.get('roomNumber', ''),
+                'room_name': room.get('name', ''),
+                'room_type': room.get('type', ''),
+                'checkin_date': checkin_date,
+                'checkout_date': checkout_date,
+                'guests': data['guests'],
+                'rooms': 1,
+                'price_per_night': price_per_night,
+                'nightly_rates': nightly_rates[0].tolist(),
+                'total_price': totals[0].item(),
+                'status': 'pending',
+                'payment_status': 'pending'
+            })
+            booking['_id'] = str(booking['_id'])
+            
+            return jsonify({
+                'message': 'Booking created successfully',
+                'booking': booking
+            }), 201
+            
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @bookings_bp.route('/bookings', methods=['GET'])
+    @token_required
+    async def get_user_bookings(current_user):
+        try:
+            include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+            bookings = await booking_model.get_user_bookings(current_user['user_id'], include_archived)
+            
+            rooms = await room_model.get_rooms_by_ids(
+                {str(b.get('room_id')) for b in bookings}, {'name': 1, 'image': 1, 'roomNumber': 1}
+            )
+            
+            for booking in bookings:
+                booking['_id'] = str(booking['_id'])
+                booking['room_id'] = str(booking.get('room_id'))
+                booking['user_id'] = str(booking.get('user_id'))
+                
+                room = rooms.get(booking['room_id'])
+                if room:
+                    booking['room_details'] = {
+                        'name': room.get('name'),
+                        'image': room.get('image'),
+                        'roomNumber': room.get('roomNumber')
+                    }
+            
+            return jsonify({
+                'bookings': bookings,
+                'count': len(bookings)
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @bookings_bp.route('/bookings/all', methods=['GET'])
+    @admin_required
+    async def get_all_bookings(current_user):
+        try:
+            include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+            bookings = await booking_model.get_all_bookings(include_archived)
+            
+            # User and room joins are independent: one batched query each, issued together
+            users, rooms = await asyncio.gather(
+                user_model.find_by_ids(
+                    {str(b.get('user_id')) for b in bookings},
+                    {'email': 1, 'firstName': 1, 'lastName': 1, 'phone': 1}
+                ),
+                room_model.get_rooms_by_ids(
+                    {str(b.get('room_id')) for b in bookings},
+                    {'name': 1, 'image': 1, 'roomNumber': 1}
+                )
+            )
+            
+            for booking in bookings:
+                booking['_id'] = str(booking['_id'])
+                booking['room_id'] = str(booking.get('room_id'))
+                
+                if 'user_id' in booking:
+                    booking['user_id'] = str(booking['user_id'])
+                    user = users.get(booking['user_id'])
+                    if user:
+                        booking['user_details'] = {
+                            'email': user.get('email', ''),
+                            'firstName': user.get('firstName', ''),
+                            'lastName': user.get('lastName', ''),
+                            'phone': user.get('phone', '')
+                        }
+                
+                room = rooms.get(booking['room_id'])
+                if room:
+                    booking['room_details'] = {
+                        'name': room.get('name'),
+                        'image': room.get('image'),
+                        'roomNumber': room.get('roomNumber')
+                    }
+            
+            return jsonify({
+                'bookings': bookings,
+                'count': len(bookings)
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @bookings_bp.route('/booking/<booking_id>', methods=['DELETE'])
+    @token_required
+    async def delete_booking(current_user, booking_id):
+        try:
+            booking = await booking_model.get_booking_by_id(booking_id)
+            if not booking:
+                return jsonify({'error': 'Booking not found'}), 404
+            
+            # Only the owner may delete, and only while pending, unless admin
+            user_id = current_user['user_id']
+            is_admin = current_user.get('role') == 'admin'
+            if not is_admin:
+                if str(booking.get('user_id')) != user_id:
+                    return jsonify({'error': 'Unauthorized'}), 403
+                if booking.get('status') != 'pending':
+                    return jsonify({'error': 'Only pending bookings can be deleted'}), 400
+            
+            if not await booking_model.delete_booking(booking_id, None if is_admin else user_id, room_id=booking.get('room_id')):
+                return jsonify({'error': 'Failed to delete booking'}), 500
+            
+            # If booking was confirmed, update room status back to available
+            if booking.get('status') == 'confirmed':
+                await room_model.update_room_status(str(booking.get('room_id')), 'available')
+            
+            return jsonify({
+                'message': 'Booking deleted successfully'
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def intent_response(intent, status_code):
+        intent_id = str(intent['_id'])
+        response = jsonify({
+            'message': 'Payment is being processed' if intent['status'] not in TERMINAL_STATUSES else 'Payment ' + intent['status'],
+            'payment_intent': serialize_intent(intent),
+            'status_url': f'/api/payment/{intent_id}',
+            'events_url': f'/api/payment/{intent_id}/events'
+        })
+        response.status_code = status_code
+        response.headers['Location'] = f'/api/payment/{intent_id}'
+        return response
+    
+    # Queues the charge for the payment workers (payment_worker.py) and answers 202
+    @bookings_bp.route('/payment', methods=['POST'])
+    @token_required
+    async def process_payment(current_user):
+        try:
+            data = await request.get_json()
+            
+            booking_id = data.get('booking_id')
+            amount = data.get('amount')
+            payment_method = data.get('payment_method', 'card')
+            
+            if not booking_id or not amount:
+                return jsonify({'error': 'Booking ID and amount are required'}), 400
+            
+            booking = await booking_model.get_booking_by_id(booking_id)
+            group = None
+            
+            # Group bookings are paid once for all of their rooms
+            if not booking:
+                group = await booking_model.get_group_by_id(booking_id)
+            
+            amount, error = check_payment(booking, group, current_user, amount)
+            if error:
+                return jsonify({'error': error[0]}), error[1]
+            
+            # The sync pool's enqueue (atomic intent, hold pinning) runs in a worker thread
+            intent, created = await asyncio.to_thread(
+                payments.enqueue, str(booking_id), group is not None, str(current_user['user_id']),
+                amount, payment_method, hotel_id=current_hotel_id()
+            )
+            if not created and intent['status'] == 'succeeded':
+                return jsonify({'error': 'Booking is already paid'}), 409
+            if created and intent['status'] == 'failed':
+                return jsonify({'error': intent['error']}), 400
+            
+            return intent_response(intent, 202)
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    async def find_intent(intent_id):
+        return await payment_intents.find_one({'_id': ObjectId(intent_id)}) if ObjectId.is_valid(intent_id) else None
+    
+    def can_view(current_user, intent):
+        return current_user.get('role') in ('admin', 'staff') or intent.get('user_id') == str(current_user['user_id'])
+    
+    @bookings_bp.route('/payment/<intent_id>', methods=['GET'])
+    @token_required
+    async def payment_status(current_user, intent_id):
+        try:
+            intent = await find_intent(intent_id)
+            if not intent or not can_view(current_user, intent):
+                return jsonify({'error': 'Payment not found'}), 404
+            
+            return intent_response(intent, 200)
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @bookings_bp.route('/payment/<intent_id>/events', methods=['GET'])
+    async def payment_status_stream(intent_id):
+        """Server-Sent Events: one 'payment' event per status change, closed once the payment settles"""
+        # EventSource cannot send headers, so the token may come as a query param
+        token = request.args.get('token')
+        auth_header = request.headers.get('Authorization', '')
+        if not token and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+        if not token:
+            return jsonify({'error': 'Token is missing'}), 401
+        
+        if revocations.stale():
+            await asyncio.to_thread(revocations.sync)
+        try:
+            current_user = decode_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired'}), 401
+        except TokenRevokedError:
+            return jsonify({'error': 'Token has been revoked'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token'}), 401
+        
+        intent = await find_intent(intent_id)
+        if not intent or not can_view(current_user, intent):
+            return jsonify({'error': 'Payment not found'}), 404
+        
+        async def generate():
+            current = intent
+            last_seen = None
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            yield b"retry: 3000\n\n"
+            while current is not None and time.monotonic() < deadline:
+                state = (current['status'], current.get('attempts'))
+                if state != last_seen:
+                    last_seen = state
+                    yield f"event: payment\ndata: {json.dumps(serialize_intent(current), default=str)}\n\n".encode()
+                if current['status'] in TERMINAL_STATUSES:
+                    return
+                await asyncio.sleep(STREAM_POLL_INTERVAL)
+                current = await find_intent(intent_id)
+        
+        response = await make_response(generate(), 200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+        # The stream ends itself after STREAM_MAX_SECONDS
+        response.timeout = None
+        return response
+    
+    return bookings_bp
@@ -0,0 +1,277 @@
+import asyncio
+from datetime import datetime
+from bson import ObjectId
+from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from services.outbox import event_payload, outbox_event
+from services.read_routing import for_catalog, for_critical
+from storage.base import HotelScoped
+
+# Async counterparts of models/*.py on Motor. Method names and return values
+# match the sync models so the async routes keep the same contracts. Rooms and
+# bookings are HotelScoped like the sync repositories: for_hotel() returns a
+# view whose queries lead with hotel_id and whose inserts are stamped with it.
+
+ACTIVE_STATUSES = ['confirmed', 'pending']
+
+
+class AsyncOutboxWriter:
+    """storage.mongo.OutboxWriter on Motor: events go in the same transaction as the write when the server has them"""
+
+    def __init__(self, collection):
+        self.outbox = for_critical(collection.database.outbox)
+        self.transactions = None
+
+    async def supports_transactions(self):
+        if self.transactions is None:
+            try:
+                hello = await self.outbox.database.command('hello')
+                self.transactions = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+            except PyMongoError:
+                self.transactions = False
+        return self.transactions
+
+    async def write(self, collection, write, events):
+        """Await write(session) and, if it changed anything, store events(result) in the outbox"""
+        async def unit(session):
+            result = await write(session)
+            if result and events:
+                docs = events(result)
+                if docs:
+                    await self.outbox.insert_many(docs, session=session)
+            return result
+
+        if not events or not await self.supports_transactions():
+            return await unit(None)
+        async with await self.outbox.database.client.start_session() as session:
+            return await session.with_transaction(
+                unit, read_concern=collection.read_concern, write_concern=collection.write_concern
+            )
+
+
+class AsyncRoom(HotelScoped):
+    def __init__(self, db_collection):
+        self.collection = db_collection
+        self.catalog = for_catalog(db_collection)
+
+    async def get_all_rooms(self, projection=None):
+        """Get all rooms, optionally fetching only the projected fields"""
+        return await self.catalog.find(self._scope(), projection).to_list(None)
+
+    async def count_rooms(self):
+        """Get the total number of rooms"""
+        return await self.catalog.count_documents(self._scope())
+
+    async def get_available_rooms(self, checkin_date=None, checkout_date=None):
+        """Get available rooms"""
+        return await self.catalog.find(self._scope({'status': 'available'})).to_list(None)
+
+    async def get_available_rooms_of_type(self, room_type, projection=None):
+        """Get the available rooms of one type, read from the primary for allocation"""
+        return await self.collection.find(self._scope({'status': 'available', 'type': room_type}), projection).to_list(None)
+
+    async def get_room_by_id(self, room_id):
+        """Get room by ID"""
+        try:
+            return await self.collection.find_one(self._scope({'_id': ObjectId(room_id)}))
+        except:
+            return None
+
+    async def get_rooms_by_ids(self, room_ids, projection=None):
+        """Get several rooms in one query, keyed by string id"""
+        object_ids = [ObjectId(room_id) for room_id in room_ids if ObjectId.is_valid(room_id)]
+        rooms = await self.collection.find(self._scope({'_id': {'$in': object_ids}}), projection).to_list(None)
+        return {str(room['_id']): room for room in rooms}
+
+    async def update_room_status(self, room_id, status):
+        """Update room status"""
+        try:
+            result = await self.collection.update_one(
+                self._scope({'_id': ObjectId(room_id)}),
+                {'$set': {'status': status, 'updated_at': datetime.utcnow()}}
+            )
+            return result.modified_count > 0
+        except:
+            return False
+
+
+class AsyncBooking(HotelScoped):
+    def __init__(self, db_collection):
+        self.collection = for_critical(db_collection)
+        self.catalog = for_catalog(db_collection)
+        self.outbox = AsyncOutboxWriter(self.collection)
+
+    async def create_booking(self, booking_data):
+        """Create a new booking"""
+        booking_data['created_at'] = datetime.utcnow()
+        booking_data['status'] = booking_data.get('status', 'pending')
+        self._tag(booking_data)
+
+        async def insert(session):
+            return (await self.collection.insert_one(booking_data, session=session)).inserted_id
+
+        booking_data['_id'] = await self.outbox.write(self.collection, insert, lambda booking_id: [
+            outbox_event('booking.created', booking_id, event_payload(booking_data))
+        ])
+        return booking_data
+
+    async def get_booking_by_id(self, booking_id):
+        """Get booking by ID"""
+        try:
+            return await self.collection.find_one(self._scope({'_id': ObjectId(booking_id)}))
+        except:
+            return None
+
+    async def get_group_by_id(self, group_id):
+        """Get a group booking by ID"""
+        try:
+            return await self.collection.database.booking_groups.find_one(self._scope({'_id': ObjectId(group_id)}))
+        except:
+            return None
+
+    async def _find_sorted(self, query, include_archived):
+        """Find bookings newest first, reading the archive concurrently if asked"""
+        query = self._scope(query)
+        hot = self.collection.find(query).sort('created_at', -1).to_list(None)
+        if not include_archived:
+            return await hot
+
+        archive = self.collection.database.bookings_archive
+        bookings, archived = await asyncio.gather(hot, archive.find(query).to_list(None))
+        bookings.extend(archived)
+        bookings.sort(key=lambda b: b.get('created_at') or datetime.min, reverse=True)
+        return bookings
+
+    async def get_user_bookings(self, user_id, include_archived=False):
+        """Get all bookings for a user"""
+        try:
+            return await self._find_sorted({'user_id': user_id}, include_archived)
+        except:
+            return []
+
+    async def get_all_bookings(self, include_archived=False):
+        """Get all bookings (for admin)"""
+        return await self._find_sorted({}, include_archived)
+
+    async def check_room_availability(self, room_id, checkin_date, checkout_date):
+        """Check if room is available for given dates"""
+        overlapping = await self.collection.find_one(self._scope({
+            'room_id': room_id,
+            'status': {'$in': ACTIVE_STATUSES},
+            'checkin_date': {'$lt': checkout_date},
+            'checkout_date': {'$gt': checkin_date}
+        }), {'_id': 1})
+        return overlapping is None
+
+    async def get_bookings_in_range(self, checkin_date, checkout_date, room_ids=None, stale_ok=False):
+        """Get active bookings with at least one night inside [checkin_date, checkout_date)"""
+        query = {
+            'status': {'$in': ACTIVE_STATUSES},
+            'checkin_date': {'$lt': checkout_date},
+            'checkout_date': {'$gt': checkin_date}
+        }
+        if room_ids is not None:
+            query['room_id'] = {'$in': list(room_ids)}
+
+        collection = self.catalog if stale_ok else self.collection
+        return await collection.find(
+            self._scope(query),
+            {'room_id': 1, 'checkin_date': 1, 'checkout_date': 1}
+        ).to_list(None)
+
+    async def update_booking_status(self, booking_id, status):
+        """Update booking status"""
+        try:
+            update_data = {
+                'status': status,
+                'updated_at': datetime.utcnow()
+            }
+
+            # If status is confirmed, also update payment_status
+            if status == 'confirmed':
+                update_data['payment_status'] = 'completed'
+
+            async def update(session):
+                result = await self.collection.update_one(
+                    self._scope({'_id': ObjectId(booking_id)}),
+                    {'$set': update_data},
+                    session=session
+                )
+                return result.modified_count > 0
+
+            return await self.outbox.write(self.collection, update, lambda _: [
+                outbox_event('booking.status_changed', booking_id, update_data)
+            ])
+        except:
+            return False
+
+    async def delete_booking(self, booking_id, user_id=None, room_id=None):
+        """Delete a booking. If user_id is provided, only delete if booking belongs to that user (room_id targets its shard)."""
+        try:
+            query = self._scope({'_id': ObjectId(booking_id)})
+            if room_id is not None:
+                query['room_id'] = room_id
+            if user_id:
+                query['user_id'] = user_id
+
+            async def delete(session):
+                return await self.collection.find_one_and_delete(query, session=session)
+
+            deleted = await self.outbox.write(self.collection, delete, lambda booking: [
+                outbox_event('booking.deleted', booking_id, event_payload(booking))
+            ])
+            return deleted is not None
+        except:
+            return False
+
+
+class AsyncUser:
+    def __init__(self, db_collection):
+        self.collection = db_collection
+
+    async def create_user(self, user_data):
+        """Create a new user"""
+        # Password hashing is CPU-bound, keep it off the event loop
+        user_data['password'] = await asyncio.to_thread(generate_password_hash, user_data['password'])
+        user_data['created_at'] = datetime.utcnow()
+        user_data['role'] = user_data.get('role', 'guest')
+
+        result = await self.collection.insert_one(user_data)
+        user_data['_id'] = result.inserted_id
+        user_data.pop('password', None)  # Remove password from return
+        return user_data
+
+    async def find_by_email(self, email):
+        """Find user by email"""
+        return await self.collection.find_one({'email': email})
+
+    async def find_by_id(self, user_id):
+        """Find user by ID"""
+        if not ObjectId.is_valid(user_id):
+            return None
+        return await self.collection.find_one({'_id': ObjectId(user_id)})
+
+    async def bump_token_generation(self, user_id):
+        """Invalidate every token issued so far for a user; returns the new generation"""
+        if not ObjectId.is_valid(user_id):
+            return None
+        user = await self.collection.find_one_and_update(
+            {'_id': ObjectId(user_id)},
+            {'$inc': {'token_generation': 1}},
+            projection={'token_generation': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return user['token_generation'] if user else None
+
+    async def find_by_ids(self, user_ids, projection=None):
+        """Find several users in one query, keyed by string id"""
+        object_ids = [ObjectId(user_id) for user_id in user_ids if ObjectId.is_valid(user_id)]
+        users = await self.collection.find({'_id': {'$in': object_ids}}, projection).to_list(None)
+        return {str(user['_id']): user for user in users}
+
+    async def verify_password(self, user, password):
+        """Verify user password"""
+        if user and 'password' in user:
+            return await asyncio.to_thread(check_password_hash, user['password'], password)
+        return False
@@ -0,0 +1,46 @@
+"""
+Per-request property for the async app: the X-Hotel-Id rules and property
+registry of services/properties.py on Quart's request globals. Routes wrap
+their models in PerHotel(model, current_hotel_id) as the sync routes do.
+"""
+import asyncio
+from quart import g, has_request_context, jsonify, request
+from config import Config
+from models.room_model import Room
+from services.properties import HOTEL_ID_PATTERN, PropertyRegistry
+
+
+def current_hotel_id():
+    """The current request's property; DEFAULT_HOTEL_ID outside a request"""
+    if has_request_context():
+        return g.get('hotel_id', Config.DEFAULT_HOTEL_ID)
+    return Config.DEFAULT_HOTEL_ID
+
+
+def init_properties(app, sync_db, config):
+    """Resolve each request's property; the registry reads rooms through the sync (pymongo) database"""
+    registry = PropertyRegistry(
+        Room(sync_db.rooms), config.HOTEL_IDS,
+        default=config.DEFAULT_HOTEL_ID,
+        refresh_seconds=config.HOTEL_IDS_REFRESH_SECONDS
+    )
+    app.extensions['properties'] = registry
+
+    @app.before_request
+    async def select_property():
+        if request.method == 'OPTIONS':
+            return None
+        hotel_id = request.headers.get('X-Hotel-Id') or request.args.get('hotel_id') or config.DEFAULT_HOTEL_ID
+        if not HOTEL_ID_PATTERN.match(hotel_id):
+            return jsonify({'error': 'Invalid hotel id'}), 400
+        # A reload is a sync query: run it off the event loop
+        if registry.may_query(hotel_id):
+            known = await asyncio.to_thread(registry.is_known, hotel_id)
+        else:
+            known = registry.is_known(hotel_id)
+        if not known:
+            return jsonify({'error': 'Unknown hotel'}), 404
+        g.hotel_id = hotel_id
+        return None
+
+    return registry
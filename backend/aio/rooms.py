@@ -0,0 +1,71 @@
+import asyncio
+from quart import Blueprint, request, jsonify
+from aio.models import AsyncRoom, AsyncBooking
+from aio.properties import current_hotel_id
+from services.pricing import PricingEngine, occupancy_by_night
+from config import Config
+from services.properties import PerHotel
+
+def init_rooms_routes(db, app):
+    """Initialize async rooms routes with database connection"""
+    rooms_bp = Blueprint('rooms', __name__)
+    room_model = PerHotel(AsyncRoom(db.rooms), current_hotel_id)
+    booking_model = PerHotel(AsyncBooking(db.bookings), current_hotel_id)
+    pricing_engine = PricingEngine.from_config(Config)
+    
+    @rooms_bp.route('/rooms', methods=['GET'])
+    async def get_rooms():
+        try:
+            rooms = await room_model.get_all_rooms()
+            
+            # Convert ObjectId to string
+            for room in rooms:
+                room['_id'] = str(room['_id'])
+            
+            return jsonify({
+                'rooms': rooms,
+                'count': len(rooms)
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @rooms_bp.route('/rooms/available', methods=['GET'])
+    async def get_available_rooms():
+        try:
+            checkin_date = request.args.get('checkin')
+            checkout_date = request.args.get('checkout')
+            
+            if checkin_date and checkout_date:
+                # Rooms, hotel size and occupancy are independent: fetch them together
+                rooms, total_rooms, bookings = await asyncio.gather(
+                    room_model.get_available_rooms(checkin_date, checkout_date),
+                    room_model.count_rooms(),
+                    booking_model.get_bookings_in_range(checkin_date, checkout_date, stale_ok=True)
+                )
+                if rooms:
+                    occupancy = occupancy_by_night(bookings, checkin_date, checkout_date, total_rooms)
+                    nightly_rates, totals = pricing_engine.quote(
+                        [room.get('price', 0) for room in rooms], checkin_date, checkout_date, occupancy
+                    )
+                    for room, rates, total in zip(rooms, nightly_rates.tolist(), totals.tolist()):
+                        room['nightly_rates'] = rates
+                        room['total_price'] = total
+            else:
+                rooms = await room_model.get_available_rooms()
+            
+            # Convert ObjectId to string
+            for room in rooms:
+                room['_id'] = str(room['_id'])
+            
+            return jsonify({
+                'rooms': rooms,
+                'count': len(rooms)
+            }), 200
+            
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return rooms_bp
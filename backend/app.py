@@ -1,186 +1,121 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_pymongo import PyMongo
 from config import Config
-from routes.auth import init_auth_routes, token_required
+from routes.auth import init_auth_routes
 from routes.rooms import init_rooms_routes
 from routes.bookings import init_bookings_routes
 from routes.feedback import init_feedback_routes
-from models.booking_model import Booking
-from datetime import datetime
+from routes.events import init_events_routes
+from routes.users import init_user_routes
+from routes.payments import init_payment_routes
+from routes.metrics import init_metrics_routes
+from routes.exports import init_export_routes
+from routes.batch import init_batch_routes
+from routes.waitlist import init_waitlist_routes
+from models.user_model import User
+from storage.memory import MemoryDatabase
+from services.user_directory import user_directory
+from services.admission import AdmissionController, CommandLatency, init_admission_control
+from services.login_audit import init_login_audit
+from services.outbox import init_outbox
+from services.payments import init_payment_processing
+from services.waitlist import init_waitlist
+from services.properties import init_properties
 
-app = Flask(__name__)
-app.config.from_object(Config)
+def create_app(config=Config, db=None):
+    """
+    Application factory. Each call builds its own Flask app and MongoDB client,
+    so production servers should call it once per worker process after forking
+    (see wsgi.py and gunicorn.conf.py) rather than sharing a client across forks.
+    Pass db to serve an existing database (e.g. a seeded MemoryDatabase).
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
 
-# Initialize CORS
-CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+    # Initialize CORS
+    CORS(app, origins=config.CORS_ORIGINS, supports_credentials=True)
 
-# Initialize MongoDB
-mongo = PyMongo(app)
-db = mongo.db
+    latency = None
+    if db is None and config.STORAGE_BACKEND == 'memory':
+        db = MemoryDatabase()
+    elif db is None:
+        # Initialize MongoDB with an explicitly sized connection pool; the latency
+        # monitor feeds adaptive admission control
+        latency = CommandLatency() if config.ADMISSION_ADAPTIVE else None
+        listeners = [latency] if latency else []
+        mongo = PyMongo(app, event_listeners=listeners, **config.mongo_client_options())
+        db = mongo.db
+    
+    # Cached user summaries for joins
+    user_directory.bind(User(db.users), config.USER_DIRECTORY_SIZE, config.USER_DIRECTORY_TTL_SECONDS)
+    
+    # Each request's property (X-Hotel-Id), checked before any other work
+    init_properties(app, db, config)
 
-# Initialize routes
-auth_bp = init_auth_routes(db, app)
-rooms_bp = init_rooms_routes(db, app)
-bookings_bp = init_bookings_routes(db, app)
-feedback_bp = init_feedback_routes(db, app)
+    # Shed load per request class before it reaches the handlers
+    if config.ADMISSION_CONTROL_ENABLED:
+        controller = AdmissionController(
+            config.ADMISSION_CAPACITY, config.ADMISSION_CLASSES,
+            retry_after=config.ADMISSION_RETRY_AFTER_SECONDS,
+            latency=latency,
+            latency_target_ms=config.ADMISSION_LATENCY_TARGET_MS,
+            min_fraction=config.ADMISSION_MIN_FRACTION
+        )
+        init_admission_control(app, controller, config.ADMISSION_ROUTES, config.ADMISSION_DEFAULT_CLASS)
 
-# Register blueprints
-app.register_blueprint(auth_bp, url_prefix='/api')
-app.register_blueprint(rooms_bp, url_prefix='/api')
-app.register_blueprint(bookings_bp, url_prefix='/api')
-app.register_blueprint(feedback_bp, url_prefix='/api')
+    # Outbox indexes, plus the relay thread when enabled
+    init_outbox(app, db, config)
 
-# Health check endpoint
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    return jsonify({
-        'status': 'healthy',
-        'message': 'EaseStay API is running',
-        'database': 'connected' if mongo.db else 'disconnected'
-    }), 200
+    # Time-series login log and its hourly rollup, created before any route writes to it
+    init_login_audit(app, db, config)
 
-# User login log endpoint
-@app.route('/api/user/login-log', methods=['POST'])
-@token_required
-def log_user_login(current_user):
-    try:
-        data = request.get_json()
-        
-        login_log = {
-            'user_id': current_user['user_id'],
-            'email': data.get('email', current_user.get('email', '')),
-            'role': data.get('role', current_user.get('role', 'guest')),
-            'login_time': datetime.utcnow(),
-            'ip_address': request.remote_addr,
-            'user_agent': request.headers.get('User-Agent', '')
-        }
-        
-        db.user_login_logs.insert_one(login_log)
-        
-        return jsonify({
-            'message': 'Login logged successfully',
-            'login_time': login_log['login_time'].isoformat()
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Payment intents and the worker pool that charges them (used by the payment routes)
+    init_payment_processing(app, db, config)
+
+    # Cancellation waitlist matcher and the sweeper that expires unpaid holds
+    init_waitlist(app, db, config)
+
+    # Initialize and register routes
+    for init_routes in (init_auth_routes, init_rooms_routes, init_bookings_routes,
+                        init_feedback_routes, init_events_routes, init_user_routes,
+                        init_payment_routes, init_metrics_routes, init_export_routes,
+                        init_batch_routes, init_waitlist_routes):
+        app.register_blueprint(init_routes(db, app), url_prefix='/api')
+
+    # Health check endpoint
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        try:
+            db.command('ping')
+            database = 'connected'
+        except Exception:
+            database = 'disconnected'
 
-# User preferences endpoint
-@app.route('/api/user/preferences', methods=['POST'])
-@token_required
-def save_user_preferences(current_user):
-    try:
-        data = request.get_json()
-        
-        preferences = {
-            'user_id': current_user['user_id'],
-            'checkin_date': data.get('checkin_date'),
-            'checkout_date': data.get('checkout_date'),
-            'updated_at': datetime.utcnow()
-        }
-        
-        # Add login_time if provided
-        if data.get('login_time'):
-            preferences['login_time'] = datetime.utcnow()
-        
-        # Update or insert preferences
-        db.user_preferences.update_one(
-            {'user_id': current_user['user_id']},
-            {'$set': preferences},
-            upsert=True
-        )
-        
-        # Convert datetime to string for JSON serialization
-        preferences_serialized = {
-            'user_id': preferences['user_id'],
-            'checkin_date': preferences['checkin_date'],
-            'checkout_date': preferences['checkout_date'],
-            'updated_at': preferences['updated_at'].isoformat()
-        }
-        if 'login_time' in preferences:
-            preferences_serialized['login_time'] = preferences['login_time'].isoformat()
-        
         return jsonify({
-            'message': 'Preferences saved successfully',
-            'preferences': preferences_serialized
+            'status': 'healthy',
+            'message': 'EaseStay API is running',
+            'database': database
         }), 200
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
 
-# Payment endpoint
-@app.route('/api/payment', methods=['POST'])
-@token_required
-def process_payment(current_user):
-    try:
-        from bson import ObjectId
-        from models.room_model import Room
-        
-        data = request.get_json()
-        
-        booking_id = data.get('booking_id')
-        amount = data.get('amount')
-        payment_method = data.get('payment_method', 'card')
-        
-        if not booking_id or not amount:
-            return jsonify({'error': 'Booking ID and amount are required'}), 400
-        
-        # Update booking payment status
-        booking_model = Booking(db.bookings)
-        booking = booking_model.get_booking_by_id(booking_id)
-        
-        if not booking:
-            return jsonify({'error': 'Booking not found'}), 404
-        
-        # Update booking status to confirmed
-        success = booking_model.update_booking_status(booking_id, 'confirmed')
-        
-        if success:
-            # Update room status to occupied
-            room_model = Room(db.rooms)
-            room_id = booking.get('room_id')
-            # Convert ObjectId to string if needed
-            if isinstance(room_id, ObjectId):
-                room_id = str(room_id)
-            room_model.update_room_status(room_id, 'occupied')
-            
-            # Record payment
-            payment_data = {
-                'booking_id': str(ObjectId(booking_id)) if isinstance(booking_id, ObjectId) else str(booking_id),
-                'user_id': str(current_user['user_id']) if isinstance(current_user['user_id'], ObjectId) else str(current_user['user_id']),
-                'amount': float(amount),
-                'payment_method': payment_method,
-                'status': 'completed',
-                'created_at': datetime.utcnow()
-            }
-            
-            db.payments.insert_one(payment_data)
-            
-            # Convert payment_data ObjectId to string for JSON serialization
-            payment_data['_id'] = str(payment_data['_id'])
-            
-            return jsonify({
-                'message': 'Room booked successfully',
-                'payment': payment_data
-            }), 200
-        else:
-            return jsonify({'error': 'Failed to process payment'}), 500
-            
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(error):
+        return jsonify({'error': 'Endpoint not found'}), 404
 
-# Error handlers
-@app.errorhandler(404)
-def not_found(error):
-    return jsonify({'error': 'Endpoint not found'}), 404
+    @app.errorhandler(500)
+    def internal_error(error):
+        return jsonify({'error': 'Internal server error'}), 500
 
-@app.errorhandler(500)
-def internal_error(error):
-    return jsonify({'error': 'Internal server error'}), 500
+    return app
 
 if __name__ == '__main__':
+    # Development server only; use gunicorn (see README) in production
+    app = create_app()
     print("Starting EaseStay Flask Server...")
-    print(f"MongoDB URI: {Config.MONGO_URI}")
+    if Config.STORAGE_BACKEND == 'memory':
+        print("Storage: in-memory (data is lost on restart)")
+    else:
+        print(f"MongoDB URI: {Config.MONGO_URI}")
     print("API endpoints available at http://localhost:5000/api")
-    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=Config.DEBUG, host='0.0.0.0', port=5000)
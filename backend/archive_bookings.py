@@ -0,0 +1,36 @@
+"""
+Archive job: move completed bookings out of the hot bookings collection
+Run periodically (e.g. nightly from cron): python archive_bookings.py [--horizon-days N]
+"""
+import argparse
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from config import Config
+from models.booking_model import Booking
+from models.room_model import Room
+
+def main():
+    """Main archive function"""
+    parser = argparse.ArgumentParser(description='Move old bookings into bookings_archive')
+    parser.add_argument('--horizon-days', type=int, default=Config.ARCHIVE_HORIZON_DAYS,
+                        help='Archive bookings that checked out more than this many days ago')
+    parser.add_argument('--batch-size', type=int, default=Config.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client.get_default_database()
+        booking_model = Booking(db.bookings)
+        
+        cutoff = (datetime.utcnow() - timedelta(days=args.horizon_days)).strftime('%Y-%m-%d')
+        print(f"Archiving bookings with checkout before {cutoff}...")
+        
+        # One property at a time, so each pass walks that property's (hotel_id, checkout_date) index
+        for hotel_id in Room(db.rooms).get_hotel_ids():
+            moved = booking_model.for_hotel(hotel_id).archive_completed(cutoff, batch_size=args.batch_size)
+            print(f"Archived {moved} bookings at {hotel_id}")
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: best-fit room allocation for book-by-type on a large seeded hotel
+Run from the backend directory: python -m benchmarks.bench_allocator
+"""
+import time
+import numpy as np
+from datetime import date, timedelta
+from config import Config
+from services.allocator import best_fit
+
+ROOMS = 2000          # rooms of the requested type
+BOOKINGS = 60000      # existing stays spread over a year
+REQUESTS = 500
+HORIZON = Config.ALLOCATOR_GAP_HORIZON_DAYS
+
+
+def seed(rng):
+    """Synthetic hotel: room ids plus bookings as (room index, checkin offset, nights)"""
+    room_ids = [f'room-{i:05d}' for i in range(ROOMS)]
+    rows = rng.integers(0, ROOMS, BOOKINGS)
+    starts = rng.integers(0, 365, BOOKINGS)
+    lengths = rng.integers(1, 8, BOOKINGS)
+    return room_ids, rows, starts, starts + lengths
+
+
+def main():
+    rng = np.random.default_rng(7)
+    origin = date(2030, 1, 1)
+    room_ids, rows, starts, ends = seed(rng)
+
+    def day(offset):
+        return (origin + timedelta(days=int(offset))).isoformat()
+
+    # Stands in for the Mongo range query: bookings touching the scoring window
+    def bookings_in_window(lo, hi):
+        mask = (starts < hi) & (ends > lo)
+        return [
+            {'room_id': room_ids[r], 'checkin_date': day(s), 'checkout_date': day(e)}
+            for r, s, e in zip(rows[mask], starts[mask], ends[mask])
+        ]
+
+    latencies = []
+    allocated = 0
+    window_sizes = []
+    for checkin in rng.integers(HORIZON, 365 - HORIZON - 7, REQUESTS):
+        nights = int(rng.integers(1, 7))
+        bookings = bookings_in_window(checkin - HORIZON, checkin + nights + HORIZON)
+        window_sizes.append(len(bookings))
+
+        start = time.perf_counter()
+        room_id = best_fit(room_ids, bookings, day(checkin), day(checkin + nights), HORIZON)
+        latencies.append(time.perf_counter() - start)
+        allocated += room_id is not None
+
+    latencies = np.array(latencies) * 1000
+    print(f"Allocated {allocated}/{REQUESTS} stays across {ROOMS} rooms ({BOOKINGS} existing bookings)")
+    print(f"  bookings per scoring window: {int(np.mean(window_sizes))} avg")
+    print(f"  best-fit latency: p50 {np.percentile(latencies, 50):.2f} ms, "
+          f"p99 {np.percentile(latencies, 99):.2f} ms, max {latencies.max():.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
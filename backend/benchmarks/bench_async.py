@@ -0,0 +1,127 @@
+"""
+Benchmark: sync (gunicorn gthread + PyMongo) vs async (hypercorn + Quart/Motor) API
+at 1k concurrent clients. Needs a running, seeded MongoDB and requirements-async.txt.
+Run from the backend directory:
+    python -m benchmarks.bench_async
+    python -m benchmarks.bench_async --path /api/rooms/available?checkin=2030-01-01&checkout=2030-01-04
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+
+HOST = '127.0.0.1'
+
+
+async def wait_until_ready(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection(HOST, port)
+            writer.close()
+            return True
+        except OSError:
+            await asyncio.sleep(0.2)
+    return False
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response with a Content-Length body; returns the status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def client(port, path, stop_at, latencies, errors):
+    """One keep-alive client issuing requests back to back until stop_at"""
+    request = f'GET {path} HTTP/1.1\r\nHost: {HOST}\r\n\r\n'.encode()
+    reader = writer = None
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(HOST, port)
+            writer.write(request)
+            status = await asyncio.wait_for(read_response(reader), 30)
+            if status >= 500:
+                errors.append(status)
+            latencies.append(time.perf_counter() - start)
+        except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            errors.append(0)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def drive(port, path, clients, duration):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(*(client(port, path, stop_at, latencies, errors) for _ in range(clients)))
+    return np.array(latencies) * 1000, len(errors)
+
+
+def start_server(kind, args):
+    env = dict(os.environ)
+    if kind == 'sync':
+        env.update(GUNICORN_BIND=f'{HOST}:{args.port}', GUNICORN_WORKERS=str(args.workers),
+                   GUNICORN_THREADS=str(args.threads), GUNICORN_ACCESS_LOG='/dev/null',
+                   GUNICORN_LOG_LEVEL='warning', GUNICORN_BACKLOG='2048')
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'hypercorn', 'aio.app:create_app()',
+                   '--bind', f'{HOST}:{args.port}', '--workers', str(args.workers),
+                   '--backlog', '2048', '--log-level', 'warning']
+    return subprocess.Popen(command, env=env)
+
+
+async def run(kind, args):
+    server = start_server(kind, args)
+    try:
+        if not await wait_until_ready(args.port):
+            print(f"  {kind:<6} server did not start")
+            return
+        await drive(args.port, args.path, 50, 1)  # warm up pools and caches
+        latencies, errors = await drive(args.port, args.path, args.clients, args.duration)
+        if not len(latencies):
+            print(f"  {kind:<6} no successful requests ({errors} errors)")
+            return
+        print(f"  {kind:<6} {len(latencies) / args.duration:>10.0f} {np.percentile(latencies, 50):>9.1f} "
+              f"{np.percentile(latencies, 99):>9.1f} {errors:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync vs async API throughput')
+    parser.add_argument('--path', default='/api/rooms')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='threads per sync worker')
+    parser.add_argument('--port', type=int, default=5056)
+    args = parser.parse_args()
+
+    print(f"GET {args.path}: {args.clients} concurrent keep-alive clients, {args.workers} workers")
+    print(f"  {'server':<6} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for kind in ('sync', 'async'):
+        asyncio.run(run(kind, args))
+
+
+if __name__ == '__main__':
+    main()
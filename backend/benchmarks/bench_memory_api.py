@@ -0,0 +1,133 @@
+"""
+Benchmark: the Flask API on the in-memory storage engine, without network or MongoDB
+Run from the backend directory: python -m benchmarks.bench_memory_api [--profile]
+
+Drives the browse -> book -> list -> pay flow through the Flask test client
+against a seeded MemoryDatabase, so the numbers measure the application code
+(routing, auth, admission, pricing, allocation, serialization) on its own.
+--profile prints the hottest functions under cProfile.
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import time
+import numpy as np
+from datetime import date, datetime, timedelta
+from config import Config
+from app import create_app
+from routes.auth import generate_token
+from storage.memory import MemoryDatabase
+
+TYPES = ('standard', 'deluxe', 'suite')
+PRICES = {'standard': 3500, 'deluxe': 6000, 'suite': 11000}
+
+
+def seed(db, rooms, users, bookings, rng):
+    """Rooms, users (inserted directly: password hashing would dominate) and a year of stays at the default property"""
+    room_ids = []
+    for i in range(rooms):
+        room_type = TYPES[i % len(TYPES)]
+        room_ids.append(str(db.rooms.insert_one({
+            'hotel_id': Config.DEFAULT_HOTEL_ID,
+            'name': f'{room_type.title()} {i}', 'type': room_type, 'roomNumber': str(100 + i),
+            'price': PRICES[room_type], 'capacity': 2 + i % 3, 'amenities': ['WiFi'],
+            'status': 'available', 'created_at': datetime.utcnow()
+        }).inserted_id))
+    user_ids = [
+        str(db.users.insert_one({'email': f'user{i}@example.com', 'password': '-', 'firstName': 'Guest',
+                                 'lastName': str(i), 'role': 'guest', 'created_at': datetime.utcnow()}).inserted_id)
+        for i in range(users)
+    ]
+    today = date.today()
+    for _ in range(bookings):
+        checkin = today + timedelta(days=rng.randint(1, 365))
+        db.bookings.insert_one({
+            'hotel_id': Config.DEFAULT_HOTEL_ID,
+            'user_id': rng.choice(user_ids), 'room_id': rng.choice(room_ids),
+            'checkin_date': checkin.isoformat(),
+            'checkout_date': (checkin + timedelta(days=rng.randint(1, 7))).isoformat(),
+            'guests': 2, 'status': 'confirmed', 'created_at': datetime.utcnow()
+        })
+    return user_ids
+
+
+def run(client, user_ids, requests, rng):
+    """Time each step of the flow; returns {step: [latency seconds]} and HTTP status counts"""
+    latencies = {'GET /rooms/available': [], 'POST /book': [], 'GET /bookings': [], 'POST /payment': []}
+    statuses = {}
+    today = date.today()
+
+    def timed(step, call):
+        start = time.perf_counter()
+        response = call()
+        latencies[step].append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        return response
+
+    for _ in range(requests):
+        user_id = rng.choice(user_ids)
+        headers = {'Authorization': 'Bearer ' + generate_token(user_id, 'guest', f'{user_id}@example.com')}
+        checkin = today + timedelta(days=rng.randint(1, 365))
+        checkout = checkin + timedelta(days=rng.randint(1, 5))
+
+        timed('GET /rooms/available', lambda: client.get(
+            f'/api/rooms/available?checkin={checkin}&checkout={checkout}'))
+        booked = timed('POST /book', lambda: client.post('/api/book', headers=headers, json={
+            'room_type': rng.choice(TYPES), 'checkin_date': checkin.isoformat(),
+            'checkout_date': checkout.isoformat(), 'guests': 2}))
+        timed('GET /bookings', lambda: client.get('/api/bookings', headers=headers))
+        if booked.status_code == 201:
+            booking = booked.get_json()['booking']
+            timed('POST /payment', lambda: client.post('/api/payment', headers=headers, json={
+                'booking_id': booking['_id'], 'amount': booking['total_price']}))
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=300)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=500, help='flows to run (3-4 requests each)')
+    parser.add_argument('--profile', action='store_true')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = MemoryDatabase()
+    start = time.perf_counter()
+    user_ids = seed(db, args.rooms, args.users, args.bookings, rng)
+    print(f"Seeded {args.rooms} rooms, {args.users} users, {args.bookings} bookings "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    app = create_app(db=db)
+    client = app.test_client()
+    # Warm-up: first requests build the allocator inventory and Flask's URL map
+    run(client, user_ids, 10, rng)
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    latencies, statuses = run(client, user_ids, args.requests, rng)
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total} requests in {elapsed:.2f}s: {total / elapsed:.0f} req/s on one thread "
+          f"(statuses {dict(sorted(statuses.items()))})")
+    for step, values in latencies.items():
+        if values:
+            values = np.array(values) * 1000
+            print(f"  {step:22} {len(values):5}  p50 {np.percentile(values, 50):6.2f} ms  "
+                  f"p99 {np.percentile(values, 99):6.2f} ms")
+
+    if profiler:
+        print()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: quote 10k rooms x 30 nights with the vectorized pricing engine
+Run from the backend directory: python -m benchmarks.bench_pricing
+"""
+import time
+import numpy as np
+from datetime import date, timedelta
+from config import Config
+from services.pricing import PricingEngine, occupancy_by_night
+
+ROOMS = 10000
+NIGHTS = 30
+REPEAT = 20
+
+
+def make_bookings(checkin, count, rng):
+    """Random stays around the quoted window to drive the occupancy tiers"""
+    bookings = []
+    for offset, length in zip(rng.integers(-5, NIGHTS, count), rng.integers(1, 8, count)):
+        start = checkin + timedelta(days=int(offset))
+        bookings.append({
+            'checkin_date': start.isoformat(),
+            'checkout_date': (start + timedelta(days=int(length))).isoformat()
+        })
+    return bookings
+
+
+def loop_quote(engine, base_prices, checkin, occupancy):
+    """Reference implementation: one Python multiply per room per night"""
+    nights = [checkin + timedelta(days=i) for i in range(NIGHTS)]
+    factors = engine.night_factors(np.array(nights, dtype='datetime64[D]'), occupancy).tolist()
+    totals = []
+    for price in base_prices:
+        total = 0.0
+        for factor in factors:
+            total += round(price * factor, 2)
+        totals.append(round(total, 2))
+    return totals
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    rng = np.random.default_rng(42)
+    engine = PricingEngine.from_config(Config)
+    checkin = date(2025, 12, 10)
+    checkout = checkin + timedelta(days=NIGHTS)
+    base_prices = rng.integers(2000, 15000, ROOMS).astype(float).tolist()
+    bookings = make_bookings(checkin, ROOMS * 2, rng)
+
+    occ_time, occupancy = timed(
+        lambda: occupancy_by_night(bookings, checkin.isoformat(), checkout.isoformat(), ROOMS), REPEAT
+    )
+    vec_time, (rates, totals) = timed(
+        lambda: engine.quote(base_prices, checkin.isoformat(), checkout.isoformat(), occupancy), REPEAT
+    )
+    loop_time, loop_totals = timed(lambda: loop_quote(engine, base_prices, checkin, occupancy), 3)
+
+    assert np.allclose(totals, loop_totals)
+
+    print(f"Quoted {ROOMS} rooms x {NIGHTS} nights ({rates.size} nightly rates)")
+    print(f"  {'occupancy paint (%d bookings)' % len(bookings):<36}{occ_time * 1000:8.2f} ms")
+    print(f"  {'vectorized quote':<36}{vec_time * 1000:8.2f} ms")
+    print(f"  {'per-night python loop':<36}{loop_time * 1000:8.2f} ms")
+    print(f"  {'speedup':<36}{loop_time / vec_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
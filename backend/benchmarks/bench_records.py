@@ -0,0 +1,74 @@
+"""
+Benchmark: memory needed to hold 20k booking rows as raw dicts vs slotted records
+Run from the backend directory: python -m benchmarks.bench_records
+"""
+import tracemalloc
+from datetime import datetime
+from bson import ObjectId
+from models.records import BookingRecord
+
+ROWS = 20000
+
+
+def make_doc(i):
+    """A stored booking document, including fields list endpoints never show"""
+    return {
+        '_id': ObjectId(),
+        'user_id': str(ObjectId()),
+        'room_id': ObjectId(),
+        'room_number': str(100 + i % 400),
+        'room_name': 'Deluxe Double Room',
+        'room_type': 'deluxe',
+        'checkin_date': '2030-03-01',
+        'checkout_date': '2030-03-04',
+        'guests': 2,
+        'rooms': 1,
+        'price_per_night': 5499,
+        'nightly_rates': [5499.0, 5499.0, 6048.9],
+        'total_price': 17046.9,
+        'status': 'confirmed',
+        'payment_status': 'completed',
+        'created_at': datetime(2030, 2, 1),
+        'updated_at': datetime(2030, 2, 2),
+        'special_requests': 'Late check-in, extra pillows and a quiet room away from the lift',
+        'payment_reference': 'pay_' + 'x' * 24,
+        'audit': {'ip': '203.0.113.7', 'agent': 'Mozilla/5.0'}
+    }
+
+
+def projected(doc):
+    """What the server returns for BookingRecord.projection()"""
+    return {field: doc[field] for field in BookingRecord.FIELDS if field in doc}
+
+
+def as_dicts(docs):
+    """Previous path: keep full documents and convert ids in place"""
+    for doc in docs:
+        doc['_id'] = str(doc['_id'])
+        doc['room_id'] = str(doc['room_id'])
+    return docs
+
+
+def measure(build):
+    """Bytes still allocated once the rows are built"""
+    tracemalloc.start()
+    rows = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, current
+
+
+def main():
+    _, dict_bytes = measure(lambda: as_dicts([make_doc(i) for i in range(ROWS)]))
+    _, record_bytes = measure(
+        lambda: BookingRecord.from_cursor(projected(make_doc(i)) for i in range(ROWS))
+    )
+
+    print(f"Held {ROWS} booking rows")
+    print(f"  {'raw dicts':<20}{dict_bytes / ROWS:8.0f} bytes/row")
+    print(f"  {'BookingRecord':<20}{record_bytes / ROWS:8.0f} bytes/row")
+    print(f"  {'saving':<20}{1 - record_bytes / dict_bytes:8.0%}")
+
+
+if __name__ == '__main__':
+    main()
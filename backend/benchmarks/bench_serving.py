@@ -0,0 +1,109 @@
+"""
+Benchmark: HTTP throughput of the gunicorn profile versus worker and thread counts
+Needs a running MongoDB (seed it first). Run from the backend directory:
+    python -m benchmarks.bench_serving
+    python -m benchmarks.bench_serving --path /api/health --workers 1 2 4 --threads 1 4 8
+"""
+import os
+import sys
+import time
+import argparse
+import http.client
+import subprocess
+import threading
+import numpy as np
+
+HOST = '127.0.0.1'
+
+
+def wait_until_ready(port, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=1)
+            conn.connect()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def drive(port, path, clients, duration):
+    """Hammer path from keep-alive client threads; returns (requests, errors, latencies)"""
+    stop_at = time.monotonic() + duration
+    results = []
+    lock = threading.Lock()
+
+    def client():
+        conn = http.client.HTTPConnection(HOST, port, timeout=10)
+        latencies = []
+        errors = 0
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(HOST, port, timeout=10)
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            results.append((latencies, errors))
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = np.concatenate([np.array(l) for l, _ in results]) * 1000
+    return len(latencies), sum(e for _, e in results), latencies
+
+
+def run_profile(args, workers, threads):
+    env = dict(os.environ,
+               GUNICORN_BIND=f'{HOST}:{args.port}',
+               GUNICORN_WORKER_CLASS=args.worker_class,
+               GUNICORN_WORKERS=str(workers),
+               GUNICORN_THREADS=str(threads),
+               GUNICORN_ACCESS_LOG='/dev/null',
+               GUNICORN_LOG_LEVEL='warning')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], env=env)
+    try:
+        if not wait_until_ready(args.port):
+            print(f"  workers={workers} threads={threads}: server did not start")
+            return
+        drive(args.port, args.path, args.clients, 1)  # warm up pools and caches
+        count, errors, latencies = drive(args.port, args.path, args.clients, args.duration)
+        print(f"  {workers:>7} {threads:>7} {count / args.duration:>10.0f} "
+              f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 99):>8.2f} {errors:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--path', default='/api/rooms')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    print(f"GET {args.path} with {args.clients} keep-alive clients, {args.worker_class} workers")
+    print(f"  {'workers':>7} {'threads':>7} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for workers in args.workers:
+        for threads in args.threads:
+            run_profile(args, workers, threads)
+
+
+if __name__ == '__main__':
+    main()
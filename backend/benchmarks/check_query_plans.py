@@ -0,0 +1,335 @@
+"""
+Query plan regression check: explain every query shape the models and the
+feedback/payment routes send, against a seeded scratch database, and fail on
+collection scans or when far more documents are examined than returned.
+Needs a running MongoDB. Run from the backend directory:
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans --bookings 50000 --max-ratio 5
+Exits with status 1 when any query shape regresses.
+"""
+import sys
+import random
+import argparse
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, urlunsplit
+from bson import ObjectId
+from pymongo import MongoClient, monitoring
+from config import Config
+from models.booking_model import Booking
+from models.room_model import Room
+from models.user_model import User
+from services.exports import date_range
+from services.login_audit import LoginAudit
+from services.payments import PaymentWorkerPool
+from services.read_routing import for_catalog
+from services.waitlist import Waitlist
+
+# Commands the server can explain; inserts, getMores and index builds are skipped
+EXPLAINABLE = {'find', 'aggregate', 'count', 'distinct', 'update', 'delete', 'findAndModify'}
+# Session, concern and routing fields pymongo adds that explain does not accept
+ENVELOPE = {'lsid', 'txnNumber', 'readConcern', 'writeConcern', 'startTransaction', 'autocommit'}
+# Plans examine at least this many documents before the ratio check applies
+MIN_EXAMINED = 100
+
+ROOM_TYPES = ['standard', 'deluxe', 'suite', 'family']
+# Properties sharing the scratch database; the query shapes run at the first one
+HOTELS = ['main', 'annex']
+AMENITIES = ['WiFi', 'AC', 'TV', 'Mini Bar', 'Balcony', 'Work Desk', 'Ocean View', 'Bathtub']
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Keep every explainable command sent while recording is on"""
+
+    def __init__(self):
+        self.commands = []
+        self.recording = False
+
+    def started(self, event):
+        if self.recording and event.command_name in EXPLAINABLE:
+            command = {k: v for k, v in event.command.items() if k not in ENVELOPE and not k.startswith('$')}
+            self.commands.append((event.database_name, event.command_name, command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def day(offset):
+    return (datetime.utcnow() + timedelta(days=offset)).strftime('%Y-%m-%d')
+
+
+def seed(db, bookings, rng):
+    """Synthetic hotels: rooms, users, two years of bookings, groups, feedback and payments"""
+    for name in ('rooms', 'users', 'bookings', 'bookings_archive', 'booking_groups', 'feedback', 'payments'):
+        db[name].drop()
+
+    rooms = [{
+        '_id': ObjectId(),
+        'hotel_id': HOTELS[i % len(HOTELS)],
+        'name': f'{room_type.title()} Room {i}',
+        'type': room_type,
+        'price': rng.randrange(2500, 16000, 500),
+        'description': f'{room_type} room with {rng.choice(AMENITIES)}',
+        'capacity': rng.randint(1, 5),
+        'amenities': rng.sample(AMENITIES, rng.randint(2, 5)),
+        'status': rng.choices(['available', 'occupied', 'maintenance'], [80, 15, 5])[0],
+        'needs_cleaning': rng.random() < 0.05,
+        'roomNumber': str(100 + i),
+        'created_at': datetime.utcnow()
+    } for i, room_type in ((i, rng.choice(ROOM_TYPES)) for i in range(300))]
+    db.rooms.insert_many(rooms)
+
+    users = [{
+        '_id': ObjectId(),
+        'email': f'guest{i}@example.com',
+        'password': 'not-a-real-hash',
+        'firstName': f'Guest{i}',
+        'lastName': 'Example',
+        'phone': '',
+        'role': 'guest',
+        'created_at': datetime.utcnow()
+    } for i in range(3000)]
+    db.users.insert_many(users)
+
+    docs = []
+    for _ in range(bookings):
+        room = rng.choice(rooms)
+        checkin = datetime.utcnow() + timedelta(days=rng.randint(-730, 180))
+        checkout = checkin + timedelta(days=rng.randint(1, 7))
+        docs.append({
+            'hotel_id': room['hotel_id'],
+            'user_id': str(rng.choice(users)['_id']),
+            'room_id': str(room['_id']),
+            'room_number': room['roomNumber'],
+            'room_name': room['name'],
+            'room_type': room['type'],
+            'checkin_date': checkin.strftime('%Y-%m-%d'),
+            'checkout_date': checkout.strftime('%Y-%m-%d'),
+            'guests': rng.randint(1, room['capacity']),
+            'total_price': room['price'] * (checkout - checkin).days,
+            'status': rng.choices(['confirmed', 'pending', 'cancelled'], [75, 15, 10])[0],
+            'created_at': checkin - timedelta(days=rng.randint(1, 60))
+        })
+    db.bookings.insert_many(docs)
+
+    groups = []
+    first_hotel = [room for room in rooms if room['hotel_id'] == HOTELS[0]]
+    for _ in range(100):
+        group_id = ObjectId()
+        offset = rng.randint(1, 180)
+        items = [{
+            'hotel_id': HOTELS[0],
+            'user_id': str(rng.choice(users)['_id']),
+            'room_id': str(room['_id']),
+            'group_id': str(group_id),
+            'checkin_date': day(offset),
+            'checkout_date': day(offset + 2),
+            'status': 'pending',
+            'created_at': datetime.utcnow()
+        } for room in rng.sample(first_hotel, 3)]
+        db.bookings.insert_many(items)
+        groups.append({'_id': group_id, 'hotel_id': HOTELS[0], 'item_ids': [str(item['_id']) for item in items],
+                       'status': 'pending'})
+    db.booking_groups.insert_many(groups)
+
+    db.feedback.insert_many([{
+        'hotel_id': rng.choice(HOTELS),
+        'user_id': str(rng.choice(users)['_id']),
+        'rating': rng.randint(1, 5),
+        'comment': 'Lovely stay',
+        'created_at': datetime.utcnow() - timedelta(days=rng.randint(0, 730))
+    } for _ in range(2000)])
+    db.payments.insert_many([{
+        'hotel_id': doc['hotel_id'],
+        'booking_id': str(doc['_id']),
+        'user_id': doc['user_id'],
+        'amount': float(doc['total_price']),
+        'payment_method': 'card',
+        'status': 'completed',
+        'created_at': doc['created_at']
+    } for doc in docs[:bookings // 2]])
+    return rooms, users, docs, groups
+
+
+def create_indexes(uri):
+    """Build the indexes exactly as the application does at startup"""
+    from app import create_app
+
+    class CheckConfig(Config):
+        MONGO_URI = uri
+        ADMISSION_CONTROL_ENABLED = False
+        PAYMENT_WORKERS = 0
+        WAITLIST_SWEEP_SECONDS = 0
+
+    create_app(CheckConfig)
+
+
+def query_shapes(db, rooms, users, docs, groups):
+    """
+    (label, call, full_scan) for every query shape, at the first property;
+    full_scan marks intended whole-property reads
+    """
+    hotel_id = HOTELS[0]
+    room_model = Room(db.rooms).for_hotel(hotel_id)
+    booking_model = Booking(db.bookings).for_hotel(hotel_id)
+    user_model = User(db.users)
+    payments = PaymentWorkerPool(db, None, workers=0)
+    login_audit = LoginAudit(db)
+    waitlist = Waitlist(db, None).for_hotel(hotel_id)
+
+    hotel_rooms = [room for room in rooms if room['hotel_id'] == hotel_id]
+    room_id = str(hotel_rooms[0]['_id'])
+    room_ids = [str(room['_id']) for room in hotel_rooms[:20]]
+    booking = next(doc for doc in docs if doc['hotel_id'] == hotel_id)
+    user_id = booking['user_id']
+    booking_id = str(booking['_id'])
+    group_id = str(groups[0]['_id'])
+    start, end = day(30), day(33)
+    throwaway = {'user_id': user_id, 'room_id': room_id, 'checkin_date': day(400), 'checkout_date': day(401)}
+
+    return [
+        ('Room.get_all_rooms', lambda: room_model.get_all_rooms(), True),
+        ('Room.count_rooms', room_model.count_rooms, True),
+        ('Room.get_hotel_ids', Room(db.rooms).get_hotel_ids, False),
+        ('Room.get_available_rooms', lambda: room_model.get_available_rooms(), False),
+        ('Room.get_room_records (all)', lambda: room_model.get_room_records(), True),
+        ('Room.get_room_records (ids)', lambda: room_model.get_room_records(room_ids), False),
+        ('Room.search_rooms', lambda: room_model.search_rooms(
+            {'status': 'available', 'types': ['deluxe', 'suite'], 'min_capacity': 2, 'max_price': 9000},
+            {'price': 1}, 0, 20, Config.ROOM_SEARCH_PRICE_BUCKETS), False),
+        ('Room.search_rooms (amenities)', lambda: room_model.search_rooms(
+            {'amenities': ['WiFi', 'Balcony']}, {'price': -1}, 0, 20, Config.ROOM_SEARCH_PRICE_BUCKETS), False),
+        ('Room.get_room_by_id', lambda: room_model.get_room_by_id(room_id), False),
+        ('Room.get_room_record', lambda: room_model.get_room_record(room_id), False),
+        ('Room.get_rooms_by_ids', lambda: room_model.get_rooms_by_ids(room_ids), False),
+        ('Room.update_room_status', lambda: room_model.update_room_status(room_id, hotel_rooms[0]['status']), False),
+        ('Room.mark_room_needs_cleaning', lambda: room_model.mark_room_needs_cleaning(room_id), False),
+        ('Room.mark_room_clean', lambda: room_model.mark_room_clean(room_id), False),
+        ('Room.get_rooms_needing_cleaning', room_model.get_rooms_needing_cleaning, False),
+        ('Booking.get_booking_by_id', lambda: booking_model.get_booking_by_id(booking_id), False),
+        ('Booking.get_user_bookings', lambda: booking_model.get_user_bookings(user_id, include_archived=True), False),
+        ('Booking.get_all_bookings', lambda: booking_model.get_all_bookings(), True),
+        ('Booking.check_room_availability', lambda: booking_model.check_room_availability(room_id, start, end), False),
+        ('Booking.get_bookings_in_range', lambda: booking_model.get_bookings_in_range(start, end), False),
+        ('Booking.get_bookings_in_range (rooms)', lambda: booking_model.get_bookings_in_range(start, end, room_ids), False),
+        ('Booking.update_booking_status', lambda: booking_model.update_booking_status(booking_id, 'confirmed'), False),
+        ('Booking.delete_booking', lambda: booking_model.delete_booking(
+            str(booking_model.create_booking(dict(throwaway))['_id']), user_id, room_id=room_id), False),
+        ('Booking.create_group_booking', lambda: booking_model.create_group_booking(
+            {'checkin_date': day(500), 'checkout_date': day(502)},
+            [{'room_id': rid, 'checkin_date': day(500), 'checkout_date': day(502)} for rid in room_ids[:2]]), False),
+        ('Booking.get_group_by_id', lambda: booking_model.get_group_by_id(group_id), False),
+        ('Booking.update_group_status', lambda: booking_model.update_group_status(group_id, 'confirmed'), False),
+        ('Booking.get_group_room_ids', lambda: booking_model.get_group_room_ids(group_id), False),
+        ('Booking.archive_completed', lambda: booking_model.archive_completed(day(-700), batch_size=100), False),
+        ('User.find_by_email', lambda: user_model.find_by_email(users[5]['email']), False),
+        ('User.find_by_id', lambda: user_model.find_by_id(str(users[5]['_id'])), False),
+        ('User.get_user_records', lambda: user_model.get_user_records([str(user['_id']) for user in users[:50]]), False),
+        ('User.get_all_users', lambda: user_model.get_all_users(limit=100), False),
+        ('User.get_all_users (after)', lambda: user_model.get_all_users(limit=100, after=str(users[1500]['_id'])), False),
+        ('User.update_user', lambda: user_model.update_user(str(users[5]['_id']), {'phone': '555'}), False),
+        ('User.bump_token_generation', lambda: user_model.bump_token_generation(str(users[5]['_id'])), False),
+        ('PaymentWorkerPool.enqueue', lambda: payments.enqueue(booking_id, False, user_id, 100.0, 'card', hotel_id), False),
+        ('PaymentWorkerPool.claim', payments.claim, False),
+        ('Booking.get_expired_holds', booking_model.get_expired_holds, False),
+        ('Waitlist.candidates', lambda: waitlist.candidates(room_id, hotel_rooms[0]['type'], start, end), False),
+        ('Waitlist.user_entries', lambda: waitlist.user_entries(user_id), False),
+        ('LoginAudit.hourly_counts', lambda: login_audit.hourly_counts(
+            datetime.utcnow() - timedelta(days=7), datetime.utcnow(), 'staff'), False),
+        # Same shape as GET /api/feedback
+        ('route feedback list', lambda: list(for_catalog(db.feedback).find(
+            {'hotel_id': hotel_id}).sort('created_at', -1).limit(50)), False),
+        ('route payments export', lambda: list(for_catalog(db.payments).find(
+            dict({'hotel_id': hotel_id}, **date_range('created_at', day(-90), day(0)))).sort('created_at', 1)), False),
+    ]
+
+
+def walk(node, skip=('rejectedPlans', 'allPlansExecution')):
+    """Every dict inside an explain document, outside rejected plans"""
+    if isinstance(node, dict):
+        yield node
+        for key, value in node.items():
+            if key not in skip:
+                yield from walk(value, skip)
+    elif isinstance(node, list):
+        for value in node:
+            yield from walk(value, skip)
+
+
+def summarize(explain):
+    """Stages, indexes and document counts of an executionStats explain"""
+    stages, indexes = [], []
+    examined = keys = returned = 0
+    for node in walk(explain):
+        stage = node.get('stage')
+        if stage and stage not in stages:
+            stages.append(stage)
+        if node.get('indexName') and node['indexName'] not in indexes:
+            indexes.append(node['indexName'])
+        if 'totalDocsExamined' in node:
+            examined = max(examined, node['totalDocsExamined'])
+            keys = max(keys, node.get('totalKeysExamined', 0))
+        for field in ('nReturned', 'nCounted', 'nMatched', 'nWouldDelete'):
+            if isinstance(node.get(field), int):
+                returned = max(returned, node[field])
+    return stages, indexes, keys, examined, returned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='easestay_plan_check', help='scratch database (dropped and reseeded)')
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--max-ratio', type=float, default=10.0, help='max documents examined per document returned')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    uri = urlunsplit(urlsplit(Config.MONGO_URI)._replace(path='/' + args.database))
+    recorder = CommandRecorder()
+    client = MongoClient(uri, event_listeners=[recorder], **Config.mongo_client_options())
+    failures = 0
+    try:
+        db = client[args.database]
+        print(f"Seeding {args.database} with {args.bookings} bookings...")
+        rooms, users, docs, groups = seed(db, args.bookings, random.Random(args.seed))
+        create_indexes(uri)
+
+        print(f"{'query shape':44} {'plan':48} {'keys':>7} {'docs':>7} {'ret':>6} {'ratio':>7}  result")
+        for label, call, full_scan in query_shapes(db, rooms, users, docs, groups):
+            recorder.commands.clear()
+            recorder.recording = True
+            try:
+                call()
+            finally:
+                recorder.recording = False
+
+            for database, name, command in recorder.commands:
+                explain = client[database].command('explain', command, verbosity='executionStats')
+                stages, indexes, keys, examined, returned = summarize(explain)
+                ratio = examined / max(returned, 1)
+
+                problems = []
+                if 'COLLSCAN' in stages and not full_scan:
+                    problems.append('COLLSCAN')
+                if not full_scan and examined >= MIN_EXAMINED and ratio > args.max_ratio:
+                    problems.append(f'ratio > {args.max_ratio:g}')
+                failures += bool(problems)
+
+                plan = ' '.join(indexes) or ('COLLSCAN' if 'COLLSCAN' in stages else stages[0] if stages else '?')
+                if 'SORT' in stages:
+                    plan += ' +SORT'
+                result = 'FAIL ' + ', '.join(problems) if problems else ('ok (full scan)' if full_scan else 'ok')
+                print(f"{label[:44]:44} {name + ' ' + plan:48.48} {keys:7} {examined:7} {returned:6} {ratio:7.1f}  {result}")
+    finally:
+        client.drop_database(args.database)
+        client.close()
+
+    if failures:
+        print(f"\n{failures} query shape(s) regressed")
+        sys.exit(1)
+    print("\nAll query shapes use an index within the examined/returned limit")
+
+
+if __name__ == '__main__':
+    main()
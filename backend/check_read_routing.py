@@ -0,0 +1,61 @@
+"""
+Read routing check: show which server and read concern each model read uses
+Run against a replica set (see README): python check_read_routing.py
+"""
+from pymongo import MongoClient, monitoring
+from config import Config
+from models.booking_model import Booking
+from models.room_model import Room
+from services.read_routing import for_catalog
+
+class ReadRecorder(monitoring.CommandListener):
+    """Remember the server address and read concern of every find/count/aggregate"""
+
+    def __init__(self):
+        self.reads = []
+
+    def started(self, event):
+        if event.command_name in ('find', 'aggregate', 'count'):
+            read_concern = event.command.get('readConcern', {}).get('level', 'default')
+            self.reads.append((event.command_name, '%s:%s' % event.connection_id, read_concern))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def main():
+    """Main check function"""
+    recorder = ReadRecorder()
+    client = MongoClient(Config.MONGO_URI, event_listeners=[recorder], **Config.mongo_client_options())
+    try:
+        db = client.get_default_database()
+        hello = db.command('hello')
+        if 'setName' not in hello:
+            print("Connected to a standalone server: every read goes to it.")
+            print("Start mongod with --replSet rs0 and add ?replicaSet=rs0 to MONGO_URI to check routing.")
+        else:
+            print(f"Replica set {hello['setName']}: primary {hello.get('primary')}, hosts {hello.get('hosts')}")
+
+        room_model = Room(db.rooms)
+        booking_model = Booking(db.bookings)
+        checks = [
+            ('catalog   rooms list', lambda: room_model.get_all_rooms(('_id',))),
+            ('catalog   feedback list', lambda: list(for_catalog(db.feedback).find({}).limit(1))),
+            ('catalog   occupancy (pricing)', lambda: booking_model.get_bookings_in_range('2000-01-01', '2000-01-02', stale_ok=True)),
+            ('critical  overlap check', lambda: booking_model.check_room_availability('000000000000000000000000', '2000-01-01', '2000-01-02')),
+            ('critical  payment lookup', lambda: booking_model.get_booking_by_id('000000000000000000000000')),
+        ]
+
+        print(f"{'read':32} {'server':24} read concern")
+        for label, read in checks:
+            recorder.reads.clear()
+            read()
+            for _, server, read_concern in recorder.reads:
+                print(f"{label:32} {server:24} {read_concern}")
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -2,17 +2,201 @@ import os
 from datetime import timedelta
 
 class Config:
+    # Storage engine: 'mongo', or 'memory' to keep everything in-process
+    # (development and benchmarks only: data is lost on restart and not shared between workers)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+    
     # MongoDB Configuration
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/easestay')
     
+    # MongoDB connection pool (per worker process)
+    # Keep MONGO_MAX_POOL_SIZE >= threads per worker so requests do not queue for a socket
+    MONGO_MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+    MONGO_MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '30000'))
+    
+    # Read routing (effective on a replica set; a standalone server serves everything)
+    # Catalog reads (rooms, feedback, reports) may go to secondaries with bounded staleness
+    CATALOG_READ_PREFERENCE = os.getenv('CATALOG_READ_PREFERENCE', 'secondaryPreferred')
+    CATALOG_MAX_STALENESS_SECONDS = int(os.getenv('CATALOG_MAX_STALENESS_SECONDS', '90'))  # MongoDB minimum is 90
+    CATALOG_READ_CONCERN = os.getenv('CATALOG_READ_CONCERN', 'local')
+    # Booking critical reads (overlap check, payment lookup) and writes stay on the primary
+    CRITICAL_READ_CONCERN = os.getenv('CRITICAL_READ_CONCERN', 'majority')
+    CRITICAL_WRITE_CONCERN = os.getenv('CRITICAL_WRITE_CONCERN', 'majority')
+    
+    # Request coalescing for hot GET endpoints (rooms, feedback)
+    # Identical concurrent requests always share one execution; a finished
+    # response is also reused for this many seconds (0 = only while in flight)
+    COALESCE_TTL_SECONDS = float(os.getenv('COALESCE_TTL_SECONDS', '1'))
+    
+    # Admission control (per worker process)
+    # Requests are grouped into classes; lower priority numbers are served first
+    # when slots free up. A class whose queue is full, or whose request waited
+    # longer than its timeout (seconds), gets 503 with Retry-After.
+    ADMISSION_CONTROL_ENABLED = os.getenv('ADMISSION_CONTROL_ENABLED', 'True').lower() == 'true'
+    ADMISSION_CAPACITY = int(os.getenv('ADMISSION_CAPACITY', os.getenv('GUNICORN_THREADS', '8')))
+    ADMISSION_CLASSES = {
+        'payment': {'priority': 0, 'limit': 8, 'queue': 64, 'timeout': 10},
+        'booking': {'priority': 1, 'limit': 8, 'queue': 64, 'timeout': 5},
+        'browse': {'priority': 2, 'limit': 6, 'queue': 32, 'timeout': 2},
+        'admin_export': {'priority': 3, 'limit': 2, 'queue': 4, 'timeout': 1}
+    }
+    # Endpoint or blueprint name -> class (None = not limited)
+    ADMISSION_ROUTES = {
+        'payment': 'payment',
+        'payment.payment_status': 'browse',
+        'payment.payment_status_stream': None,  # long-lived SSE streams
+        'bookings': 'booking',
+        'bookings.get_user_bookings': 'browse',
+        'bookings.get_all_bookings': 'admin_export',
+        'waitlist': 'booking',
+        'waitlist.get_waitlist': 'browse',
+        'exports': 'admin_export',
+        'batch.run_batch': None,  # each sub-request is admitted on its own
+        'auth': 'booking',
+        'events': None,      # long-lived SSE streams
+        'metrics': None,     # must stay reachable under overload
+        'health_check': None
+    }
+    ADMISSION_DEFAULT_CLASS = 'browse'
+    ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', '1'))
+    # Adaptive mode: scale limits by target / observed Mongo command latency (EWMA)
+    ADMISSION_ADAPTIVE = os.getenv('ADMISSION_ADAPTIVE', 'True').lower() == 'true'
+    ADMISSION_LATENCY_TARGET_MS = float(os.getenv('ADMISSION_LATENCY_TARGET_MS', '50'))
+    ADMISSION_MIN_FRACTION = float(os.getenv('ADMISSION_MIN_FRACTION', '0.25'))
+    
+    # Login throttling: failed attempts per email / client IP in a sliding window
+    # 'memory' counts per worker process; 'mongo' shares counts through TTL collections
+    LOGIN_THROTTLE_BACKEND = os.getenv('LOGIN_THROTTLE_BACKEND', 'memory')
+    LOGIN_THROTTLE_WINDOW_SECONDS = int(os.getenv('LOGIN_THROTTLE_WINDOW_SECONDS', '300'))
+    LOGIN_MAX_FAILURES_PER_EMAIL = int(os.getenv('LOGIN_MAX_FAILURES_PER_EMAIL', '5'))
+    LOGIN_MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', '50'))
+    # Lockout doubles on every repeat within LOGIN_LOCKOUT_RESET_SECONDS: 30s, 60s, 120s ... 1h
+    LOGIN_LOCKOUT_BASE_SECONDS = int(os.getenv('LOGIN_LOCKOUT_BASE_SECONDS', '30'))
+    LOGIN_LOCKOUT_MAX_SECONDS = int(os.getenv('LOGIN_LOCKOUT_MAX_SECONDS', '3600'))
+    LOGIN_LOCKOUT_RESET_SECONDS = int(os.getenv('LOGIN_LOCKOUT_RESET_SECONDS', '86400'))
+    # Take the client IP from X-Forwarded-For (only behind a trusted reverse proxy)
+    TRUST_PROXY_HEADERS = os.getenv('TRUST_PROXY_HEADERS', 'False').lower() == 'true'
+    
+    # User directory: per-process LRU of user summaries used for joins
+    USER_DIRECTORY_SIZE = int(os.getenv('USER_DIRECTORY_SIZE', '10000'))
+    USER_DIRECTORY_TTL_SECONDS = int(os.getenv('USER_DIRECTORY_TTL_SECONDS', '300'))
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    # Access tokens are short-lived; clients renew them at /api/token/refresh
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('JWT_ACCESS_TOKEN_MINUTES', '15')))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('JWT_REFRESH_TOKEN_DAYS', '30')))
+    # How often each process pulls new revocations (logouts) from MongoDB
+    TOKEN_REVOCATION_SYNC_SECONDS = int(os.getenv('TOKEN_REVOCATION_SYNC_SECONDS', '5'))
     
     # CORS Configuration
     CORS_ORIGINS = ['http://localhost:5000', 'http://127.0.0.1:5000', 'http://localhost:5500', 'http://127.0.0.1:5500']
     
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-    DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
-
+    DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    
+    # Dynamic Pricing Configuration
+    # Multipliers applied to a room's base price for each night of a stay
+    PRICING_WEEKDAY_MULTIPLIERS = [1.0, 1.0, 1.0, 1.0, 1.1, 1.15, 1.0]  # Monday first
+    PRICING_SEASONS = [
+        ('04-15', '06-15', 1.15),  # Summer holidays
+        ('10-15', '11-15', 1.2),   # Festive season
+        ('12-20', '01-05', 1.3)    # Year end
+    ]
+    PRICING_OCCUPANCY_TIERS = [
+        (0.7, 1.1),   # 70%+ of rooms booked
+        (0.9, 1.25)   # 90%+ of rooms booked
+    ]
+    
+    # Room Allocation Configuration (booking by room type)
+    ALLOCATOR_GAP_HORIZON_DAYS = 14  # How far around a stay to look when scoring calendar gaps
+    ALLOCATOR_INVENTORY_TTL = 60     # Seconds to cache the per-type room inventory
+    GROUP_BOOKING_MAX_ROOMS = 20
+    
+    # Room Search Configuration
+    ROOM_SEARCH_MAX_LIMIT = 100
+    ROOM_SEARCH_PRICE_BUCKETS = [0, 4000, 6000, 8000, 10000, 15000]  # Facet bucket lower bounds; the last bucket is open-ended
+    
+    # Booking Archive Configuration
+    # Bookings that checked out more than this many days ago move to bookings_archive
+    ARCHIVE_HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '90'))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+    
+    # Batch / Bootstrap Configuration
+    BATCH_MAX_REQUESTS = 20
+    BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', '4'))  # Concurrent sub-requests / bootstrap reads per process
+    
+    # Admin Export Configuration
+    # Rows fetched per cursor batch and encoded per streamed chunk
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+    EXPORT_MAX_BATCH_SIZE = 10000
+    
+    # Login Audit Configuration
+    # user_login_logs is a time-series collection; raw logins expire after the retention
+    # window, the hourly per-role counts behind /admin/login-stats are kept longer
+    LOGIN_LOG_RETENTION_DAYS = int(os.getenv('LOGIN_LOG_RETENTION_DAYS', '90'))
+    LOGIN_LOG_GRANULARITY = os.getenv('LOGIN_LOG_GRANULARITY', 'hours')  # Bucket span: seconds, minutes or hours
+    LOGIN_ROLLUP_RETENTION_DAYS = int(os.getenv('LOGIN_ROLLUP_RETENTION_DAYS', '400'))
+    LOGIN_STATS_MAX_DAYS = 92
+    
+    # Payment Processing Configuration
+    # POST /payment queues an intent; PAYMENT_WORKERS threads per API process (0 = only
+    # python payment_worker.py processes) charge it through PAYMENT_GATEWAY
+    PAYMENT_GATEWAY = os.getenv('PAYMENT_GATEWAY', 'stub')
+    PAYMENT_WORKERS = int(os.getenv('PAYMENT_WORKERS', '4'))
+    PAYMENT_MAX_ATTEMPTS = int(os.getenv('PAYMENT_MAX_ATTEMPTS', '5'))
+    PAYMENT_RETRY_BASE_SECONDS = float(os.getenv('PAYMENT_RETRY_BASE_SECONDS', '2'))  # Doubles after each failed attempt
+    PAYMENT_LEASE_SECONDS = int(os.getenv('PAYMENT_LEASE_SECONDS', '60'))  # Another worker takes over after this
+    PAYMENT_POLL_SECONDS = float(os.getenv('PAYMENT_POLL_SECONDS', '1'))
+    # Stub gateway: simulated latency, temporary failure rate and an amount that is always declined
+    PAYMENT_STUB_LATENCY_SECONDS = float(os.getenv('PAYMENT_STUB_LATENCY_SECONDS', '1'))
+    PAYMENT_STUB_FAILURE_RATE = float(os.getenv('PAYMENT_STUB_FAILURE_RATE', '0'))
+    PAYMENT_STUB_DECLINE_AMOUNT = float(os.getenv('PAYMENT_STUB_DECLINE_AMOUNT')) if os.getenv('PAYMENT_STUB_DECLINE_AMOUNT') else None
+    
+    # Cancellation Waitlist Configuration
+    # Freed rooms become pending holds for waitlisted guests, who have WAITLIST_HOLD_MINUTES
+    # to pay; the sweeper (every WAITLIST_SWEEP_SECONDS, 0 = off) expires overdue holds
+    WAITLIST_HOLD_MINUTES = int(os.getenv('WAITLIST_HOLD_MINUTES', '60'))
+    WAITLIST_SWEEP_SECONDS = float(os.getenv('WAITLIST_SWEEP_SECONDS', '30'))
+    WAITLIST_MAX_PER_USER = int(os.getenv('WAITLIST_MAX_PER_USER', '10'))
+    WAITLIST_SCAN_LIMIT = 50  # Overlapping entries checked per freed booking
+    # Hold on regular /book bookings until payment (0 = pending bookings never expire)
+    BOOKING_PENDING_HOLD_MINUTES = int(os.getenv('BOOKING_PENDING_HOLD_MINUTES', '0'))
+    
+    # Multi-property Configuration
+    # Requests pick a property with the X-Hotel-Id header (or hotel_id query parameter);
+    # those naming none, and documents from before properties, belong to DEFAULT_HOTEL_ID
+    DEFAULT_HOTEL_ID = os.getenv('DEFAULT_HOTEL_ID', 'main')
+    # Properties requests may name (comma-separated); empty = DEFAULT_HOTEL_ID plus every
+    # property that has rooms, reloaded at most every HOTEL_IDS_REFRESH_SECONDS on a miss
+    HOTEL_IDS = [h.strip() for h in os.getenv('HOTEL_IDS', '').split(',') if h.strip()]
+    HOTEL_IDS_REFRESH_SECONDS = float(os.getenv('HOTEL_IDS_REFRESH_SECONDS', '10'))
+    
+    # Transactional Outbox Configuration
+    # Booking and payment changes are recorded in the outbox collection; a relay
+    # (in-process when OUTBOX_RELAY_ENABLED, or python outbox_relay.py) delivers them to OUTBOX_SINKS
+    OUTBOX_RELAY_ENABLED = os.getenv('OUTBOX_RELAY_ENABLED', 'False').lower() == 'true'
+    OUTBOX_SINKS = os.getenv('OUTBOX_SINKS', 'log')  # Comma-separated: log, jsonl
+    OUTBOX_JSONL_PATH = os.getenv('OUTBOX_JSONL_PATH', 'outbox_events.jsonl')
+    OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '100'))
+    OUTBOX_POLL_SECONDS = float(os.getenv('OUTBOX_POLL_SECONDS', '1'))
+    OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', '30'))
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))  # Failed deliveries before an event is parked
+    OUTBOX_RETENTION_HOURS = int(os.getenv('OUTBOX_RETENTION_HOURS', '72'))  # Delivered events expire after this
+    
+    @classmethod
+    def mongo_client_options(cls):
+        """Keyword arguments for MongoClient built from the pool settings above"""
+        return {
+            'maxPoolSize': cls.MONGO_MAX_POOL_SIZE,
+            'minPoolSize': cls.MONGO_MIN_POOL_SIZE,
+            'waitQueueTimeoutMS': cls.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            'serverSelectionTimeoutMS': cls.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            'connectTimeoutMS': cls.MONGO_CONNECT_TIMEOUT_MS,
+            'socketTimeoutMS': cls.MONGO_SOCKET_TIMEOUT_MS
+        }
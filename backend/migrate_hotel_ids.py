@@ -0,0 +1,58 @@
+"""
+Migration: assign documents written before multi-property support to DEFAULT_HOTEL_ID
+Run once from the backend directory: python migrate_hotel_ids.py [--hotel-id ID] [--drop-old-indexes]
+"""
+import argparse
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from config import Config
+
+# Collections partitioned by hotel_id
+COLLECTIONS = ('rooms', 'bookings', 'booking_groups', 'bookings_archive', 'payments',
+               'payment_intents', 'feedback', 'waitlist')
+
+# Indexes replaced by ones led by hotel_id (the API creates those on startup)
+OLD_INDEXES = {
+    'rooms': ('status_1_type_1_price_1', 'status_1_price_1', 'status_1_capacity_1',
+              'amenities_1_price_1', 'needs_cleaning_1', 'room_text'),
+    'bookings': ('room_id_1_checkout_date_1_checkin_date_1', 'checkout_date_1_checkin_date_1',
+                 'user_id_1_created_at_-1', 'group_id_1', 'status_1_hold_expires_at_1', 'created_at_1'),
+    'bookings_archive': ('user_id_1_created_at_-1', 'created_at_1'),
+    'payments': ('created_at_1',),
+    'payment_intents': ('booking_id_1_status_1',),
+    'feedback': ('created_at_-1',),
+    'waitlist': ('status_1_target_1_checkin_date_1_checkout_date_1', 'user_id_1_status_1')
+}
+
+def main():
+    """Main migration function"""
+    parser = argparse.ArgumentParser(description='Set hotel_id on documents that have none')
+    parser.add_argument('--hotel-id', default=Config.DEFAULT_HOTEL_ID,
+                        help='Property the existing documents belong to')
+    parser.add_argument('--drop-old-indexes', action='store_true',
+                        help='Drop the indexes that hotel_id-led ones replaced')
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client.get_default_database()
+        for name in COLLECTIONS:
+            # Intents queued before the upgrade store hotel_id None rather than no field
+            result = db[name].update_many({'hotel_id': None}, {'$set': {'hotel_id': args.hotel_id}})
+            print(f"{name}: assigned {result.modified_count} documents to {args.hotel_id}")
+        
+        if args.drop_old_indexes:
+            for name, indexes in OLD_INDEXES.items():
+                existing = db[name].index_information()
+                for index in indexes:
+                    if index in existing:
+                        try:
+                            db[name].drop_index(index)
+                            print(f"{name}: dropped {index}")
+                        except OperationFailure as e:
+                            print(f"{name}: could not drop {index}: {e}")
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
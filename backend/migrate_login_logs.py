@@ -0,0 +1,76 @@
+"""
+Migration: move login logs from a regular user_login_logs collection into the time-series layout
+Run once from the backend directory, with the API stopped: python migrate_login_logs.py [--drop-legacy]
+"""
+import argparse
+from datetime import datetime, timedelta
+from pymongo import MongoClient
+from config import Config
+from services.login_audit import LOG_COLLECTION, LoginAudit, ensure_login_log_collection, ensure_rollup_indexes
+
+LEGACY_COLLECTION = LOG_COLLECTION + '_legacy'
+
+def main():
+    """Main migration function"""
+    parser = argparse.ArgumentParser(description='Convert user_login_logs to a time-series collection')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--drop-legacy', action='store_true',
+                        help='Drop the old collection once its logs are copied')
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client.get_default_database()
+        info = next(iter(db.list_collections(filter={'name': LOG_COLLECTION})), None)
+        if info and info.get('type') == 'timeseries':
+            print(f"{LOG_COLLECTION} is already a time-series collection")
+            return
+        
+        if info:
+            db[LOG_COLLECTION].rename(LEGACY_COLLECTION)
+        kind = ensure_login_log_collection(db, Config.LOGIN_LOG_RETENTION_DAYS, Config.LOGIN_LOG_GRANULARITY)
+        if kind != 'timeseries':
+            print("This server does not support time-series collections (MongoDB 5.0+ required)")
+            if info:
+                db[LEGACY_COLLECTION].rename(LOG_COLLECTION, dropTarget=True)
+            return
+        ensure_rollup_indexes(db)
+        
+        # Logs already past the retention window would be expired straight away: skip them
+        logs, legacy = db[LOG_COLLECTION], db[LEGACY_COLLECTION]
+        copied, batch = 0, []
+        first = last = None
+        cutoff = datetime.utcnow() - timedelta(days=Config.LOGIN_LOG_RETENTION_DAYS)
+        for doc in legacy.find({'login_time': {'$gte': cutoff}}).sort('login_time', 1):
+            batch.append({
+                'login_time': doc['login_time'],
+                'meta': {'user_id': doc.get('user_id'), 'role': doc.get('role', 'guest')},
+                'email': doc.get('email', ''),
+                'ip_address': doc.get('ip_address'),
+                'user_agent': doc.get('user_agent', '')
+            })
+            first = first or doc['login_time']
+            last = doc['login_time']
+            if len(batch) >= args.batch_size:
+                logs.insert_many(batch, ordered=False)
+                copied += len(batch)
+                batch = []
+        if batch:
+            logs.insert_many(batch, ordered=False)
+            copied += len(batch)
+        print(f"Copied {copied} login logs into the time-series collection")
+        
+        if first:
+            rows = LoginAudit(db, Config.LOGIN_ROLLUP_RETENTION_DAYS).rebuild_hourly_counts(first, last + timedelta(hours=1))
+            print(f"Rebuilt {rows} hourly login counts")
+        
+        if args.drop_legacy and info:
+            legacy.drop()
+            print(f"Dropped {LEGACY_COLLECTION}")
+        elif info:
+            print(f"The original logs remain in {LEGACY_COLLECTION}")
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
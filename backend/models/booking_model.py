@@ -1,64 +1,162 @@
 from datetime import datetime
 from bson import ObjectId
+from services.events import publish_local
+from services.outbox import event_payload, outbox_event
+from models.records import BookingRecord
+from storage.base import BookingRepository
+from storage.mongo import MongoBookingRepository
 
 class Booking:
     def __init__(self, db_collection):
-        self.collection = db_collection
+        # A MongoDB collection, or a repository from another storage engine
+        self.repo = db_collection if isinstance(db_collection, BookingRepository) else MongoBookingRepository(db_collection)
+    
+    def for_hotel(self, hotel_id):
+        """The same model limited to one property's bookings"""
+        return Booking(self.repo.for_hotel(hotel_id))
+    
+    @property
+    def hotel_id(self):
+        """The property this model is limited to (None: every property)"""
+        return self.repo.hotel_id
+    
+    def ensure_indexes(self):
+        """Create the indexes behind the overlap checks, date-range scans and per-user lists"""
+        self.repo.ensure_indexes()
     
     def create_booking(self, booking_data):
         """Create a new booking"""
         booking_data['created_at'] = datetime.utcnow()
         booking_data['status'] = booking_data.get('status', 'pending')
         
-        result = self.collection.insert_one(booking_data)
-        booking_data['_id'] = result.inserted_id
+        booking_id = self.repo.insert(booking_data, events=lambda booking_id: [
+            outbox_event('booking.created', booking_id, event_payload(booking_data))
+        ])
+        booking_data['_id'] = booking_id
+        publish_local('booking', 'insert', booking_id, booking_data, hotel_id=self.repo.hotel_id)
         return booking_data
     
+    def create_group_booking(self, group_data, items):
+        """
+        Create a parent group booking and its line items all-or-nothing.
+        Returns None, creating nothing, if another booking already holds or
+        wins the race for any of the rooms.
+        """
+        group_id = ObjectId()
+        now = datetime.utcnow()
+        
+        for item in items:
+            item['group_id'] = str(group_id)
+            item['created_at'] = now
+            item['status'] = item.get('status', 'pending')
+        
+        group_data['_id'] = group_id
+        group_data['created_at'] = now
+        group_data['status'] = group_data.get('status', 'pending')
+        if not self.repo.insert_group(group_data, items, events=lambda _: [
+            outbox_event('booking_group.created', group_id, event_payload(group_data))
+        ] + [
+            outbox_event('booking.created', item['_id'], event_payload(item)) for item in items
+        ]):
+            return None
+        
+        for item in items:
+            publish_local('booking', 'insert', item['_id'], item, hotel_id=self.repo.hotel_id)
+        
+        group_data['items'] = items
+        return group_data
+    
+    def get_group_by_id(self, group_id):
+        """Get a group booking by ID"""
+        try:
+            return self.repo.get_group(group_id)
+        except:
+            return None
+    
+    def get_group_room_ids(self, group_id):
+        """Get the room ids of a group booking's line items"""
+        return self.repo.group_room_ids(group_id)
+    
+    def update_group_status(self, group_id, status):
+        """Update the status of a group booking and all of its line items"""
+        try:
+            update_data = {
+                'status': status,
+                'updated_at': datetime.utcnow()
+            }
+            
+            # If status is confirmed, also update payment_status
+            if status == 'confirmed':
+                update_data['payment_status'] = 'completed'
+            
+            updated, item_ids = self.repo.update_group(
+                group_id, update_data, events=lambda _: self._group_status_events(group_id, update_data)
+            )
+            for item_id in item_ids:
+                publish_local('booking', 'update', item_id, update_data, hotel_id=self.repo.hotel_id)
+            return updated
+        except:
+            return False
+    
+    def _group_status_events(self, group_id, update_data):
+        """Outbox events for a group status change: one for the group and one per line item"""
+        group = self.repo.get_group(group_id) or {}
+        return [outbox_event('booking_group.status_changed', group_id, update_data)] + [
+            outbox_event('booking.status_changed', item_id, update_data) for item_id in group.get('item_ids', [])
+        ]
+    
     def get_booking_by_id(self, booking_id):
         """Get booking by ID"""
         try:
-            return self.collection.find_one({'_id': ObjectId(booking_id)})
+            return self.repo.get(booking_id)
         except:
             return None
     
-    def get_user_bookings(self, user_id):
+    def _find_sorted(self, user_id, include_archived):
+        """Find bookings newest first as BookingRecords, optionally merging in the archive"""
+        return BookingRecord.from_cursor(self.repo.find_sorted(user_id, include_archived, BookingRecord.FIELDS))
+    
+    def get_user_bookings(self, user_id, include_archived=False):
         """Get all bookings for a user"""
         try:
-            bookings = list(self.collection.find({'user_id': user_id}).sort('created_at', -1))
-            return bookings
+            return self._find_sorted(user_id, include_archived)
         except:
             return []
     
-    def get_all_bookings(self):
+    def get_all_bookings(self, include_archived=False):
         """Get all bookings (for admin)"""
-        bookings = list(self.collection.find({}).sort('created_at', -1))
-        return bookings
+        return self._find_sorted(None, include_archived)
+    
+    def archive_completed(self, checkout_before, batch_size=1000):
+        """
+        Move bookings with checkout_date before the given YYYY-MM-DD date into
+        the archive, one batch at a time; safe to repeat after an interrupted
+        run. Returns the number of bookings moved.
+        """
+        return self.repo.archive_before(checkout_before, batch_size)
     
     def check_room_availability(self, room_id, checkin_date, checkout_date):
         """Check if room is available for given dates"""
-        from datetime import datetime
+        # Malformed dates raise ValueError instead of silently matching nothing
+        datetime.strptime(checkin_date, '%Y-%m-%d')
+        datetime.strptime(checkout_date, '%Y-%m-%d')
         
-        checkin = datetime.strptime(checkin_date, '%Y-%m-%d')
-        checkout = datetime.strptime(checkout_date, '%Y-%m-%d')
-        
-        # Find overlapping bookings
-        # A booking overlaps if:
-        # - checkin_date is before checkout AND checkout_date is after checkin
-        overlapping = self.collection.find_one({
-            'room_id': room_id,
-            'status': {'$in': ['confirmed', 'pending']},
-            '$or': [
-                {
-                    'checkin_date': {'$lte': checkout_date},
-                    'checkout_date': {'$gte': checkin_date}
-                }
-            ]
-        })
-        
-        return overlapping is None
+        return not self.repo.has_overlap(room_id, checkin_date, checkout_date)
+    
+    def get_bookings_in_range(self, checkin_date, checkout_date, room_ids=None, stale_ok=False):
+        """
+        Get active bookings with at least one night inside [checkin_date, checkout_date).
+        Pass stale_ok=True for estimates (pricing, calendars) that may be served
+        by a secondary; room allocation keeps the default primary read.
+        """
+        bookings = self.repo.find_overlapping(
+            checkin_date, checkout_date, room_ids,
+            fields=('room_id', 'checkin_date', 'checkout_date'), stale_ok=stale_ok
+        )
+        return bookings
     
-    def update_booking_status(self, booking_id, status):
-        """Update booking status"""
+    def update_booking_status(self, booking_id, status, current=None):
+        """Update booking status (only from one of the current statuses, when given)"""
         try:
             update_data = {
                 'status': status,
@@ -69,25 +167,64 @@ class Booking:
             if status == 'confirmed':
                 update_data['payment_status'] = 'completed'
             
-            result = self.collection.update_one(
-                {'_id': ObjectId(booking_id)},
-                {'$set': update_data}
-            )
-            return result.modified_count > 0
+            updated = self.repo.update(booking_id, update_data, status=current, events=lambda _: [
+                outbox_event('booking.status_changed', booking_id, update_data)
+            ])
+            if updated:
+                publish_local('booking', 'update', booking_id, update_data, hotel_id=self.repo.hotel_id)
+            return updated
         except:
             return False
     
-    def delete_booking(self, booking_id, user_id=None):
-        """Delete a booking. If user_id is provided, only delete if booking belongs to that user."""
+    def expire_hold(self, booking_id):
+        """Expire a pending booking whose hold ran out, freeing its dates; False if it was paid or changed meanwhile"""
         try:
-            query = {'_id': ObjectId(booking_id)}
-            
-            # If user_id is provided, ensure booking belongs to that user
-            if user_id:
-                query['user_id'] = user_id
+            update_data = {
+                'status': 'expired',
+                'updated_at': datetime.utcnow()
+            }
             
-            result = self.collection.delete_one(query)
-            return result.deleted_count > 0
+            # A hold whose payment is in flight waits for the payment worker to settle it
+            updated = self.repo.update(
+                booking_id, update_data, status='pending', conditions={'payment_intent_id': None},
+                events=lambda _: [outbox_event('booking.status_changed', booking_id, update_data)]
+            )
+            if updated:
+                publish_local('booking', 'update', booking_id, update_data, hotel_id=self.repo.hotel_id)
+            return updated
+        except:
+            return False
+    
+    def start_payment(self, booking_id, intent_id):
+        """Mark a pending (or confirmed) booking as being paid by an intent, which keeps its hold from expiring"""
+        try:
+            return self.repo.update(booking_id, {'payment_intent_id': intent_id}, status=('pending', 'confirmed'))
+        except:
+            return False
+    
+    def end_payment(self, booking_id, intent_id):
+        """Clear a failed intent's mark so the booking's hold can expire again"""
+        try:
+            return self.repo.update(booking_id, {'payment_intent_id': None}, conditions={'payment_intent_id': intent_id})
+        except:
+            return False
+    
+    def get_expired_holds(self, now=None, limit=100):
+        """Pending bookings whose hold_expires_at has passed and that nobody is paying for, oldest expiry first"""
+        return self.repo.expired_holds(
+            now or datetime.utcnow(), limit,
+            fields=('room_id', 'room_type', 'checkin_date', 'checkout_date', 'hold_expires_at')
+        )
+    
+    def delete_booking(self, booking_id, user_id=None, room_id=None):
+        """Delete a booking. If user_id is provided, only delete if booking belongs to that user (room_id targets its shard)."""
+        try:
+            deleted = self.repo.delete(booking_id, user_id, events=lambda booking: [
+                outbox_event('booking.deleted', booking_id, event_payload(booking))
+            ], room_id=room_id)
+            if deleted:
+                publish_local('booking', 'delete', booking_id, hotel_id=self.repo.hotel_id)
+            return deleted is not None
         except:
             return False
 
@@ -0,0 +1,29 @@
+from datetime import datetime
+from services.outbox import event_payload, outbox_event
+from storage.base import PaymentRepository
+from storage.mongo import MongoPaymentRepository
+
+class Payment:
+    def __init__(self, db_collection):
+        # A MongoDB collection, or a repository from another storage engine
+        self.repo = db_collection if isinstance(db_collection, PaymentRepository) else MongoPaymentRepository(db_collection)
+    
+    def for_hotel(self, hotel_id):
+        """The same model limited to one property's payments"""
+        return Payment(self.repo.for_hotel(hotel_id))
+    
+    @property
+    def hotel_id(self):
+        """The property this model is limited to (None: every property)"""
+        return self.repo.hotel_id
+    
+    def create_payment(self, payment_data):
+        """Record a payment, with a payment.<status> outbox event"""
+        payment_data['created_at'] = payment_data.get('created_at', datetime.utcnow())
+        payment_data['status'] = payment_data.get('status', 'completed')
+        
+        payment_id = self.repo.insert(payment_data, events=lambda payment_id: [
+            outbox_event('payment.' + payment_data['status'], payment_id, event_payload(payment_data))
+        ])
+        payment_data['_id'] = payment_id
+        return payment_data
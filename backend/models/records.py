@@ -0,0 +1,72 @@
+from bson import ObjectId
+
+_MISSING = object()
+
+class Record:
+    """
+    Slotted value object built from a projected Mongo document.
+    Subclasses list the document fields they read in FIELDS and any
+    response-only fields in EXTRA. ObjectId values become strings once,
+    when the record is built; every other value is kept by reference.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    EXTRA = ()
+
+    @classmethod
+    def projection(cls, fields=None):
+        """Mongo projection for the given fields (default: all of FIELDS)"""
+        return {field: 1 for field in (fields or cls.FIELDS)}
+
+    @classmethod
+    def from_doc(cls, doc):
+        """Build a record from a document, skipping fields the document lacks"""
+        record = cls.__new__(cls)
+        for field in cls.FIELDS:
+            value = doc.get(field, _MISSING)
+            if value is _MISSING:
+                continue
+            if isinstance(value, ObjectId):
+                value = str(value)
+            setattr(record, field, value)
+        return record
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        """Build records from a cursor without materializing the raw documents"""
+        return [cls.from_doc(doc) for doc in cursor]
+
+    def get(self, field, default=None):
+        """Dict-style read so helpers written for documents accept records too"""
+        return getattr(self, field, default)
+
+    def to_dict(self):
+        """Response dict holding only the fields that were set"""
+        result = {}
+        for field in self.__slots__:
+            value = getattr(self, field, _MISSING)
+            if value is not _MISSING:
+                result[field] = value
+        return result
+
+class RoomRecord(Record):
+    FIELDS = ('_id', 'name', 'type', 'price', 'image', 'description', 'capacity',
+              'amenities', 'status', 'roomNumber', 'needs_cleaning')
+    EXTRA = ('nightly_rates', 'total_price')
+    __slots__ = FIELDS + EXTRA
+
+class BookingRecord(Record):
+    FIELDS = ('_id', 'user_id', 'room_id', 'room_number', 'room_name', 'room_type', 'group_id',
+              'checkin_date', 'checkout_date', 'guests', 'rooms', 'price_per_night', 'nightly_rates',
+              'total_price', 'status', 'payment_status', 'hold_expires_at', 'waitlist_id',
+              'created_at', 'updated_at', 'archived_at')
+    EXTRA = ('room_details', 'user_details')
+    __slots__ = FIELDS + EXTRA
+
+class UserRecord(Record):
+    FIELDS = ('_id', 'email', 'firstName', 'lastName', 'phone', 'role', 'created_at')
+    __slots__ = FIELDS
+
+# Fields embedded in booking lists as room_details / user_details
+ROOM_DETAIL_FIELDS = ('name', 'image', 'roomNumber')
+USER_DETAIL_FIELDS = ('email', 'firstName', 'lastName', 'phone')
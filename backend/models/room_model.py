@@ -1,51 +1,119 @@
 from datetime import datetime
-from bson import ObjectId
+from services.events import publish_local
+from models.records import RoomRecord
+from storage.base import RoomRepository
+from storage.mongo import MongoRoomRepository
 
 class Room:
     def __init__(self, db_collection):
-        self.collection = db_collection
+        # A MongoDB collection, or a repository from another storage engine
+        self.repo = db_collection if isinstance(db_collection, RoomRepository) else MongoRoomRepository(db_collection)
+    
+    def for_hotel(self, hotel_id):
+        """The same model limited to one property's rooms"""
+        return Room(self.repo.for_hotel(hotel_id))
+    
+    @property
+    def hotel_id(self):
+        """The property this model is limited to (None: every property)"""
+        return self.repo.hotel_id
+    
+    def ensure_indexes(self):
+        """Create the indexes behind /rooms/search and the cleaning list"""
+        self.repo.ensure_indexes()
     
     def create_room(self, room_data):
         """Create a new room"""
         room_data['created_at'] = datetime.utcnow()
         room_data['status'] = room_data.get('status', 'available')
         
-        result = self.collection.insert_one(room_data)
-        room_data['_id'] = result.inserted_id
+        room_id = self.repo.insert(room_data)
+        room_data['_id'] = room_id
+        publish_local('room', 'insert', room_id, room_data, hotel_id=self.repo.hotel_id)
         return room_data
     
-    def get_all_rooms(self):
-        """Get all rooms"""
-        rooms = list(self.collection.find({}))
+    def get_all_rooms(self, fields=None):
+        """Get all rooms, optionally fetching only the given fields"""
+        rooms = list(self.repo.find_rooms(fields=fields))
         return rooms
     
+    def count_rooms(self):
+        """Get the total number of rooms"""
+        return self.repo.count()
+    
+    def get_hotel_ids(self):
+        """Get the ids of every property that has rooms"""
+        return self.repo.hotel_ids()
+    
     def get_available_rooms(self, checkin_date=None, checkout_date=None):
-        """Get available rooms, optionally filtered by date range"""
-        query = {'status': 'available'}
-        
+        """Get available rooms as RoomRecords, optionally filtered by date range"""
         if checkin_date and checkout_date:
             # Check for bookings that overlap with the requested dates
             # This would require checking bookings collection
             pass
         
-        rooms = list(self.collection.find(query))
+        rooms = RoomRecord.from_cursor(self.repo.find_rooms(status='available', fields=RoomRecord.FIELDS))
         return rooms
     
+    def get_room_records(self, room_ids=None, fields=None):
+        """Get all rooms, or the given rooms, as RoomRecords holding only the requested fields"""
+        return RoomRecord.from_cursor(self.repo.find_rooms(room_ids, fields=fields or RoomRecord.FIELDS))
+    
+    def search_rooms(self, filters, sort, skip, limit, price_buckets):
+        """
+        Filter, sort and page rooms and count facets over every match.
+        filters may hold q (keyword), status, types, min_price, max_price,
+        min_capacity and amenities (all required).
+        Returns (RoomRecords for the page, total matches, facets).
+        """
+        docs, total, counts = self.repo.search(filters, sort, skip, limit, price_buckets, RoomRecord.FIELDS)
+        
+        facets = {
+            'types': dict(counts['types']),
+            'amenities': dict(counts['amenities']),
+            'capacity': {str(value): count for value, count in counts['capacity']},
+            'price': [
+                {
+                    'min': lower if lower != 'other' else price_buckets[-1],
+                    'max': _next_boundary(price_buckets, lower),
+                    'count': count
+                }
+                for lower, count in counts['price']
+            ]
+        }
+        return RoomRecord.from_cursor(docs), total, facets
+    
     def get_room_by_id(self, room_id):
         """Get room by ID"""
         try:
-            return self.collection.find_one({'_id': ObjectId(room_id)})
+            return self.repo.get(room_id)
         except:
             return None
     
+    def get_room_record(self, room_id):
+        """Get a room as a RoomRecord, read from the primary so it reflects recent updates"""
+        try:
+            room = self.repo.get(room_id, RoomRecord.FIELDS)
+            return RoomRecord.from_doc(room) if room else None
+        except:
+            return None
+    
+    def get_rooms_by_ids(self, room_ids):
+        """Get several rooms in one query, returned in the order of room_ids"""
+        try:
+            rooms = self.repo.get_many(room_ids)
+            by_id = {str(room['_id']): room for room in rooms}
+            return [by_id.get(room_id) for room_id in room_ids]
+        except:
+            return [None] * len(room_ids)
+    
     def update_room_status(self, room_id, status):
         """Update room status"""
         try:
-            result = self.collection.update_one(
-                {'_id': ObjectId(room_id)},
-                {'$set': {'status': status, 'updated_at': datetime.utcnow()}}
-            )
-            return result.modified_count > 0
+            updated = self.repo.update(room_id, {'status': status, 'updated_at': datetime.utcnow()})
+            if updated:
+                publish_local('room', 'update', room_id, {'status': status}, hotel_id=self.repo.hotel_id)
+            return updated
         except:
             return False
     
@@ -53,38 +121,42 @@ class Room:
         """Update room information"""
         try:
             update_data['updated_at'] = datetime.utcnow()
-            result = self.collection.update_one(
-                {'_id': ObjectId(room_id)},
-                {'$set': update_data}
-            )
-            return result.modified_count > 0
+            updated = self.repo.update(room_id, update_data)
+            if updated:
+                publish_local('room', 'update', room_id, update_data, hotel_id=self.repo.hotel_id)
+            return updated
         except:
             return False
     
     def mark_room_needs_cleaning(self, room_id):
         """Mark a room as needing cleaning"""
         try:
-            result = self.collection.update_one(
-                {'_id': ObjectId(room_id)},
-                {'$set': {'needs_cleaning': True, 'updated_at': datetime.utcnow()}}
-            )
-            return result.modified_count > 0
+            updated = self.repo.update(room_id, {'needs_cleaning': True, 'updated_at': datetime.utcnow()})
+            if updated:
+                publish_local('room', 'update', room_id, {'needs_cleaning': True}, hotel_id=self.repo.hotel_id)
+            return updated
         except:
             return False
     
     def mark_room_clean(self, room_id):
         """Mark a room as cleaned"""
         try:
-            result = self.collection.update_one(
-                {'_id': ObjectId(room_id)},
-                {'$set': {'needs_cleaning': False, 'updated_at': datetime.utcnow()}}
-            )
-            return result.modified_count > 0
+            updated = self.repo.update(room_id, {'needs_cleaning': False, 'updated_at': datetime.utcnow()})
+            if updated:
+                publish_local('room', 'update', room_id, {'needs_cleaning': False}, hotel_id=self.repo.hotel_id)
+            return updated
         except:
             return False
     
     def get_rooms_needing_cleaning(self):
-        """Get all rooms that need cleaning"""
-        rooms = list(self.collection.find({'needs_cleaning': True}))
+        """Get all rooms that need cleaning or are in maintenance, as RoomRecords"""
+        rooms = RoomRecord.from_cursor(self.repo.needing_cleaning(RoomRecord.FIELDS))
         return rooms
 
+
+def _next_boundary(boundaries, lower):
+    """Upper bound (exclusive) of the bucket starting at lower"""
+    if lower == 'other' or lower not in boundaries:
+        return None
+    index = boundaries.index(lower)
+    return boundaries[index + 1] if index + 1 < len(boundaries) else None
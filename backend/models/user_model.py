@@ -1,9 +1,18 @@
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from models.records import UserRecord
+from services.user_directory import user_directory
+from storage.base import UserRepository
+from storage.mongo import MongoUserRepository
 
 class User:
     def __init__(self, db_collection):
-        self.collection = db_collection
+        # A MongoDB collection, or a repository from another storage engine
+        self.repo = db_collection if isinstance(db_collection, UserRepository) else MongoUserRepository(db_collection)
+    
+    def ensure_indexes(self):
+        """Unique email index: registration relies on it instead of a lookup first"""
+        self.repo.ensure_indexes()
     
     def create_user(self, user_data):
         """Create a new user"""
@@ -11,19 +20,17 @@ class User:
         user_data['created_at'] = datetime.utcnow()
         user_data['role'] = user_data.get('role', 'guest')
         
-        result = self.collection.insert_one(user_data)
-        user_data['_id'] = result.inserted_id
+        user_data['_id'] = self.repo.insert(user_data)
         user_data.pop('password', None)  # Remove password from return
         return user_data
     
     def find_by_email(self, email):
         """Find user by email"""
-        return self.collection.find_one({'email': email})
+        return self.repo.find_by_email(email)
     
     def find_by_id(self, user_id):
         """Find user by ID"""
-        from bson import ObjectId
-        return self.collection.find_one({'_id': ObjectId(user_id)})
+        return self.repo.get(user_id)
     
     def verify_password(self, user, password):
         """Verify user password"""
@@ -31,21 +38,26 @@ class User:
             return check_password_hash(user['password'], password)
         return False
     
-    def get_all_users(self):
-        """Get all users (for admin)"""
-        users = list(self.collection.find({}, {'password': 0}))
-        return users
+    def get_user_records(self, user_ids, fields=None):
+        """Get several users in one query as UserRecords, keyed by string id"""
+        users = UserRecord.from_cursor(self.repo.get_many(user_ids, fields or UserRecord.FIELDS))
+        return {user._id: user for user in users}
+    
+    def bump_token_generation(self, user_id):
+        """Invalidate every token issued so far for a user; returns the new generation"""
+        return self.repo.increment(user_id, 'token_generation')
+    
+    def get_all_users(self, limit=100, after=None):
+        """Get one page of users as UserRecords, ordered by id; pass the last id seen as after"""
+        return UserRecord.from_cursor(self.repo.page(limit, after, UserRecord.FIELDS))
     
     def update_user(self, user_id, update_data):
         """Update user information"""
-        from bson import ObjectId
         if 'password' in update_data:
             update_data['password'] = generate_password_hash(update_data['password'])
         
         update_data['updated_at'] = datetime.utcnow()
-        result = self.collection.update_one(
-            {'_id': ObjectId(user_id)},
-            {'$set': update_data}
-        )
-        return result.modified_count > 0
+        updated = self.repo.update(user_id, update_data)
+        user_directory.invalidate(user_id)
+        return updated
 
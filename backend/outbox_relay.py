@@ -0,0 +1,43 @@
+"""
+Outbox relay: deliver booking and payment events from the outbox collection to OUTBOX_SINKS
+Run alongside the API (it holds a lease, so extra copies stand by): python outbox_relay.py [--once]
+"""
+import argparse
+import logging
+from pymongo import MongoClient
+from config import Config
+from services.outbox import build_relay, ensure_outbox_indexes
+
+def main():
+    """Main relay function"""
+    parser = argparse.ArgumentParser(description='Deliver outbox events to the configured sinks')
+    parser.add_argument('--once', action='store_true',
+                        help='Deliver everything pending, then exit instead of polling')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client.get_default_database()
+        ensure_outbox_indexes(db, Config.OUTBOX_RETENTION_HOURS)
+        relay = build_relay(db, Config)
+        
+        if args.once:
+            delivered = 0
+            while True:
+                count = relay.run_once()
+                if not count:
+                    break
+                delivered += count
+            print(f"Delivered {delivered} events ({relay.backlog()} still pending)")
+        else:
+            print(f"Relaying outbox events to: {Config.OUTBOX_SINKS}")
+            try:
+                relay.run_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
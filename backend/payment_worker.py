@@ -0,0 +1,37 @@
+"""
+Payment worker: charge queued payment intents through PAYMENT_GATEWAY and confirm their bookings
+Run as many as needed next to the API (e.g. with PAYMENT_WORKERS=0 in the API): python payment_worker.py [--workers N]
+"""
+import argparse
+import logging
+from pymongo import MongoClient
+from config import Config
+from services.payments import build_payment_pool, ensure_payment_indexes
+
+def main():
+    """Main worker function"""
+    parser = argparse.ArgumentParser(description='Process queued payment intents')
+    parser.add_argument('--workers', type=int, default=max(Config.PAYMENT_WORKERS, 1),
+                        help='Worker threads in this process')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+    
+    client = MongoClient(Config.MONGO_URI, **Config.mongo_client_options())
+    try:
+        db = client.get_default_database()
+        ensure_payment_indexes(db)
+        pool = build_payment_pool(db, Config)
+        pool.workers = args.workers
+        
+        print(f"Processing payments with {args.workers} workers on the {Config.PAYMENT_GATEWAY} gateway")
+        pool.start()
+        try:
+            pool.stopping.wait()
+        except KeyboardInterrupt:
+            pass
+        pool.stop()
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,58 @@ from flask import Blueprint, request, jsonify
 from functools import wraps
 from models.user_model import User
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import jwt
 from datetime import datetime, timedelta
 from config import Config
+from services.login_throttle import LoginThrottle, MemoryThrottleStore, MongoThrottleStore
+from services.tokens import RefreshTokenStore, revocations
 
-auth_bp = Blueprint('auth', __name__)
+class TokenRevokedError(jwt.InvalidTokenError):
+    pass
 
 def init_auth_routes(db, app):
     """Initialize auth routes with database connection"""
+    auth_bp = Blueprint('auth', __name__)
     user_model = User(db.users)
+    try:
+        user_model.ensure_indexes()
+    except OperationFailure as e:
+        # Existing duplicate emails block the index; registration still works without it
+        app.logger.warning('Could not create unique email index: %s', e)
+    
+    # Failed logins are limited per email and per client IP
+    store = MongoThrottleStore(db) if Config.LOGIN_THROTTLE_BACKEND == 'mongo' else MemoryThrottleStore()
+    login_throttle = LoginThrottle(
+        store,
+        window=Config.LOGIN_THROTTLE_WINDOW_SECONDS,
+        max_per_email=Config.LOGIN_MAX_FAILURES_PER_EMAIL,
+        max_per_ip=Config.LOGIN_MAX_FAILURES_PER_IP,
+        lockout_base=Config.LOGIN_LOCKOUT_BASE_SECONDS,
+        lockout_max=Config.LOGIN_LOCKOUT_MAX_SECONDS,
+        lockout_reset=Config.LOGIN_LOCKOUT_RESET_SECONDS
+    )
+    app.extensions['login_throttle'] = login_throttle
+    
+    # Refresh tokens and the revocation list checked by token_required
+    refresh_tokens = RefreshTokenStore(db.refresh_tokens)
+    revocations.bind(db.token_revocations, Config.TOKEN_REVOCATION_SYNC_SECONDS)
+    # A revocation only has to outlive the access tokens it cancels
+    revocation_ttl = Config.JWT_ACCESS_TOKEN_EXPIRES.total_seconds() + 60
+    
+    def issue_tokens(user, family=None):
+        """Access token plus a new refresh token (in the given family, or a new session)"""
+        user_id = str(user['_id'])
+        refresh_token, family = refresh_tokens.issue(user_id, Config.JWT_REFRESH_TOKEN_EXPIRES, family)
+        token = generate_token(
+            user_id, user.get('role', 'guest'), user['email'],
+            sid=family, generation=user.get('token_generation', 0)
+        )
+        return {
+            'token': token,
+            'refresh_token': refresh_token,
+            'expires_in': int(Config.JWT_ACCESS_TOKEN_EXPIRES.total_seconds())
+        }
     
     @auth_bp.route('/register', methods=['POST'])
     def register():
@@ -23,11 +66,6 @@ def init_auth_routes(db, app):
                 if field not in data:
                     return jsonify({'error': f'{field} is required'}), 400
             
-            # Check if user already exists
-            existing_user = user_model.find_by_email(data['email'])
-            if existing_user:
-                return jsonify({'error': 'User already exists'}), 400
-            
             # Create user
             user_data = {
                 'email': data['email'],
@@ -38,14 +76,18 @@ def init_auth_routes(db, app):
                 'role': data.get('role', 'guest')
             }
             
-            user = user_model.create_user(user_data)
+            # The unique email index rejects duplicates, even concurrent ones
+            try:
+                user = user_model.create_user(user_data)
+            except DuplicateKeyError:
+                return jsonify({'error': 'User already exists'}), 400
             
-            # Generate token
-            token = generate_token(str(user['_id']), user['role'], user['email'])
+            # Generate tokens
+            tokens = issue_tokens(user)
             
             return jsonify({
                 'message': 'User registered successfully',
-                'token': token,
+                **tokens,
                 'user': {
                     'id': str(user['_id']),
                     'email': user['email'],
@@ -66,25 +108,37 @@ def init_auth_routes(db, app):
             if not data or not data.get('email') or not data.get('password'):
                 return jsonify({'error': 'Email and password are required'}), 400
             
+            # Reject throttled attempts before touching the database or hashing
+            client_ip = client_address()
+            retry_after = login_throttle.check(data['email'], client_ip)
+            if retry_after:
+                response = jsonify({'error': 'Too many failed login attempts. Please try again later'})
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            
             # Find user
             user = user_model.find_by_email(data['email'])
             if not user:
+                login_throttle.failure(data['email'], client_ip)
                 return jsonify({'error': 'Invalid credentials'}), 401
             
             # Verify password
             if not user_model.verify_password(user, data['password']):
+                login_throttle.failure(data['email'], client_ip)
                 return jsonify({'error': 'Invalid credentials'}), 401
             
+            login_throttle.success(data['email'])
+            
             # Check role if specified
             if data.get('role') and user.get('role') != data['role']:
                 return jsonify({'error': 'Invalid role'}), 403
             
-            # Generate token
-            token = generate_token(str(user['_id']), user.get('role', 'guest'), user['email'])
+            # Generate tokens
+            tokens = issue_tokens(user)
             
             return jsonify({
                 'message': 'Login successful',
-                'token': token,
+                **tokens,
                 'user': {
                     'id': str(user['_id']),
                     'email': user['email'],
@@ -97,19 +151,95 @@ def init_auth_routes(db, app):
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @auth_bp.route('/token/refresh', methods=['POST'])
+    def refresh():
+        """Swap a refresh token for a new access token and a new refresh token"""
+        try:
+            data = request.get_json() or {}
+            if not data.get('refresh_token'):
+                return jsonify({'error': 'refresh_token is required'}), 400
+            
+            doc, family = refresh_tokens.consume(data['refresh_token'])
+            if not doc:
+                if family:
+                    # A used token came back: assume it was stolen and end the session
+                    refresh_tokens.revoke_family(family)
+                    revocations.revoke_session(family, revocation_ttl)
+                return jsonify({'error': 'Invalid refresh token'}), 401
+            
+            user = user_model.find_by_id(doc['user_id'])
+            if not user:
+                return jsonify({'error': 'Invalid refresh token'}), 401
+            
+            return jsonify(issue_tokens(user, family)), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @auth_bp.route('/logout', methods=['POST'])
+    @token_required
+    def logout(current_user):
+        """End this session: its refresh tokens and access tokens stop working"""
+        try:
+            if current_user.get('sid'):
+                refresh_tokens.revoke_family(current_user['sid'])
+                revocations.revoke_session(current_user['sid'], revocation_ttl)
+            
+            return jsonify({'message': 'Logged out successfully'}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @auth_bp.route('/logout/all', methods=['POST'])
+    @token_required
+    def logout_all(current_user):
+        """End every session of the current user"""
+        try:
+            generation = user_model.bump_token_generation(current_user['user_id'])
+            if generation is None:
+                return jsonify({'error': 'User not found'}), 404
+            
+            refresh_tokens.revoke_user(current_user['user_id'])
+            revocations.revoke_user(current_user['user_id'], generation, revocation_ttl)
+            
+            return jsonify({'message': 'Logged out of all sessions'}), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     return auth_bp
 
-def generate_token(user_id, role, email):
-    """Generate JWT token"""
+def client_address():
+    """Client IP of the current request"""
+    if Config.TRUST_PROXY_HEADERS and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr
+
+def generate_token(user_id, role, email, sid=None, generation=0):
+    """Generate a short-lived JWT access token for a session (sid) and token generation"""
     payload = {
         'user_id': user_id,
         'role': role,
         'email': email,
+        'sid': sid,
+        'gen': generation,
         'exp': datetime.utcnow() + Config.JWT_ACCESS_TOKEN_EXPIRES,
         'iat': datetime.utcnow()
     }
     return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm='HS256')
 
+def decode_token(token):
+    """Decode a JWT token into the current_user dict (raises jwt errors, including TokenRevokedError)"""
+    data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+    if revocations.is_revoked(data):
+        raise TokenRevokedError('Token has been revoked')
+    return {
+        'user_id': data['user_id'],
+        'role': data['role'],
+        'email': data['email'],
+        'sid': data.get('sid')
+    }
+
 def token_required(f):
     """Decorator to require authentication token"""
     @wraps(f)
@@ -128,15 +258,11 @@ def token_required(f):
             return jsonify({'error': 'Token is missing'}), 401
         
         try:
-            # Decode token
-            data = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
-            current_user = {
-                'user_id': data['user_id'],
-                'role': data['role'],
-                'email': data['email']
-            }
+            current_user = decode_token(token)
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
+        except TokenRevokedError:
+            return jsonify({'error': 'Token has been revoked'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'error': 'Invalid token'}), 401
         
@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, current_app, request, jsonify
+from werkzeug.test import EnvironBuilder
+from models.booking_model import Booking
+from models.room_model import Room
+from models.records import ROOM_DETAIL_FIELDS, USER_DETAIL_FIELDS
+from routes.auth import token_required
+from services.read_routing import for_catalog
+from services.user_directory import user_directory
+from services.properties import PerHotel, current_hotel_id
+from config import Config
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+# Streams never finish inside a batch, and batches do not nest
+BATCH_EXCLUDED_PATHS = ('/batch', '/events', '/admin/export')
+# ...wherever they are mounted, e.g. /payment/<id>/events
+BATCH_EXCLUDED_SUFFIXES = ('/events',)
+
+def init_batch_routes(db, app):
+    """Initialize batch and bootstrap routes with database connection"""
+    batch_bp = Blueprint('batch', __name__)
+    # Every call goes to the request's property (X-Hotel-Id)
+    booking_model = PerHotel(Booking(db.bookings))
+    room_model = PerHotel(Room(db.rooms))
+    preferences = for_catalog(db.user_preferences)
+    # Separate pools so a /bootstrap sub-request cannot starve the batch that contains it
+    batch_pool = ThreadPoolExecutor(max_workers=Config.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+    bootstrap_pool = ThreadPoolExecutor(max_workers=Config.BATCH_MAX_WORKERS, thread_name_prefix='bootstrap')
+    
+    def dispatch(flask_app, sub, headers, environ_base):
+        """Run one sub-request through the full request pipeline (auth, admission, handlers)"""
+        builder = EnvironBuilder(
+            path='/api' + sub['path'], method=sub['method'], headers=headers,
+            json=sub.get('body'), environ_base=environ_base
+        )
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        
+        with flask_app.request_context(environ):
+            try:
+                response = flask_app.full_dispatch_request()
+            except Exception:
+                flask_app.logger.exception('Batch sub-request %s %s failed', sub['method'], sub['path'])
+                return {'id': sub.get('id'), 'status': 500, 'body': {'error': 'Internal server error'}}
+            body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+            return {'id': sub.get('id'), 'status': response.status_code, 'body': body}
+    
+    @batch_bp.route('/batch', methods=['POST'])
+    def run_batch():
+        """
+        Execute several API calls in one HTTP request. Sub-requests run in
+        order; consecutive GETs run concurrently, and every write waits for
+        everything before it. Each sub-request carries this request's
+        Authorization header and gets its own status and body.
+        """
+        try:
+            data = request.get_json(silent=True) or {}
+            subs = data.get('requests')
+            
+            if not isinstance(subs, list) or not subs:
+                return jsonify({'error': 'requests must be a non-empty list'}), 400
+            if len(subs) > Config.BATCH_MAX_REQUESTS:
+                return jsonify({'error': f'At most {Config.BATCH_MAX_REQUESTS} requests per batch'}), 400
+            
+            for sub in subs:
+                if not isinstance(sub, dict):
+                    return jsonify({'error': 'Each request must be an object'}), 400
+                sub['method'] = str(sub.get('method', 'GET')).upper()
+                path = sub.get('path')
+                if sub['method'] not in BATCH_METHODS:
+                    return jsonify({'error': f"method must be one of: {', '.join(BATCH_METHODS)}"}), 400
+                if not isinstance(path, str) or not path.startswith('/'):
+                    return jsonify({'error': 'path must start with / (relative to /api)'}), 400
+                route = path.split('?')[0].rstrip('/')
+                if route.startswith(BATCH_EXCLUDED_PATHS) or route.endswith(BATCH_EXCLUDED_SUFFIXES):
+                    return jsonify({'error': f'{path} cannot be batched'}), 400
+            
+            flask_app = current_app._get_current_object()
+            # Sub-requests run at this request's property
+            headers = {'X-Hotel-Id': current_hotel_id()}
+            for name in ('Authorization', 'User-Agent', 'X-Forwarded-For'):
+                if name in request.headers:
+                    headers[name] = request.headers[name]
+            environ_base = {'REMOTE_ADDR': request.remote_addr}
+            
+            responses = [None] * len(subs)
+            start = 0
+            while start < len(subs):
+                end = start + 1
+                if subs[start]['method'] == 'GET':
+                    while end < len(subs) and subs[end]['method'] == 'GET':
+                        end += 1
+                futures = [
+                    batch_pool.submit(dispatch, flask_app, subs[index], headers, environ_base)
+                    for index in range(start, end)
+                ]
+                for index, future in zip(range(start, end), futures):
+                    responses[index] = future.result()
+                start = end
+            
+            return jsonify({
+                'responses': responses,
+                'count': len(responses)
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @batch_bp.route('/bootstrap', methods=['GET'])
+    @token_required
+    def bootstrap(current_user):
+        """
+        Everything the landing view of the caller's role needs, from
+        concurrent reads: rooms for everyone, plus the guest's own bookings
+        and saved dates, or all bookings for admins. Cleaning tasks and room
+        details are derived from the room list rather than queried again.
+        """
+        try:
+            user_id = current_user['user_id']
+            role = current_user.get('role', 'guest')
+            
+            reads = {
+                'rooms': bootstrap_pool.submit(room_model.get_room_records),
+                'user': bootstrap_pool.submit(user_directory.get, user_id)
+            }
+            if role == 'admin':
+                reads['bookings'] = bootstrap_pool.submit(booking_model.get_all_bookings)
+            elif role == 'guest':
+                reads['bookings'] = bootstrap_pool.submit(booking_model.get_user_bookings, user_id)
+                reads['preferences'] = bootstrap_pool.submit(
+                    preferences.find_one, {'user_id': user_id}, {'_id': 0, 'checkin_date': 1, 'checkout_date': 1}
+                )
+            results = {name: future.result() for name, future in reads.items()}
+            
+            rooms = results['rooms']
+            user = results['user']
+            payload = {
+                'role': role,
+                'user': dict(
+                    {field: user.get(field, '') for field in USER_DETAIL_FIELDS} if user else {},
+                    _id=user_id, role=role
+                ),
+                'rooms': [room.to_dict() for room in rooms]
+            }
+            
+            if role in ('admin', 'staff'):
+                payload['cleaning'] = [
+                    room.to_dict() for room in rooms
+                    if room.get('needs_cleaning') or room.get('status') == 'maintenance'
+                ]
+            
+            if 'bookings' in results:
+                bookings = results['bookings']
+                rooms_by_id = {room._id: room for room in rooms}
+                users = {}
+                if role == 'admin':
+                    users = user_directory.get_many(booking.get('user_id') for booking in bookings if booking.get('user_id'))
+                for booking in bookings:
+                    room = rooms_by_id.get(booking.get('room_id'))
+                    if room:
+                        booking.room_details = {field: room.get(field) for field in ROOM_DETAIL_FIELDS}
+                    booking_user = users.get(booking.get('user_id'))
+                    if booking_user:
+                        booking.user_details = {field: booking_user.get(field, '') for field in USER_DETAIL_FIELDS}
+                payload['bookings'] = [booking.to_dict() for booking in bookings]
+            
+            if 'preferences' in results:
+                payload['preferences'] = results['preferences']
+            
+            return jsonify(payload), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return batch_bp
@@ -1,15 +1,36 @@
 from flask import Blueprint, request, jsonify
 from models.booking_model import Booking
 from models.room_model import Room
+from models.records import ROOM_DETAIL_FIELDS, USER_DETAIL_FIELDS
 from routes.auth import token_required, admin_required
-from datetime import datetime
-
-bookings_bp = Blueprint('bookings', __name__)
+from services.pricing import PricingEngine, quote_rooms
+from services.allocator import RoomAllocator
+from services.user_directory import user_directory
+from services.properties import PerHotel
+from config import Config
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import OperationFailure
 
 def init_bookings_routes(db, app):
     """Initialize bookings routes with database connection"""
-    booking_model = Booking(db.bookings)
-    room_model = Room(db.rooms)
+    bookings_bp = Blueprint('bookings', __name__)
+    # Every call goes to the request's property (X-Hotel-Id)
+    booking_model = PerHotel(Booking(db.bookings))
+    room_model = PerHotel(Room(db.rooms))
+    pricing_engine = PricingEngine.from_config(Config)
+    # Caches each property's inventory separately
+    room_allocator = RoomAllocator(
+        room_model, booking_model,
+        horizon=Config.ALLOCATOR_GAP_HORIZON_DAYS,
+        inventory_ttl=Config.ALLOCATOR_INVENTORY_TTL
+    )
+    # Created by init_waitlist before the routes are registered
+    waitlist = PerHotel(app.extensions['waitlist'])
+    try:
+        booking_model.ensure_indexes()
+    except OperationFailure as e:
+        app.logger.warning('Could not create booking indexes: %s', e)
     
     @bookings_bp.route('/book', methods=['POST'])
     @token_required
@@ -18,12 +39,20 @@ def init_bookings_routes(db, app):
             data = request.get_json()
             
             # Validate required fields
-            required_fields = ['room_id', 'checkin_date', 'checkout_date', 'guests']
+            required_fields = ['checkin_date', 'checkout_date', 'guests']
             for field in required_fields:
                 if field not in data:
                     return jsonify({'error': f'{field} is required'}), 400
             
-            room_id = data['room_id']
+            # Either a specific room or a room type to allocate from
+            if not data.get('room_id') and not data.get('room_type'):
+                return jsonify({'error': 'room_id or room_type is required'}), 400
+            
+            # A single booking always covers one room
+            if int(data.get('rooms', 1)) != 1:
+                return jsonify({'error': 'Use /api/book/group to book more than one room'}), 400
+            
+            room_id = data.get('room_id')
             checkin_date = data['checkin_date']
             checkout_date = data['checkout_date']
             
@@ -37,6 +66,15 @@ def init_bookings_routes(db, app):
             if checkin < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
                 return jsonify({'error': 'Check-in date cannot be in the past'}), 400
             
+            # Book by type: pick the room that leaves the smallest calendar gap
+            if not room_id:
+                room_id = room_allocator.allocate(data['room_type'], checkin_date, checkout_date)
+                if not room_id:
+                    return jsonify({
+                        'error': f"No {data['room_type']} rooms available for these dates",
+                        'waitlist_available': True
+                    }), 400
+            
             # Check if room exists
             room = room_model.get_room_by_id(room_id)
             if not room:
@@ -48,12 +86,18 @@ def init_bookings_routes(db, app):
             
             # Check for overlapping bookings
             if not booking_model.check_room_availability(room_id, checkin_date, checkout_date):
-                return jsonify({'error': 'Room is already booked for these dates'}), 400
+                return jsonify({
+                    'error': 'Room is already booked for these dates',
+                    'waitlist_available': True
+                }), 400
             
-            # Calculate total price
-            nights = (checkout - checkin).days
+            # Calculate total price from the per-night rates
             price_per_night = room.get('price', 0)
-            total_price = nights * price_per_night
+            nightly_rates, totals = quote_rooms(
+                pricing_engine, [room], booking_model, room_model.count_rooms(),
+                checkin_date, checkout_date
+            )
+            total_price = totals[0].item()
             
             # Create booking
             booking_data = {
@@ -61,15 +105,20 @@ def init_bookings_routes(db, app):
                 'room_id': room_id,
                 'room_number': room.get('roomNumber', ''),
                 'room_name': room.get('name', ''),
+                'room_type': room.get('type', ''),
                 'checkin_date': checkin_date,
                 'checkout_date': checkout_date,
                 'guests': data['guests'],
                 'rooms': data.get('rooms', 1),
                 'price_per_night': price_per_night,
+                'nightly_rates': nightly_rates[0].tolist(),
                 'total_price': total_price,
                 'status': 'pending',
                 'payment_status': 'pending'
             }
+            # Unpaid bookings release their dates after the hold, for the waitlist
+            if Config.BOOKING_PENDING_HOLD_MINUTES > 0:
+                booking_data['hold_expires_at'] = datetime.utcnow() + timedelta(minutes=Config.BOOKING_PENDING_HOLD_MINUTES)
             
             booking = booking_model.create_booking(booking_data)
             booking['_id'] = str(booking['_id'])
@@ -84,34 +133,142 @@ def init_bookings_routes(db, app):
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @bookings_bp.route('/book/group', methods=['POST'])
+    @token_required
+    def create_group_booking(current_user):
+        """Book several rooms for the same dates all-or-nothing"""
+        try:
+            data = request.get_json()
+            
+            # Validate required fields
+            required_fields = ['checkin_date', 'checkout_date', 'guests']
+            for field in required_fields:
+                if field not in data:
+                    return jsonify({'error': f'{field} is required'}), 400
+            
+            room_ids = data.get('room_ids', [])
+            room_types = data.get('room_types', {})
+            if not isinstance(room_ids, list):
+                return jsonify({'error': 'room_ids must be a list of room ids'}), 400
+            if not isinstance(room_types, dict) or not all(
+                isinstance(count, int) and not isinstance(count, bool) and count > 0 for count in room_types.values()
+            ):
+                return jsonify({'error': 'room_types must map each room type to a positive number of rooms'}), 400
+            room_ids = [str(room_id) for room_id in room_ids]
+            room_types = {str(room_type): count for room_type, count in room_types.items()}
+            checkin_date = data['checkin_date']
+            checkout_date = data['checkout_date']
+            
+            requested = len(room_ids) + sum(room_types.values())
+            if requested == 0:
+                return jsonify({'error': 'room_ids or room_types is required'}), 400
+            if requested > Config.GROUP_BOOKING_MAX_ROOMS:
+                return jsonify({'error': f'A group booking can include at most {Config.GROUP_BOOKING_MAX_ROOMS} rooms'}), 400
+            if len(set(room_ids)) != len(room_ids):
+                return jsonify({'error': 'Each room can only be booked once per group'}), 400
+            
+            # Validate dates
+            checkin = datetime.strptime(checkin_date, '%Y-%m-%d')
+            checkout = datetime.strptime(checkout_date, '%Y-%m-%d')
+            
+            if checkin >= checkout:
+                return jsonify({'error': 'Check-out date must be after check-in date'}), 400
+            
+            if checkin < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
+                return jsonify({'error': 'Check-in date cannot be in the past'}), 400
+            
+            # Check every requested room and room type against one bookings query
+            chosen, unavailable = room_allocator.allocate_group(room_ids, room_types, checkin_date, checkout_date)
+            if unavailable:
+                return jsonify({
+                    'error': 'Some rooms are not available for these dates',
+                    'unavailable': unavailable
+                }), 400
+            
+            rooms = room_model.get_rooms_by_ids(chosen)
+            for room_id, room in zip(chosen, rooms):
+                if not room:
+                    return jsonify({'error': f'Room {room_id} not found'}), 404
+                if room.get('status') != 'available':
+                    return jsonify({'error': f"Room {room.get('roomNumber', room_id)} is not available"}), 400
+            
+            # Price every room in one pass
+            nightly_rates, totals = quote_rooms(
+                pricing_engine, rooms, booking_model, room_model.count_rooms(),
+                checkin_date, checkout_date
+            )
+            
+            items = []
+            for room_id, room, rates, total in zip(chosen, rooms, nightly_rates.tolist(), totals.tolist()):
+                items.append({
+                    'user_id': current_user['user_id'],
+                    'room_id': room_id,
+                    'room_number': room.get('roomNumber', ''),
+                    'room_name': room.get('name', ''),
+                    'room_type': room.get('type', ''),
+                    'checkin_date': checkin_date,
+                    'checkout_date': checkout_date,
+                    'guests': data['guests'],
+                    'rooms': 1,
+                    'price_per_night': room.get('price', 0),
+                    'nightly_rates': rates,
+                    'total_price': total,
+                    'status': 'pending',
+                    'payment_status': 'pending'
+                })
+            
+            group_data = {
+                'user_id': current_user['user_id'],
+                'checkin_date': checkin_date,
+                'checkout_date': checkout_date,
+                'guests': data['guests'],
+                'rooms': len(items),
+                'total_price': round(float(totals.sum()), 2),
+                'status': 'pending',
+                'payment_status': 'pending'
+            }
+            
+            group = booking_model.create_group_booking(group_data, items)
+            if not group:
+                return jsonify({'error': 'Some rooms were booked by someone else, please try again'}), 409
+            
+            # Convert ObjectId to string
+            group['_id'] = str(group['_id'])
+            for item in group['items']:
+                item['_id'] = str(item['_id'])
+            
+            return jsonify({
+                'message': 'Group booking created successfully',
+                'booking': group
+            }), 201
+            
+        except ValueError as e:
+            return jsonify({'error': 'Invalid date format or room quantity'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    def room_details_by_id(bookings):
+        """room_details for every room referenced by a list of bookings, from one projected query"""
+        room_ids = {booking.get('room_id') for booking in bookings if booking.get('room_id')}
+        rooms = room_model.get_room_records(room_ids, fields=ROOM_DETAIL_FIELDS)
+        return {room._id: {field: room.get(field) for field in ROOM_DETAIL_FIELDS} for room in rooms}
+    
     @bookings_bp.route('/bookings', methods=['GET'])
     @token_required
     def get_user_bookings(current_user):
         try:
-            from bson import ObjectId
+            include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+            bookings = booking_model.get_user_bookings(current_user['user_id'], include_archived)
             
-            bookings = booking_model.get_user_bookings(current_user['user_id'])
-            
-            # Convert ObjectId to string and populate room details
+            # Populate room details
+            room_details = room_details_by_id(bookings)
             for booking in bookings:
-                # Convert all ObjectId fields to strings
-                if '_id' in booking:
-                    booking['_id'] = str(booking['_id'])
-                if 'room_id' in booking and isinstance(booking['room_id'], ObjectId):
-                    booking['room_id'] = str(booking['room_id'])
-                if 'user_id' in booking and isinstance(booking['user_id'], ObjectId):
-                    booking['user_id'] = str(booking['user_id'])
-                
-                room = room_model.get_room_by_id(booking.get('room_id'))
-                if room:
-                    booking['room_details'] = {
-                        'name': room.get('name'),
-                        'image': room.get('image'),
-                        'roomNumber': room.get('roomNumber')
-                    }
+                details = room_details.get(booking.get('room_id'))
+                if details:
+                    booking.room_details = details
             
             return jsonify({
-                'bookings': bookings,
+                'bookings': [booking.to_dict() for booking in bookings],
                 'count': len(bookings)
             }), 200
             
@@ -119,47 +276,26 @@ def init_bookings_routes(db, app):
             return jsonify({'error': str(e)}), 500
     
     @bookings_bp.route('/bookings/all', methods=['GET'])
-    @token_required
     @admin_required
     def get_all_bookings(current_user):
         try:
-            from bson import ObjectId
-            from models.user_model import User
-            
-            bookings = booking_model.get_all_bookings()
-            user_model = User(db.users)
+            include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+            bookings = booking_model.get_all_bookings(include_archived)
             
-            # Convert ObjectId to string and populate user details
+            # Populate user and room details
+            users = user_directory.get_many(booking.get('user_id') for booking in bookings if booking.get('user_id'))
+            room_details = room_details_by_id(bookings)
             for booking in bookings:
-                booking['_id'] = str(booking['_id'])
-                if 'room_id' in booking and isinstance(booking['room_id'], ObjectId):
-                    booking['room_id'] = str(booking['room_id'])
-                if 'user_id' in booking:
-                    user_id = booking['user_id']
-                    if isinstance(user_id, ObjectId):
-                        user_id = str(user_id)
-                    # Get user details
-                    user = user_model.find_by_id(user_id)
-                    if user:
-                        booking['user_details'] = {
-                            'email': user.get('email', ''),
-                            'firstName': user.get('firstName', ''),
-                            'lastName': user.get('lastName', ''),
-                            'phone': user.get('phone', '')
-                        }
-                    booking['user_id'] = user_id
+                user = users.get(booking.get('user_id'))
+                if user:
+                    booking.user_details = {field: user.get(field, '') for field in USER_DETAIL_FIELDS}
                 
-                # Populate room details
-                room = room_model.get_room_by_id(booking.get('room_id'))
-                if room:
-                    booking['room_details'] = {
-                        'name': room.get('name'),
-                        'image': room.get('image'),
-                        'roomNumber': room.get('roomNumber')
-                    }
+                details = room_details.get(booking.get('room_id'))
+                if details:
+                    booking.room_details = details
             
             return jsonify({
-                'bookings': bookings,
+                'bookings': [booking.to_dict() for booking in bookings],
                 'count': len(bookings)
             }), 200
             
@@ -180,7 +316,6 @@ def init_bookings_routes(db, app):
             if isinstance(booking.get('user_id'), str):
                 booking_user_id = booking.get('user_id')
             else:
-                from bson import ObjectId
                 booking_user_id = str(booking.get('user_id'))
             
             # Only allow deletion if:
@@ -193,7 +328,9 @@ def init_bookings_routes(db, app):
                     return jsonify({'error': 'Only pending bookings can be deleted'}), 400
             
             # Delete booking
-            success = booking_model.delete_booking(booking_id, user_id if current_user.get('role') != 'admin' else None)
+            success = booking_model.delete_booking(
+                booking_id, user_id if current_user.get('role') != 'admin' else None, room_id=booking.get('room_id')
+            )
             
             if success:
                 # If booking was confirmed, update room status back to available
@@ -203,6 +340,13 @@ def init_bookings_routes(db, app):
                         room_id = str(room_id)
                     room_model.update_room_status(room_id, 'available')
                 
+                # Offer the freed dates to the waitlist; the deletion stands even if this fails
+                if booking.get('status') in ('pending', 'confirmed'):
+                    try:
+                        waitlist.on_freed(booking.get('room_id'), booking['checkin_date'], booking['checkout_date'])
+                    except Exception as e:
+                        app.logger.warning('Waitlist match for deleted booking %s failed: %s', booking_id, e)
+                
                 return jsonify({
                     'message': 'Booking deleted successfully'
                 }), 200
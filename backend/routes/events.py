@@ -0,0 +1,67 @@
+import jwt
+import queue
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from routes.auth import decode_token
+from services.events import event_bus, ChangeStreamWatcher, format_sse
+from services.properties import current_hotel_id
+
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+def init_events_routes(db, app):
+    """Initialize the live events stream with database connection"""
+    events_bp = Blueprint('events', __name__)
+    watcher = ChangeStreamWatcher(db, event_bus)
+    
+    @events_bp.route('/events', methods=['GET'])
+    def stream_events():
+        """Server-Sent Events stream of room and booking deltas (staff and admin)"""
+        # EventSource cannot send headers, so the token may come as a query param
+        token = request.args.get('token')
+        auth_header = request.headers.get('Authorization', '')
+        if not token and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+        if not token:
+            return jsonify({'error': 'Token is missing'}), 401
+        
+        try:
+            current_user = decode_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token'}), 401
+        
+        if current_user.get('role') not in ('admin', 'staff'):
+            return jsonify({'error': 'Staff or admin access required'}), 403
+        
+        # One shared watcher per process, started by the first subscriber
+        watcher.start()
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        # Deltas of the request's property only (hotel_id query param, as EventSource sends no headers)
+        subscription = event_bus.subscribe(last_event_id, current_hotel_id())
+        
+        def generate():
+            try:
+                yield f"retry: 3000\n: source {event_bus.source}\n\n"
+                while not subscription.overflowed:
+                    try:
+                        event = subscription.queue.get(timeout=KEEPALIVE_INTERVAL)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield format_sse(event)
+            finally:
+                event_bus.unsubscribe(subscription)
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    
+    return events_bp
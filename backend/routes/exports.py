@@ -0,0 +1,125 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from routes.auth import admin_required
+from services.exports import FORMATS, date_range, stream_rows
+from services.login_audit import flatten_login_log
+from services.properties import current_hotel_id
+from services.read_routing import for_catalog
+from services.user_directory import user_directory
+from config import Config
+from datetime import datetime
+
+BOOKING_COLUMNS = ('_id', 'created_at', 'status', 'payment_status', 'user_id', 'user_email',
+                   'user_name', 'room_id', 'room_number', 'room_name', 'room_type', 'group_id',
+                   'checkin_date', 'checkout_date', 'guests', 'rooms', 'price_per_night', 'total_price')
+PAYMENT_COLUMNS = ('_id', 'created_at', 'booking_id', 'user_id', 'amount', 'payment_method', 'status')
+LOGIN_LOG_COLUMNS = ('_id', 'login_time', 'user_id', 'email', 'role', 'ip_address', 'user_agent')
+# Filled in per batch by add_user_details rather than read from the bookings
+JOINED_COLUMNS = ('user_email', 'user_name')
+
+def init_export_routes(db, app):
+    """Initialize admin export routes with database connection"""
+    exports_bp = Blueprint('exports', __name__)
+    
+    # Exports are long scans; keep them off the primary when a secondary is available
+    bookings = for_catalog(db.bookings)
+    bookings_archive = for_catalog(db.bookings_archive)
+    payments = for_catalog(db.payments)
+    login_logs = for_catalog(db.user_login_logs)
+    
+    # Date-range filters walk these indexes (within the property) in order instead of sorting in memory
+    # (the login log's login_time index is created with the collection, see services/login_audit.py)
+    try:
+        for collection, field in ((db.bookings, 'created_at'), (db.bookings_archive, 'created_at'),
+                                  (db.payments, 'created_at')):
+            collection.create_index([('hotel_id', ASCENDING), (field, ASCENDING)])
+    except OperationFailure as e:
+        app.logger.warning('Could not create export indexes: %s', e)
+    
+    def add_user_details(batch):
+        """Join email and name onto a batch of bookings through the user directory"""
+        users = user_directory.get_many(doc.get('user_id') for doc in batch if doc.get('user_id'))
+        for doc in batch:
+            user = users.get(doc.get('user_id'))
+            if user:
+                doc['user_email'] = user.get('email')
+                doc['user_name'] = ' '.join(filter(None, (user.get('firstName'), user.get('lastName'))))
+    
+    def flatten_login_logs(batch):
+        """Login logs keep user_id and role in the time-series metadata"""
+        for doc in batch:
+            flatten_login_log(doc)
+    
+    def export(name, collections, date_field, columns, enrich=None, extra_fields=(), per_hotel=True):
+        """Stream the matching documents of each collection (the request's property only, if per_hotel) as an attachment"""
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(FORMATS)}"}), 400
+        try:
+            query = date_range(date_field, request.args.get('from'), request.args.get('to'))
+        except ValueError:
+            return jsonify({'error': 'from and to must be YYYY-MM-DD dates, with to not before from'}), 400
+        if per_hotel:
+            query = dict({'hotel_id': current_hotel_id()}, **query)
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        try:
+            batch_size = min(max(1, int(request.args.get('batch_size', Config.EXPORT_BATCH_SIZE))),
+                             Config.EXPORT_MAX_BATCH_SIZE)
+        except ValueError:
+            return jsonify({'error': 'batch_size must be a number'}), 400
+        
+        projection = {column: 1 for column in columns if column not in JOINED_COLUMNS}
+        projection.update((field, 1) for field in extra_fields)
+        cursors = [
+            collection.find(query, projection, batch_size=batch_size).sort(date_field, ASCENDING)
+            for collection in collections
+        ]
+        
+        filename = f"{name}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+        mimetype = FORMATS[fmt]
+        if compress:
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        
+        response = Response(
+            stream_with_context(stream_rows(cursors, columns, fmt, batch_size, enrich, compress)),
+            mimetype=mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        # Let reverse proxies pass chunks through instead of buffering the whole export
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    @exports_bp.route('/admin/export/bookings', methods=['GET'])
+    @admin_required
+    def export_bookings(current_user):
+        try:
+            include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+            collections = [bookings, bookings_archive] if include_archived else [bookings]
+            return export('bookings', collections, 'created_at', BOOKING_COLUMNS, add_user_details)
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @exports_bp.route('/admin/export/payments', methods=['GET'])
+    @admin_required
+    def export_payments(current_user):
+        try:
+            return export('payments', [payments], 'created_at', PAYMENT_COLUMNS)
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @exports_bp.route('/admin/export/login-logs', methods=['GET'])
+    @admin_required
+    def export_login_logs(current_user):
+        try:
+            return export('login-logs', [login_logs], 'login_time', LOGIN_LOG_COLUMNS,
+                          flatten_login_logs, extra_fields=('meta',), per_hotel=False)
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return exports_bp
@@ -2,11 +2,24 @@ from flask import Blueprint, request, jsonify
 from routes.auth import token_required
 from datetime import datetime
 from bson import ObjectId
-
-feedback_bp = Blueprint('feedback', __name__)
+from services.read_routing import for_catalog
+from services.coalescing import single_flight, coalesced
+from services.properties import current_hotel_id
+from config import Config
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
 
 def init_feedback_routes(db, app):
     """Initialize feedback routes with database connection"""
+    feedback_bp = Blueprint('feedback', __name__)
+    # Public feedback list may be served by a secondary
+    feedback_catalog = for_catalog(db.feedback)
+    feedback_flight = single_flight('feedback', Config.COALESCE_TTL_SECONDS)
+    try:
+        # Each property's latest feedback (walked backwards); also backs the {hotel_id, created_at} shard key
+        db.feedback.create_index([('hotel_id', ASCENDING), ('created_at', ASCENDING)])
+    except OperationFailure as e:
+        app.logger.warning('Could not create feedback index: %s', e)
     
     @feedback_bp.route('/feedback', methods=['POST'])
     @token_required
@@ -24,6 +37,7 @@ def init_feedback_routes(db, app):
             
             # Create feedback document
             feedback_data = {
+                'hotel_id': current_hotel_id(),
                 'user_id': current_user['user_id'],
                 'user_email': current_user['email'],
                 'booking_id': data.get('booking_id'),
@@ -33,6 +47,7 @@ def init_feedback_routes(db, app):
             }
             
             result = db.feedback.insert_one(feedback_data)
+            feedback_flight.invalidate(feedback_data['hotel_id'])
             feedback_data['_id'] = str(result.inserted_id)
             
             return jsonify({
@@ -46,9 +61,10 @@ def init_feedback_routes(db, app):
             return jsonify({'error': str(e)}), 500
     
     @feedback_bp.route('/feedback', methods=['GET'])
+    @coalesced(feedback_flight)
     def get_feedback():
         try:
-            feedbacks = list(db.feedback.find({}).sort('created_at', -1).limit(50))
+            feedbacks = list(feedback_catalog.find({'hotel_id': current_hotel_id()}).sort('created_at', -1).limit(50))
             
             # Convert ObjectId to string
             for feedback in feedbacks:
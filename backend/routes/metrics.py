@@ -0,0 +1,27 @@
+from flask import Blueprint, current_app, jsonify
+from routes.auth import admin_required
+from services.coalescing import flights
+from services.user_directory import user_directory
+
+def init_metrics_routes(db, app):
+    """Initialize metrics routes with database connection"""
+    metrics_bp = Blueprint('metrics', __name__)
+    
+    @metrics_bp.route('/metrics', methods=['GET'])
+    @admin_required
+    def get_metrics(current_user):
+        """Per-process counters (each gunicorn worker reports its own)"""
+        try:
+            admission = current_app.extensions.get('admission')
+            login_throttle = current_app.extensions.get('login_throttle')
+            return jsonify({
+                'coalescing': {name: flight.stats() for name, flight in flights.items()},
+                'admission': admission.stats() if admission else None,
+                'login_throttle': login_throttle.stats() if login_throttle else None,
+                'user_directory': user_directory.stats()
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return metrics_bp
@@ -0,0 +1,137 @@
+import json
+import time
+import jwt
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from bson import ObjectId
+from models.booking_model import Booking
+from routes.auth import decode_token, token_required
+from services.payments import TERMINAL_STATUSES, check_payment, serialize_intent
+from services.properties import PerHotel, current_hotel_id
+
+# Seconds between status checks on a payment stream, and the longest a stream stays open
+STREAM_POLL_INTERVAL = 0.5
+STREAM_MAX_SECONDS = 300
+
+def init_payment_routes(db, app):
+    """Initialize payment routes with database connection"""
+    payment_bp = Blueprint('payment', __name__)
+    booking_model = PerHotel(Booking(db.bookings))
+    # Created by init_payment_processing before the routes are registered
+    pool = app.extensions['payments']
+    
+    def status_response(intent, status_code):
+        intent_id = str(intent['_id'])
+        response = jsonify({
+            'message': 'Payment is being processed' if intent['status'] not in TERMINAL_STATUSES else 'Payment ' + intent['status'],
+            'payment_intent': serialize_intent(intent),
+            'status_url': f'/api/payment/{intent_id}',
+            'events_url': f'/api/payment/{intent_id}/events'
+        })
+        response.status_code = status_code
+        response.headers['Location'] = f'/api/payment/{intent_id}'
+        return response
+    
+    def can_view(current_user, intent):
+        return current_user.get('role') in ('admin', 'staff') or intent.get('user_id') == str(current_user['user_id'])
+    
+    # Payment endpoint: queues the charge and answers 202; poll status_url or stream events_url
+    @payment_bp.route('/payment', methods=['POST'])
+    @token_required
+    def process_payment(current_user):
+        try:
+            data = request.get_json()
+            
+            booking_id = data.get('booking_id')
+            amount = data.get('amount')
+            payment_method = data.get('payment_method', 'card')
+            
+            if not booking_id or not amount:
+                return jsonify({'error': 'Booking ID and amount are required'}), 400
+            
+            booking = booking_model.get_booking_by_id(booking_id)
+            group = None
+            
+            # Group bookings are paid once for all of their rooms
+            if not booking:
+                group = booking_model.get_group_by_id(booking_id)
+            
+            # The charge is the booking's stored total, never the client's figure
+            amount, error = check_payment(booking, group, current_user, amount)
+            if error:
+                return jsonify({'error': error[0]}), error[1]
+            
+            intent, created = pool.enqueue(
+                str(ObjectId(booking_id)) if isinstance(booking_id, ObjectId) else str(booking_id),
+                group is not None,
+                str(current_user['user_id']) if isinstance(current_user['user_id'], ObjectId) else str(current_user['user_id']),
+                amount,
+                payment_method,
+                hotel_id=current_hotel_id()
+            )
+            if not created and intent['status'] == 'succeeded':
+                return jsonify({'error': 'Booking is already paid'}), 409
+            if created and intent['status'] == 'failed':
+                return jsonify({'error': intent['error']}), 400
+            
+            return status_response(intent, 202)
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @payment_bp.route('/payment/<intent_id>', methods=['GET'])
+    @token_required
+    def payment_status(current_user, intent_id):
+        """Current status of a payment intent (owner, staff or admin)"""
+        try:
+            intent = pool.get(intent_id)
+            if not intent or not can_view(current_user, intent):
+                return jsonify({'error': 'Payment not found'}), 404
+            
+            return status_response(intent, 200)
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @payment_bp.route('/payment/<intent_id>/events', methods=['GET'])
+    def payment_status_stream(intent_id):
+        """Server-Sent Events: one 'payment' event per status change, closed once the payment settles"""
+        # EventSource cannot send headers, so the token may come as a query param
+        token = request.args.get('token')
+        auth_header = request.headers.get('Authorization', '')
+        if not token and auth_header.startswith('Bearer '):
+            token = auth_header.split(' ')[1]
+        if not token:
+            return jsonify({'error': 'Token is missing'}), 401
+        
+        try:
+            current_user = decode_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'error': 'Token has expired'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'error': 'Invalid token'}), 401
+        
+        intent = pool.get(intent_id)
+        if not intent or not can_view(current_user, intent):
+            return jsonify({'error': 'Payment not found'}), 404
+        
+        def generate():
+            current = intent
+            last_seen = None
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            yield "retry: 3000\n\n"
+            while current is not None and time.monotonic() < deadline:
+                state = (current['status'], current.get('attempts'))
+                if state != last_seen:
+                    last_seen = state
+                    yield f"event: payment\ndata: {json.dumps(serialize_intent(current), default=str)}\n\n"
+                if current['status'] in TERMINAL_STATUSES:
+                    return
+                time.sleep(STREAM_POLL_INTERVAL)
+                current = pool.get(intent_id)
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    
+    return payment_bp
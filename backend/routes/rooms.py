@@ -1,24 +1,45 @@
 from flask import Blueprint, request, jsonify
 from models.room_model import Room
+from models.booking_model import Booking
 from routes.auth import token_required, admin_required
+from services.pricing import PricingEngine, quote_rooms
+from services.availability import busy_matrix, encode_rows, MAX_CALENDAR_DAYS
+from services.coalescing import single_flight, coalesced
+from services.properties import PerHotel, current_hotel_id
+from config import Config
+from datetime import datetime
+from pymongo.errors import OperationFailure
 
-rooms_bp = Blueprint('rooms', __name__)
+# Sort options for /rooms/search
+SEARCH_SORTS = {
+    'price_asc': {'price': 1},
+    'price_desc': {'price': -1},
+    'capacity_desc': {'capacity': -1, 'price': 1},
+    'relevance': {}
+}
 
 def init_rooms_routes(db, app):
     """Initialize rooms routes with database connection"""
-    room_model = Room(db.rooms)
+    rooms_bp = Blueprint('rooms', __name__)
+    # Every call goes to the request's property (X-Hotel-Id)
+    room_model = PerHotel(Room(db.rooms))
+    booking_model = PerHotel(Booking(db.bookings))
+    pricing_engine = PricingEngine.from_config(Config)
+    try:
+        room_model.ensure_indexes()
+    except OperationFailure as e:
+        app.logger.warning('Could not create room search indexes: %s', e)
+    # Identical concurrent room reads share one query and one encoded response (per property)
+    rooms_flight = single_flight('rooms', Config.COALESCE_TTL_SECONDS)
     
     @rooms_bp.route('/rooms', methods=['GET'])
+    @coalesced(rooms_flight)
     def get_rooms():
         try:
-            rooms = room_model.get_all_rooms()
-            
-            # Convert ObjectId to string
-            for room in rooms:
-                room['_id'] = str(room['_id'])
+            rooms = room_model.get_room_records()
             
             return jsonify({
-                'rooms': rooms,
+                'rooms': [room.to_dict() for room in rooms],
                 'count': len(rooms)
             }), 200
             
@@ -26,6 +47,7 @@ def init_rooms_routes(db, app):
             return jsonify({'error': str(e)}), 500
     
     @rooms_bp.route('/rooms/available', methods=['GET'])
+    @coalesced(rooms_flight)
     def get_available_rooms():
         try:
             checkin_date = request.args.get('checkin')
@@ -33,20 +55,132 @@ def init_rooms_routes(db, app):
             
             rooms = room_model.get_available_rooms(checkin_date, checkout_date)
             
-            # Convert ObjectId to string
-            for room in rooms:
-                room['_id'] = str(room['_id'])
+            # Quote the whole result set in one pass when dates are given
+            if checkin_date and checkout_date and rooms:
+                nightly_rates, totals = quote_rooms(
+                    pricing_engine, rooms, booking_model, room_model.count_rooms(),
+                    checkin_date, checkout_date
+                )
+                for room, rates, total in zip(rooms, nightly_rates.tolist(), totals.tolist()):
+                    room.nightly_rates = rates
+                    room.total_price = total
             
             return jsonify({
-                'rooms': rooms,
+                'rooms': [room.to_dict() for room in rooms],
                 'count': len(rooms)
             }), 200
             
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @rooms_bp.route('/rooms/search', methods=['GET'])
+    @coalesced(rooms_flight)
+    def search_rooms():
+        """Server-side room filters, sorting, paging and facet counts"""
+        try:
+            args = request.args
+            
+            def number(name, cast=float):
+                value = args.get(name)
+                return cast(value) if value not in (None, '') else None
+            
+            def csv(name):
+                return [value.strip() for value in args.get(name, '').split(',') if value.strip()]
+            
+            sort_name = args.get('sort', 'relevance' if args.get('q') else 'price_asc')
+            if sort_name not in SEARCH_SORTS:
+                return jsonify({'error': f"sort must be one of: {', '.join(SEARCH_SORTS)}"}), 400
+            
+            page = max(1, number('page', int) or 1)
+            limit = min(max(1, number('limit', int) or 20), Config.ROOM_SEARCH_MAX_LIMIT)
+            
+            filters = {
+                'q': args.get('q', '').strip(),
+                'status': args.get('status', 'available'),
+                'types': csv('type'),
+                'min_price': number('min_price'),
+                'max_price': number('max_price'),
+                'min_capacity': number('guests', int),
+                'amenities': csv('amenities')
+            }
+            if filters['status'] == 'any':
+                filters['status'] = None
+            
+            rooms, total, facets = room_model.search_rooms(
+                filters, SEARCH_SORTS[sort_name], (page - 1) * limit, limit,
+                Config.ROOM_SEARCH_PRICE_BUCKETS
+            )
+            
+            return jsonify({
+                'rooms': [room.to_dict() for room in rooms],
+                'count': len(rooms),
+                'total': total,
+                'page': page,
+                'limit': limit,
+                'facets': facets
+            }), 200
+            
+        except ValueError:
+            return jsonify({'error': 'page, limit, guests, min_price and max_price must be numbers'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @rooms_bp.route('/rooms/calendar', methods=['GET'])
+    @coalesced(rooms_flight)
+    def get_rooms_calendar():
+        """Per-room, per-day availability for a date window as base64 bitmaps"""
+        try:
+            from_date = request.args.get('from')
+            to_date = request.args.get('to')
+            
+            if not from_date or not to_date:
+                return jsonify({'error': 'from and to dates are required'}), 400
+            
+            days = (datetime.strptime(to_date, '%Y-%m-%d') - datetime.strptime(from_date, '%Y-%m-%d')).days
+            if days <= 0:
+                return jsonify({'error': 'to date must be after from date'}), 400
+            if days > MAX_CALENDAR_DAYS:
+                return jsonify({'error': f'Calendar window cannot exceed {MAX_CALENDAR_DAYS} days'}), 400
+            
+            rooms = room_model.get_room_records(fields=('name', 'type', 'roomNumber', 'status'))
+            room_ids = [room._id for room in rooms]
+            
+            # One query for every booking touching the window, painted in bulk
+            bookings = booking_model.get_bookings_in_range(from_date, to_date, stale_ok=True)
+            busy = busy_matrix(room_ids, bookings, from_date, to_date)
+            bitmaps = encode_rows(busy)
+            busy_nights = busy.sum(axis=1).tolist()
+            
+            calendar = []
+            for room, bitmap, booked in zip(rooms, bitmaps, busy_nights):
+                calendar.append({
+                    '_id': room._id,
+                    'name': room.get('name'),
+                    'type': room.get('type'),
+                    'roomNumber': room.get('roomNumber'),
+                    'status': room.get('status'),
+                    'busy': bitmap,
+                    'free_days': days - booked
+                })
+            
+            return jsonify({
+                'from': from_date,
+                'to': to_date,
+                'days': days,
+                'encoding': 'base64 bitmap, one bit per day from the from date, most significant bit first, 1 = booked',
+                'free_rooms_per_day': (len(room_ids) - busy.sum(axis=0)).tolist(),
+                'rooms': calendar,
+                'count': len(calendar)
+            }), 200
+            
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
     @rooms_bp.route('/room/<room_id>/status', methods=['PUT'])
-    @token_required
     @admin_required
     def update_room_status(current_user, room_id):
         try:
@@ -59,12 +193,12 @@ def init_rooms_routes(db, app):
             success = room_model.update_room_status(room_id, status)
             
             if success:
-                room = room_model.get_room_by_id(room_id)
+                rooms_flight.invalidate(current_hotel_id())
+                room = room_model.get_room_record(room_id)
                 if room:
-                    room['_id'] = str(room['_id'])
                     return jsonify({
                         'message': 'Room status updated successfully',
-                        'room': room
+                        'room': room.to_dict()
                     }), 200
                 else:
                     return jsonify({'error': 'Room not found'}), 404
@@ -75,7 +209,6 @@ def init_rooms_routes(db, app):
             return jsonify({'error': str(e)}), 500
     
     @rooms_bp.route('/room/<room_id>/cleaning', methods=['PUT'])
-    @token_required
     @admin_required
     def mark_room_for_cleaning(current_user, room_id):
         """Admin can mark a room as needing cleaning"""
@@ -93,12 +226,12 @@ def init_rooms_routes(db, app):
                 room_model.update_room_status(room_id, 'maintenance')
             
             if success:
-                room = room_model.get_room_by_id(room_id)
+                rooms_flight.invalidate(current_hotel_id())
+                room = room_model.get_room_record(room_id)
                 if room:
-                    room['_id'] = str(room['_id'])
                     return jsonify({
                         'message': 'Room marked for cleaning',
-                        'room': room
+                        'room': room.to_dict()
                     }), 200
                 else:
                     return jsonify({'error': 'Room not found'}), 404
@@ -110,29 +243,15 @@ def init_rooms_routes(db, app):
     
     @rooms_bp.route('/rooms/cleaning', methods=['GET'])
     @token_required
+    @coalesced(rooms_flight)
     def get_rooms_needing_cleaning(current_user):
         """Get all rooms that need cleaning (for staff) - includes maintenance and needs_cleaning"""
         try:
-            # Get rooms that need cleaning OR are in maintenance status
             # Staff should see both rooms marked for cleaning and rooms in maintenance
-            from bson import ObjectId
-            
-            # Query for rooms that need cleaning OR are in maintenance
-            query = {
-                '$or': [
-                    {'needs_cleaning': True},
-                    {'status': 'maintenance'}
-                ]
-            }
-            
-            rooms_list = list(room_model.collection.find(query))
-            
-            # Convert ObjectId to string
-            for room in rooms_list:
-                room['_id'] = str(room['_id'])
+            rooms_list = room_model.get_rooms_needing_cleaning()
             
             return jsonify({
-                'rooms': rooms_list,
+                'rooms': [room.to_dict() for room in rooms_list],
                 'count': len(rooms_list)
             }), 200
             
@@ -147,12 +266,12 @@ def init_rooms_routes(db, app):
             success = room_model.mark_room_clean(room_id)
             
             if success:
-                room = room_model.get_room_by_id(room_id)
+                rooms_flight.invalidate(current_hotel_id())
+                room = room_model.get_room_record(room_id)
                 if room:
-                    room['_id'] = str(room['_id'])
                     return jsonify({
                         'message': 'Room marked as clean',
-                        'room': room
+                        'room': room.to_dict()
                     }), 200
                 else:
                     return jsonify({'error': 'Room not found'}), 404
@@ -0,0 +1,110 @@
+from flask import Blueprint, request, jsonify
+from routes.auth import admin_required, token_required
+from config import Config
+from datetime import datetime, timedelta
+
+def init_user_routes(db, app):
+    """Initialize user activity routes with database connection"""
+    user_bp = Blueprint('user', __name__)
+    # Created by init_login_audit before the routes are registered
+    login_audit = app.extensions['login_audit']
+    
+    # User login log endpoint
+    @user_bp.route('/user/login-log', methods=['POST'])
+    @token_required
+    def log_user_login(current_user):
+        try:
+            data = request.get_json()
+            
+            # The role comes from the token: it keys the hourly rollup, so clients must not pick it
+            login_time = login_audit.record(
+                current_user['user_id'],
+                current_user.get('role', 'guest'),
+                email=data.get('email', current_user.get('email', '')),
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get('User-Agent', '')
+            )
+            
+            return jsonify({
+                'message': 'Login logged successfully',
+                'login_time': login_time.isoformat()
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    # User preferences endpoint
+    @user_bp.route('/user/preferences', methods=['POST'])
+    @token_required
+    def save_user_preferences(current_user):
+        try:
+            data = request.get_json()
+            
+            preferences = {
+                'user_id': current_user['user_id'],
+                'checkin_date': data.get('checkin_date'),
+                'checkout_date': data.get('checkout_date'),
+                'updated_at': datetime.utcnow()
+            }
+            
+            # Add login_time if provided
+            if data.get('login_time'):
+                preferences['login_time'] = datetime.utcnow()
+            
+            # Update or insert preferences
+            db.user_preferences.update_one(
+                {'user_id': current_user['user_id']},
+                {'$set': preferences},
+                upsert=True
+            )
+            
+            # Convert datetime to string for JSON serialization
+            preferences_serialized = {
+                'user_id': preferences['user_id'],
+                'checkin_date': preferences['checkin_date'],
+                'checkout_date': preferences['checkout_date'],
+                'updated_at': preferences['updated_at'].isoformat()
+            }
+            if 'login_time' in preferences:
+                preferences_serialized['login_time'] = preferences['login_time'].isoformat()
+            
+            return jsonify({
+                'message': 'Preferences saved successfully',
+                'preferences': preferences_serialized
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    # Hourly login counts per role, from the pre-computed rollup
+    @user_bp.route('/admin/login-stats', methods=['GET'])
+    @admin_required
+    def get_login_stats(current_user):
+        try:
+            try:
+                end = datetime.strptime(request.args['to'], '%Y-%m-%d') if request.args.get('to') else datetime.utcnow()
+                end = end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+                start = (datetime.strptime(request.args['from'], '%Y-%m-%d') if request.args.get('from')
+                         else end - timedelta(days=7))
+            except ValueError:
+                return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+            if not timedelta(0) < end - start <= timedelta(days=Config.LOGIN_STATS_MAX_DAYS):
+                return jsonify({'error': f'from must be before to, at most {Config.LOGIN_STATS_MAX_DAYS} days apart'}), 400
+            
+            hours = login_audit.hourly_counts(start, end, request.args.get('role'))
+            totals = {}
+            for row in hours:
+                totals[row['role']] = totals.get(row['role'], 0) + row['count']
+                row['hour'] = row['hour'].isoformat()
+            
+            return jsonify({
+                'from': start.strftime('%Y-%m-%d'),
+                'to': (end - timedelta(days=1)).strftime('%Y-%m-%d'),
+                'hours': hours,
+                'totals': totals
+            }), 200
+            
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return user_bp
@@ -0,0 +1,103 @@
+from flask import Blueprint, request, jsonify
+from models.room_model import Room
+from routes.auth import token_required
+from services.waitlist import room_target, serialize_entry, type_target
+from services.properties import PerHotel
+from config import Config
+from datetime import datetime
+
+def init_waitlist_routes(db, app):
+    """Initialize waitlist routes with database connection"""
+    waitlist_bp = Blueprint('waitlist', __name__)
+    # Every call goes to the request's property (X-Hotel-Id)
+    room_model = PerHotel(Room(db.rooms))
+    # Created by init_waitlist before the routes are registered
+    waitlist = PerHotel(app.extensions['waitlist'])
+    
+    # Join the waitlist for a room (room_id) or any room of a type (room_type) that is booked out
+    @waitlist_bp.route('/waitlist', methods=['POST'])
+    @token_required
+    def join_waitlist(current_user):
+        try:
+            data = request.get_json()
+            
+            # Validate required fields
+            required_fields = ['checkin_date', 'checkout_date', 'guests']
+            for field in required_fields:
+                if field not in data:
+                    return jsonify({'error': f'{field} is required'}), 400
+            
+            room_id = data.get('room_id')
+            room_type = data.get('room_type')
+            if not room_id and not room_type:
+                return jsonify({'error': 'room_id or room_type is required'}), 400
+            
+            checkin_date = data['checkin_date']
+            checkout_date = data['checkout_date']
+            
+            # Validate dates
+            checkin = datetime.strptime(checkin_date, '%Y-%m-%d')
+            checkout = datetime.strptime(checkout_date, '%Y-%m-%d')
+            
+            if checkin >= checkout:
+                return jsonify({'error': 'Check-out date must be after check-in date'}), 400
+            
+            if checkin < datetime.now().replace(hour=0, minute=0, second=0, microsecond=0):
+                return jsonify({'error': 'Check-in date cannot be in the past'}), 400
+            
+            if room_id:
+                room = room_model.get_room_by_id(room_id)
+                if not room:
+                    return jsonify({'error': 'Room not found'}), 404
+                room_id = str(room_id)
+                room_type = room.get('type', '')
+            
+            user_id = current_user['user_id']
+            target = room_target(room_id) if room_id else type_target(room_type)
+            if waitlist.find_waiting(user_id, target, checkin_date, checkout_date):
+                return jsonify({'error': 'You are already on the waitlist for these dates'}), 409
+            
+            if waitlist.count_waiting(user_id) >= Config.WAITLIST_MAX_PER_USER:
+                return jsonify({'error': f'You can be on the waitlist for at most {Config.WAITLIST_MAX_PER_USER} stays'}), 400
+            
+            entry = waitlist.join(user_id, room_id, room_type, checkin_date, checkout_date, data['guests'])
+            
+            return jsonify({
+                'message': 'Added to the waitlist',
+                'entry': serialize_entry(entry)
+            }), 201
+        
+        except ValueError:
+            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @waitlist_bp.route('/waitlist', methods=['GET'])
+    @token_required
+    def get_waitlist(current_user):
+        """The user's waitlist entries, newest first; promoted ones carry their hold's booking_id"""
+        try:
+            entries = [serialize_entry(entry) for entry in waitlist.user_entries(current_user['user_id'])]
+            return jsonify({
+                'entries': entries,
+                'count': len(entries)
+            }), 200
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    @waitlist_bp.route('/waitlist/<entry_id>', methods=['DELETE'])
+    @token_required
+    def leave_waitlist(current_user, entry_id):
+        try:
+            if not waitlist.cancel(entry_id, current_user['user_id']):
+                return jsonify({'error': 'Waitlist entry not found'}), 404
+            
+            return jsonify({
+                'message': 'Removed from the waitlist'
+            }), 200
+        
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
+    return waitlist_bp
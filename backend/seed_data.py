@@ -1,7 +1,10 @@
 """
 Seed script to populate MongoDB with sample data
 Run this script after starting MongoDB and Flask server
+(python seed_data.py --hotels N seeds the rooms at N properties)
 """
+import argparse
+from config import Config
 from pymongo import MongoClient
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash
@@ -11,8 +14,8 @@ MONGO_URI = 'mongodb://localhost:27017/easestay'
 client = MongoClient(MONGO_URI)
 db = client.easestay
 
-def seed_rooms():
-    """Seed rooms collection with 45 diverse room types"""
+def seed_rooms(hotel_ids=(Config.DEFAULT_HOTEL_ID,)):
+    """Seed rooms collection with 45 diverse room types at each property"""
     print("Seeding rooms...")
     
     rooms = [
@@ -549,9 +552,9 @@ def seed_rooms():
     # Clear existing rooms
     db.rooms.delete_many({})
     
-    # Insert rooms
-    result = db.rooms.insert_many(rooms)
-    print(f"Inserted {len(result.inserted_ids)} rooms")
+    # Insert rooms, one copy per property
+    result = db.rooms.insert_many([dict(room, hotel_id=hotel_id) for hotel_id in hotel_ids for room in rooms])
+    print(f"Inserted {len(result.inserted_ids)} rooms at {len(hotel_ids)} properties")
 
 def seed_users():
     """Seed users collection"""
@@ -596,12 +599,18 @@ def seed_users():
 
 def main():
     """Main seed function"""
+    parser = argparse.ArgumentParser(description='Seed EaseStay sample data')
+    parser.add_argument('--hotels', type=int, default=1,
+                        help='Properties to seed: DEFAULT_HOTEL_ID, then hotel-2, hotel-3, ...')
+    args = parser.parse_args()
+    hotel_ids = [Config.DEFAULT_HOTEL_ID] + [f'hotel-{n}' for n in range(2, args.hotels + 1)]
+    
     try:
         print("=" * 50)
         print("EaseStay Database Seeding")
         print("=" * 50)
         
-        seed_rooms()
+        seed_rooms(hotel_ids)
         seed_users()
         
         print("=" * 50)
@@ -611,7 +620,7 @@ def main():
         print("Admin: admin@easestay.com / admin123")
         print("Staff: staff@easestay.com / staff123")
         print("Guest: guest@easestay.com / guest123")
-        print(f"\nTotal Rooms Created: 45")
+        print(f"\nTotal Rooms Created: {45 * len(hotel_ids)} ({', '.join(hotel_ids)})")
         
     except Exception as e:
         print(f"Error during seeding: {str(e)}")
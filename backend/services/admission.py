@@ -0,0 +1,223 @@
+import itertools
+import math
+import threading
+import time
+from flask import g, jsonify, request
+from pymongo import monitoring
+
+# Commands whose duration says nothing about server load (cursor waits, handshakes)
+_IGNORED_COMMANDS = {'getMore', 'hello', 'ismaster', 'isMaster', 'saslStart', 'saslContinue',
+                     'endSessions', 'killCursors'}
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, class_name, reason, retry_after):
+        super().__init__(f'{class_name}: {reason}')
+        self.class_name = class_name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CommandLatency(monitoring.CommandListener):
+    """Exponentially weighted moving average of MongoDB command latency for one client"""
+
+    def __init__(self, alpha=0.2):
+        self.alpha = alpha
+        self.ewma_ms = None
+        self.lock = threading.Lock()
+
+    def _observe(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        sample = event.duration_micros / 1000.0
+        with self.lock:
+            if self.ewma_ms is None:
+                self.ewma_ms = sample
+            else:
+                self.ewma_ms += self.alpha * (sample - self.ewma_ms)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event)
+
+    def failed(self, event):
+        self._observe(event)
+
+
+class _Class:
+    __slots__ = ('name', 'priority', 'limit', 'queue', 'timeout', 'active', 'waiting',
+                 'admitted', 'rejected_queue_full', 'rejected_timeout')
+
+    def __init__(self, name, priority, limit, queue, timeout):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+
+class AdmissionController:
+    """
+    Concurrency limiter shared by every request class of one process.
+    Each class has its own concurrency limit, a bounded wait queue and a
+    maximum wait; all classes also share `capacity` slots. When a slot frees
+    up it goes to the waiting request of the highest priority class (lowest
+    number) whose class is under its limit. With a latency monitor, capacity
+    and class limits shrink as MongoDB command latency rises above the target.
+    """
+
+    def __init__(self, capacity, classes, retry_after=1, latency=None,
+                 latency_target_ms=50.0, min_fraction=0.25):
+        self.capacity = capacity
+        self.classes = {
+            name: _Class(name, spec['priority'], spec['limit'], spec['queue'], spec['timeout'])
+            for name, spec in classes.items()
+        }
+        self.retry_after = retry_after
+        self.latency = latency
+        self.latency_target_ms = latency_target_ms
+        self.min_fraction = min_fraction
+        self.in_use = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+
+    def load_factor(self):
+        """Share of the configured limits currently allowed (1.0 unless Mongo is slow)"""
+        if self.latency is None or self.latency.ewma_ms is None:
+            return 1.0
+        if self.latency.ewma_ms <= self.latency_target_ms:
+            return 1.0
+        return max(self.min_fraction, self.latency_target_ms / self.latency.ewma_ms)
+
+    def _limits(self):
+        factor = self.load_factor()
+        return max(1, math.floor(self.capacity * factor)), factor
+
+    def _class_limit(self, cls, factor):
+        return max(1, math.floor(cls.limit * factor))
+
+    def _can_run(self, cls, capacity, factor):
+        return self.in_use < capacity and cls.active < self._class_limit(cls, factor)
+
+    def _is_next(self, waiter, capacity, factor):
+        """True if no better-placed waiter could take the free slot instead"""
+        for other in sorted(self.waiters):
+            cls = self.classes[other[2]]
+            if self._can_run(cls, capacity, factor):
+                return other is waiter
+        return False
+
+    def acquire(self, class_name):
+        """Block until the request may run, or raise AdmissionRejected"""
+        cls = self.classes[class_name]
+        with self.condition:
+            capacity, factor = self._limits()
+            if not self.waiters and self._can_run(cls, capacity, factor):
+                self._admit(cls)
+                return
+
+            if cls.waiting >= cls.queue:
+                cls.rejected_queue_full += 1
+                raise AdmissionRejected(class_name, 'queue full', self.retry_after)
+
+            waiter = (cls.priority, next(self.sequence), class_name)
+            self.waiters.append(waiter)
+            cls.waiting += 1
+            deadline = time.monotonic() + cls.timeout
+            try:
+                while True:
+                    capacity, factor = self._limits()
+                    if self._can_run(cls, capacity, factor) and self._is_next(waiter, capacity, factor):
+                        self._admit(cls)
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        cls.rejected_timeout += 1
+                        raise AdmissionRejected(class_name, 'timed out waiting', self.retry_after)
+                    # Wake up periodically too: limits move with latency, not only on release
+                    self.condition.wait(min(remaining, 0.25))
+            finally:
+                self.waiters.remove(waiter)
+                cls.waiting -= 1
+                self.condition.notify_all()
+
+    def _admit(self, cls):
+        self.in_use += 1
+        cls.active += 1
+        cls.admitted += 1
+
+    def release(self, class_name):
+        cls = self.classes[class_name]
+        with self.condition:
+            self.in_use -= 1
+            cls.active -= 1
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            capacity, factor = self._limits()
+            return {
+                'capacity': capacity,
+                'in_use': self.in_use,
+                'load_factor': round(factor, 3),
+                'mongo_latency_ms': round(self.latency.ewma_ms, 2) if self.latency and self.latency.ewma_ms is not None else None,
+                'classes': {
+                    cls.name: {
+                        'priority': cls.priority,
+                        'limit': self._class_limit(cls, factor),
+                        'active': cls.active,
+                        'waiting': cls.waiting,
+                        'admitted': cls.admitted,
+                        'rejected_queue_full': cls.rejected_queue_full,
+                        'rejected_timeout': cls.rejected_timeout
+                    }
+                    for cls in sorted(self.classes.values(), key=lambda c: c.priority)
+                }
+            }
+
+
+def init_admission_control(app, controller, routes, default_class):
+    """
+    Run every request through the controller. routes maps an endpoint
+    ('bookings.create_booking') or a blueprint name ('rooms') to a class
+    name; None exempts it (health checks, metrics, event streams).
+    """
+    app.extensions['admission'] = controller
+
+    def class_for(endpoint, blueprint):
+        if endpoint in routes:
+            return routes[endpoint]
+        if blueprint in routes:
+            return routes[blueprint]
+        return default_class
+
+    @app.before_request
+    def admit():
+        if request.method == 'OPTIONS' or request.endpoint is None:
+            return None
+        class_name = class_for(request.endpoint, request.blueprint)
+        if class_name is None:
+            return None
+        try:
+            controller.acquire(class_name)
+        except AdmissionRejected as e:
+            response = jsonify({'error': 'Server is busy, please retry shortly'})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        g.admission_class = class_name
+        return None
+
+    @app.teardown_request
+    def release(exc):
+        class_name = g.pop('admission_class', None)
+        if class_name is not None:
+            controller.release(class_name)
@@ -0,0 +1,188 @@
+import time
+import numpy as np
+from datetime import date, timedelta
+from services.availability import busy_matrix
+
+
+def _shift(day, days):
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+def _window(room_ids, bookings, checkin_date, checkout_date, horizon):
+    """Busy matrix over [checkin_date - horizon, checkout_date + horizon) and the stay's column slice"""
+    window_start = _shift(checkin_date, -horizon)
+    window_end = _shift(checkout_date, horizon)
+    busy = busy_matrix(room_ids, bookings, window_start, window_end)
+    nights = busy.shape[1] - 2 * horizon
+    return busy, slice(horizon, horizon + nights)
+
+
+def _pick(busy, stay, horizon):
+    """Row index of the free room with the tightest surrounding gap, or None"""
+    occupied = busy[:, stay]
+
+    # Inventory counter check: if any night is fully booked, nothing can fit
+    if (occupied.sum(axis=0) >= busy.shape[0]).any():
+        return None
+
+    free = ~occupied.any(axis=1)
+    if not free.any():
+        return None
+
+    before = busy[:, :stay.start][:, ::-1]
+    after = busy[:, stay.stop:]
+    gap_before = np.where(before.any(axis=1), before.argmax(axis=1), horizon)
+    gap_after = np.where(after.any(axis=1), after.argmax(axis=1), horizon)
+
+    gaps = np.where(free, gap_before + gap_after, np.iinfo(np.int64).max)
+    return int(gaps.argmin())
+
+
+def best_fit(room_ids, bookings, checkin_date, checkout_date, horizon, quantity=1):
+    """
+    Pick the rooms whose free blocks around the stay are the tightest fit.
+
+    Bookings must cover [checkin_date - horizon, checkout_date + horizon).
+    For every room that is free for the whole stay we measure the free nights
+    directly before and after it (capped at the horizon) and choose the room
+    with the smallest surrounding gap, so long free blocks elsewhere stay
+    intact for future long stays. With quantity > 1 each pick is painted into
+    the calendar before the next one. Returns a list of room ids, or None if
+    fewer than quantity rooms are free.
+    """
+    if len(room_ids) < quantity:
+        return None
+
+    busy, stay = _window(room_ids, bookings, checkin_date, checkout_date, horizon)
+
+    chosen = []
+    for _ in range(quantity):
+        row = _pick(busy, stay, horizon)
+        if row is None:
+            return None
+        busy[row, stay] = True
+        chosen.append(room_ids[row])
+    return chosen
+
+
+class RoomAllocator:
+    def __init__(self, room_model, booking_model, horizon=14, inventory_ttl=60):
+        self.room_model = room_model
+        self.booking_model = booking_model
+        self.horizon = horizon
+        self.inventory_ttl = inventory_ttl
+        # hotel_id -> (loaded at, room ids by type)
+        self._inventory = {}
+
+    def inventory(self, room_type):
+        """
+        Bookable room ids for a type at the room model's property, from a
+        per-property cache refreshed every inventory_ttl seconds
+        """
+        hotel_id = self.room_model.hotel_id
+        loaded_at, by_type = self._inventory.get(hotel_id, (0, {}))
+        if time.monotonic() - loaded_at > self.inventory_ttl:
+            inventory = {}
+            for room in self.room_model.get_all_rooms(('type', 'status', 'roomNumber')):
+                if room.get('status') != 'available':
+                    continue
+                inventory.setdefault(room.get('type'), []).append((room.get('roomNumber', ''), str(room['_id'])))
+            # Sort by room number so ties go to the same room every time
+            by_type = {t: [room_id for _, room_id in sorted(rooms)] for t, rooms in inventory.items()}
+            self._inventory[hotel_id] = (time.monotonic(), by_type)
+        return by_type.get(room_type, [])
+
+    def invalidate(self, hotel_id=None):
+        """Drop the cached inventory of one property, or of all (call after room status changes)"""
+        if hotel_id is None:
+            self._inventory = {}
+        else:
+            self._inventory.pop(hotel_id, None)
+
+    def _still_available(self, room_ids):
+        """Re-read the chosen rooms: the cached inventory may predate a status change made elsewhere"""
+        rooms = self.room_model.get_rooms_by_ids(room_ids)
+        return all(room and room.get('status') == 'available' for room in rooms)
+
+    def allocate(self, room_type, checkin_date, checkout_date):
+        """Choose a concrete room of the given type for a stay, or None if the type is sold out"""
+        room_id = self._allocate(room_type, checkin_date, checkout_date)
+        if room_id and not self._still_available([room_id]):
+            # Stale inventory: reload it once and pick again
+            self.invalidate(self.room_model.hotel_id)
+            room_id = self._allocate(room_type, checkin_date, checkout_date)
+        return room_id
+
+    def _allocate(self, room_type, checkin_date, checkout_date):
+        room_ids = self.inventory(room_type)
+        if not room_ids:
+            return None
+
+        bookings = self.booking_model.get_bookings_in_range(
+            _shift(checkin_date, -self.horizon),
+            _shift(checkout_date, self.horizon),
+            room_ids=room_ids
+        )
+
+        # Per-type counter: a room booked for any night of the stay cannot take it,
+        # so once every room of the type is counted there is nothing to score
+        booked = {str(b['room_id']) for b in bookings
+                  if b['checkin_date'] < checkout_date and b['checkout_date'] > checkin_date}
+        if len(booked) >= len(room_ids):
+            return None
+
+        chosen = best_fit(room_ids, bookings, checkin_date, checkout_date, self.horizon)
+        return chosen[0] if chosen else None
+
+    def allocate_group(self, room_ids, type_quantities, checkin_date, checkout_date):
+        """
+        Resolve a group request to concrete rooms with a single bookings query.
+        room_ids are rooms the guest picked; type_quantities maps room type to
+        the number of rooms wanted. Returns (room ids, unavailable) where
+        unavailable lists the room ids and types that could not be satisfied.
+        """
+        chosen, unavailable = self._allocate_group(room_ids, type_quantities, checkin_date, checkout_date)
+        if type_quantities and chosen and not self._still_available(chosen):
+            # Stale inventory: reload it once and pick again
+            self.invalidate(self.room_model.hotel_id)
+            chosen, unavailable = self._allocate_group(room_ids, type_quantities, checkin_date, checkout_date)
+        return chosen, unavailable
+
+    def _allocate_group(self, room_ids, type_quantities, checkin_date, checkout_date):
+        inventories = {room_type: self.inventory(room_type) for room_type in type_quantities}
+        candidates = list(dict.fromkeys(room_ids))
+        seen = set(candidates)
+        for type_room_ids in inventories.values():
+            candidates.extend(r for r in type_room_ids if r not in seen)
+            seen.update(type_room_ids)
+
+        bookings = self.booking_model.get_bookings_in_range(
+            _shift(checkin_date, -self.horizon),
+            _shift(checkout_date, self.horizon),
+            room_ids=candidates
+        )
+        busy, stay = _window(candidates, bookings, checkin_date, checkout_date, self.horizon)
+        row_of = {room_id: row for row, room_id in enumerate(candidates)}
+
+        chosen = []
+        unavailable = []
+        for room_id in room_ids:
+            row = row_of[room_id]
+            if busy[row, stay].any():
+                unavailable.append(room_id)
+            else:
+                busy[row, stay] = True
+                chosen.append(room_id)
+
+        for room_type, quantity in type_quantities.items():
+            rows = [row_of[r] for r in inventories[room_type]]
+            for _ in range(quantity):
+                # Only this type's rows are scored; rows already picked are busy
+                row = _pick(busy[rows], stay, self.horizon) if rows else None
+                if row is None:
+                    unavailable.append(room_type)
+                    break
+                busy[rows[row], stay] = True
+                chosen.append(candidates[rows[row]])
+
+        return chosen, unavailable
@@ -0,0 +1,43 @@
+import base64
+import numpy as np
+from services.pricing import night_range
+
+# Longest window the calendar endpoint will paint in one request
+MAX_CALENDAR_DAYS = 366
+
+
+def busy_matrix(room_ids, bookings, from_date, to_date):
+    """
+    Paint bookings onto a [rooms, days] boolean matrix, True where the room is
+    booked for that night. Each booking touches two cells of a difference
+    matrix, then a cumulative sum along the day axis fills in the stays.
+    """
+    days = night_range(from_date, to_date)
+    row_of = {room_id: row for row, room_id in enumerate(room_ids)}
+
+    rows = []
+    starts = []
+    ends = []
+    for booking in bookings:
+        row = row_of.get(str(booking.get('room_id')))
+        if row is None:
+            continue
+        rows.append(row)
+        starts.append(booking['checkin_date'])
+        ends.append(booking['checkout_date'])
+
+    diff = np.zeros((len(room_ids), len(days) + 1), dtype=np.int32)
+    if rows and len(days):
+        origin = days[0]
+        start_idx = np.clip((np.array(starts, dtype='datetime64[D]') - origin).astype(np.int64), 0, len(days))
+        end_idx = np.clip((np.array(ends, dtype='datetime64[D]') - origin).astype(np.int64), 0, len(days))
+        np.add.at(diff, (rows, start_idx), 1)
+        np.add.at(diff, (rows, end_idx), -1)
+
+    return np.cumsum(diff[:, :-1], axis=1) > 0
+
+
+def encode_rows(matrix):
+    """Pack each row into a bitmap (first day = most significant bit) and base64 it"""
+    packed = np.packbits(matrix, axis=1)
+    return [base64.b64encode(row.tobytes()).decode('ascii') for row in packed]
@@ -0,0 +1,153 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, make_response, request
+from services.properties import current_hotel_id
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'expires', 'generation')
+
+    def __init__(self, generation):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires = 0.0
+        self.generation = generation
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls with the same key into one execution.
+    The first caller runs the function; callers arriving while it runs wait
+    and receive the same result. With ttl > 0 a cacheable result is also
+    served to callers arriving up to ttl seconds after it finished.
+    """
+
+    def __init__(self, name, ttl=0.0, max_entries=1024):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.calls = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def do(self, key, fn, cacheable=None):
+        """Return fn() for this key, sharing an in-flight or recent result when there is one"""
+        with self.lock:
+            self.requests += 1
+            call = self.calls.get(key)
+            if call is not None:
+                if not call.done.is_set():
+                    self.coalesced += 1
+                elif call.expires > time.monotonic():
+                    self.cache_hits += 1
+                    return call.result
+                else:
+                    call = None
+            if call is None:
+                call = _Call(self.generation)
+                self.calls[key] = call
+                self.executions += 1
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+        finally:
+            with self.lock:
+                keep = (
+                    self.ttl > 0 and call.error is None
+                    and call.generation == self.generation
+                    and (cacheable is None or cacheable(call.result))
+                )
+                if keep:
+                    call.expires = time.monotonic() + self.ttl
+                    self._evict()
+                elif self.calls.get(key) is call:
+                    del self.calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def invalidate(self, scope=None):
+        """
+        Forget finished results (only those whose key starts with scope, when
+        given); results of calls already running are not kept
+        """
+        with self.lock:
+            self.generation += 1
+            self.calls = {
+                key: call for key, call in self.calls.items()
+                if not call.done.is_set() or (scope is not None and key[0] != scope)
+            }
+
+    def _evict(self):
+        if len(self.calls) <= self.max_entries:
+            return
+        now = time.monotonic()
+        self.calls = {
+            key: call for key, call in self.calls.items()
+            if not call.done.is_set() or call.expires > now
+        }
+
+    def stats(self):
+        with self.lock:
+            collapsed = self.coalesced + self.cache_hits
+            return {
+                'ttl_seconds': self.ttl,
+                'requests': self.requests,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'cache_hits': self.cache_hits,
+                'collapsed_ratio': round(collapsed / self.requests, 4) if self.requests else 0.0,
+                'in_flight': sum(1 for call in self.calls.values() if not call.done.is_set())
+            }
+
+
+# Every flight created by the routes, by name, for the metrics endpoint
+flights = {}
+
+
+def single_flight(name, ttl=0.0):
+    """Create (or replace) the named flight"""
+    flights[name] = SingleFlight(name, ttl)
+    return flights[name]
+
+
+def coalesced(flight):
+    """
+    Decorator for idempotent GET views: identical requests (same property,
+    path and query string) share one execution and its encoded response
+    body. Only 200 responses are kept for the flight's ttl; invalidate with
+    the property's hotel_id to drop only that property's results.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (current_hotel_id(), request.path, tuple(sorted(request.args.items(multi=True))))
+
+            def render():
+                response = make_response(view(*args, **kwargs))
+                return response.status_code, response.headers.get('Content-Type'), response.get_data()
+
+            status, content_type, body = flight.do(key, render, cacheable=lambda result: result[0] == 200)
+            return current_app.response_class(body, status=status, content_type=content_type)
+
+        return wrapper
+    return decorator
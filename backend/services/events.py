@@ -0,0 +1,192 @@
+import json
+import queue
+import threading
+from collections import OrderedDict, deque
+from pymongo.errors import PyMongoError
+
+# Fields pushed to dashboards for each kind of document
+ROOM_FIELDS = ('name', 'type', 'price', 'capacity', 'roomNumber', 'image', 'status', 'needs_cleaning')
+BOOKING_FIELDS = (
+    'user_id', 'room_id', 'room_number', 'room_name', 'room_type', 'group_id',
+    'checkin_date', 'checkout_date', 'guests', 'total_price', 'status', 'payment_status', 'created_at'
+)
+FIELDS_BY_KIND = {'room': ROOM_FIELDS, 'booking': BOOKING_FIELDS}
+KIND_BY_COLLECTION = {'rooms': 'room', 'bookings': 'booking'}
+
+
+class Subscription:
+    def __init__(self, queue_size, hotel_id=None):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+        # Only this property's events (None: every property's)
+        self.hotel_id = hotel_id
+
+    def wants(self, event):
+        # Events of unknown property only go to subscribers following every property
+        return self.hotel_id is None or event.get('hotel_id') == self.hotel_id
+
+
+class EventBus:
+    """
+    In-process fan-out of room and booking deltas to SSE subscribers.
+    Recent events are kept in a ring buffer so reconnecting clients can
+    resume from their Last-Event-ID instead of reloading everything.
+    """
+
+    def __init__(self, history_size=1000, queue_size=256):
+        self.queue_size = queue_size
+        self.history = deque(maxlen=history_size)
+        self.subscribers = set()
+        self.last_id = 0
+        self.source = 'local'
+        self.lock = threading.Lock()
+
+    def publish(self, kind, op, doc_id, fields=None, hotel_id=None):
+        """Assign the next event id and deliver a delta to every subscriber following its property"""
+        with self.lock:
+            self.last_id += 1
+            event = {
+                'id': self.last_id,
+                'type': kind,
+                'op': op,
+                '_id': str(doc_id),
+                'hotel_id': hotel_id,
+                'fields': _select(kind, fields or {})
+            }
+            self.history.append(event)
+            for sub in self.subscribers:
+                if not sub.wants(event):
+                    continue
+                try:
+                    sub.queue.put_nowait(event)
+                except queue.Full:
+                    # Slow client: end its stream, it will resume via Last-Event-ID
+                    sub.overflowed = True
+        return event
+
+    def subscribe(self, last_event_id=None, hotel_id=None):
+        """Register a subscriber, replaying anything it missed since last_event_id"""
+        sub = Subscription(self.queue_size, hotel_id)
+        with self.lock:
+            if last_event_id is not None:
+                oldest = self.history[0]['id'] if self.history else self.last_id + 1
+                if last_event_id + 1 < oldest:
+                    # Too far behind to replay: tell the client to reload
+                    sub.queue.put_nowait({'id': self.last_id, 'type': 'reset', 'op': 'reload', '_id': '', 'fields': {}})
+                else:
+                    for event in self.history:
+                        if event['id'] > last_event_id and sub.wants(event) and not sub.queue.full():
+                            sub.queue.put_nowait(event)
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+
+class ChangeStreamWatcher:
+    """
+    One background thread per process tailing a Mongo change stream on rooms
+    and bookings and publishing each change on the bus. Change streams need a
+    replica set; on a standalone server start() returns False and the models'
+    local publishes feed the bus instead.
+
+    Updates are watched with updateLookup so their hotel_id is known. A
+    delete only carries the document key, which holds hotel_id on sharded
+    collections alone, so the property of recently seen documents is
+    remembered (up to hotel_cache_size of them) for their deletes.
+    """
+
+    def __init__(self, db, bus, hotel_cache_size=10000):
+        self.db = db
+        self.bus = bus
+        self.thread = None
+        self.lock = threading.Lock()
+        self.hotel_cache_size = hotel_cache_size
+        self.hotel_of = OrderedDict()
+
+    def start(self):
+        """Start the shared watcher if it is not running yet"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return True
+
+            pipeline = [{'$match': {'ns.coll': {'$in': list(KIND_BY_COLLECTION)}}}]
+            try:
+                stream = self.db.watch(pipeline, full_document='updateLookup')
+            except PyMongoError:
+                self.bus.source = 'local'
+                return False
+
+            self.bus.source = 'change_stream'
+            self.thread = threading.Thread(target=self._run, args=(stream,), daemon=True)
+            self.thread.start()
+            return True
+
+    def _run(self, stream):
+        try:
+            with stream:
+                for change in stream:
+                    self._publish(change)
+        except PyMongoError:
+            pass
+        finally:
+            # Fall back to local publishes until a subscriber restarts the watcher
+            self.bus.source = 'local'
+
+    def _hotel_id(self, change):
+        """The changed document's property, from the document, its key or an earlier change"""
+        key = (change['ns']['coll'], change['documentKey']['_id'])
+        document = change.get('fullDocument') or {}
+        # The document key holds the shard key (and so hotel_id) on sharded collections
+        hotel_id = document.get('hotel_id', change['documentKey'].get('hotel_id'))
+        if change['operationType'] == 'delete':
+            cached = self.hotel_of.pop(key, None)
+            return hotel_id if hotel_id is not None else cached
+        if hotel_id is not None:
+            self.hotel_of[key] = hotel_id
+            self.hotel_of.move_to_end(key)
+            if len(self.hotel_of) > self.hotel_cache_size:
+                self.hotel_of.popitem(last=False)
+        return hotel_id
+
+    def _publish(self, change):
+        kind = KIND_BY_COLLECTION.get(change['ns']['coll'])
+        op = change['operationType']
+        doc_id = change['documentKey']['_id']
+        hotel_id = self._hotel_id(change)
+
+        if op in ('insert', 'replace'):
+            self.bus.publish(kind, op, doc_id, change.get('fullDocument') or {}, hotel_id)
+        elif op == 'update':
+            fields = change.get('updateDescription', {}).get('updatedFields', {})
+            if _select(kind, fields):
+                self.bus.publish(kind, op, doc_id, fields, hotel_id)
+        elif op == 'delete':
+            self.bus.publish(kind, op, doc_id, hotel_id=hotel_id)
+
+
+def _select(kind, fields):
+    allowed = FIELDS_BY_KIND.get(kind, ())
+    return {key: value for key, value in fields.items() if key in allowed}
+
+
+def format_sse(event):
+    """Encode an event in text/event-stream framing"""
+    payload = json.dumps(event, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+# Shared per-process bus used by the models and the /api/events stream
+event_bus = EventBus()
+
+
+def publish_local(kind, op, doc_id, fields=None, hotel_id=None):
+    """Publish a change made by this process, unless a change stream already reports it"""
+    if event_bus.source == 'local':
+        event_bus.publish(kind, op, doc_id, fields, hotel_id)
@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+def date_range(field, start=None, end=None):
+    """
+    Query on field for YYYY-MM-DD bounds, both inclusive. Raises ValueError
+    for malformed dates or an end before the start.
+    """
+    bounds = {}
+    if start:
+        bounds['$gte'] = datetime.strptime(start, '%Y-%m-%d')
+    if end:
+        bounds['$lt'] = datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)
+    if start and end and bounds['$lt'] <= bounds['$gte']:
+        raise ValueError('to must not be before from')
+    return {field: bounds} if bounds else {}
+
+
+def _plain(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_plain)
+    return value
+
+
+def _batches(cursors, batch_size):
+    """Documents from each cursor in turn, grouped into lists of batch_size"""
+    batch = []
+    for cursor in cursors:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def _encode_csv(columns, rows, header):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow(['' if row.get(column) is None else _plain(row.get(column)) for column in columns])
+    return buffer.getvalue().encode('utf-8')
+
+
+def _encode_ndjson(columns, rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: row.get(column) for column in columns}, default=_plain))
+        lines.append('\n')
+    return ''.join(lines).encode('utf-8')
+
+
+def stream_rows(cursors, columns, fmt, batch_size, enrich=None, compress=False):
+    """
+    Encode documents from server-side cursors as CSV or NDJSON bytes, one
+    chunk per cursor batch, so memory stays bounded by batch_size however
+    many rows are exported. enrich(batch) may add joined columns to the
+    documents of a batch in place (one lookup per batch, not per row).
+    With compress, the chunks form one gzip stream.
+    """
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(chunk):
+        return gzip.compress(chunk) if gzip else chunk
+
+    if fmt == 'csv':
+        chunk = emit(_encode_csv(columns, [], header=True))
+        if chunk:
+            yield chunk
+    for batch in _batches(cursors, batch_size):
+        if enrich:
+            enrich(batch)
+        encoded = _encode_csv(columns, batch, header=False) if fmt == 'csv' else _encode_ndjson(columns, batch)
+        chunk = emit(encoded)
+        if chunk:
+            yield chunk
+    if gzip:
+        yield gzip.flush()
@@ -0,0 +1,174 @@
+"""
+Login audit log and its hourly rollup.
+
+Logins are stored in user_login_logs, a MongoDB time-series collection
+bucketed by login_time with {user_id, role} as the series metadata, so
+MongoDB packs each user's logins into compressed buckets and drops whole
+buckets once they pass the retention window. Each login also increments
+its (hour, role) counter in login_counts_hourly, which is what the admin
+login stats read: answering "how many staff logins per hour last week"
+never touches the raw log.
+
+Time-series collections need MongoDB 5.0+. On older servers (or engines
+without them) the log falls back to a regular collection with a TTL index
+on login_time.
+"""
+import logging
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+LOG_COLLECTION = 'user_login_logs'
+ROLLUP_COLLECTION = 'login_counts_hourly'
+
+
+def hour_of(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def flatten_login_log(doc):
+    """Export/API view of a log entry: the metadata fields back at the top level"""
+    meta = doc.pop('meta', None) or {}
+    doc.setdefault('user_id', meta.get('user_id'))
+    doc.setdefault('role', meta.get('role'))
+    return doc
+
+
+def _collection_info(db, name):
+    return next(iter(db.list_collections(filter={'name': name})), None)
+
+
+def ensure_login_log_collection(db, retention_days, granularity='hours'):
+    """
+    Create user_login_logs as a time-series collection expiring entries
+    after retention_days, or bring an existing one's retention up to date.
+    Returns the collection's type ('timeseries' or 'collection').
+    """
+    expire_after = int(retention_days * 86400)
+    info = _collection_info(db, LOG_COLLECTION)
+    if info is None:
+        try:
+            db.create_collection(
+                LOG_COLLECTION,
+                timeseries={'timeField': 'login_time', 'metaField': 'meta', 'granularity': granularity},
+                expireAfterSeconds=expire_after
+            )
+            info = {'type': 'timeseries', 'options': {'expireAfterSeconds': expire_after}}
+        except CollectionInvalid:
+            # Another worker created it first
+            info = _collection_info(db, LOG_COLLECTION)
+        except OperationFailure as e:
+            logger.warning('Time-series collections unavailable (%s); using a TTL index on %s', e, LOG_COLLECTION)
+            info = {'type': 'collection'}
+
+    if info.get('type') == 'timeseries':
+        if info.get('options', {}).get('expireAfterSeconds') != expire_after:
+            db.command('collMod', LOG_COLLECTION, expireAfterSeconds=expire_after)
+        # Date-range exports across all users; per-user reads use the meta field
+        db[LOG_COLLECTION].create_index([('login_time', ASCENDING)])
+        return 'timeseries'
+
+    # A regular collection (older server, or logs written before the switch; see migrate_login_logs.py)
+    logs = db[LOG_COLLECTION]
+    try:
+        logs.create_index('login_time', expireAfterSeconds=expire_after)
+    except OperationFailure:
+        # An index on login_time exists with other options: update its TTL in place
+        db.command('collMod', LOG_COLLECTION, index={'keyPattern': {'login_time': 1}, 'expireAfterSeconds': expire_after})
+    return 'collection'
+
+
+def ensure_rollup_indexes(db):
+    """One row per (hour, role), expiring at its expire_at"""
+    counts = db[ROLLUP_COLLECTION]
+    counts.create_index([('hour', ASCENDING), ('role', ASCENDING)], unique=True)
+    counts.create_index('expire_at', expireAfterSeconds=0)
+
+
+class LoginAudit:
+    """Writes login log entries and reads the hourly rollup"""
+
+    def __init__(self, db, rollup_retention_days=400):
+        self.logs = db[LOG_COLLECTION]
+        self.counts = db[ROLLUP_COLLECTION]
+        self.rollup_retention = timedelta(days=rollup_retention_days)
+
+    def record(self, user_id, role, email='', ip_address=None, user_agent=''):
+        """
+        Store one login and count it in its hour. The two writes are not
+        atomic (time-series collections cannot join a transaction); a
+        crash in between leaves the count one short, which
+        rebuild_hourly_counts corrects.
+        """
+        login_time = datetime.utcnow()
+        self.logs.insert_one({
+            'login_time': login_time,
+            'meta': {'user_id': user_id, 'role': role},
+            'email': email,
+            'ip_address': ip_address,
+            'user_agent': user_agent
+        })
+        self._count(hour_of(login_time), role, 1)
+        return login_time
+
+    def _count(self, hour, role, count):
+        self.counts.update_one(
+            {'hour': hour, 'role': role},
+            {'$inc': {'count': count}, '$set': {'expire_at': hour + self.rollup_retention}},
+            upsert=True
+        )
+
+    def hourly_counts(self, start, end, role=None):
+        """Rollup rows for hours in [start, end), oldest first"""
+        query = {'hour': {'$gte': start, '$lt': end}}
+        if role:
+            query['role'] = role
+        return list(self.counts.find(query, {'_id': 0, 'hour': 1, 'role': 1, 'count': 1}).sort(
+            [('hour', ASCENDING), ('role', ASCENDING)]
+        ))
+
+    def rebuild_hourly_counts(self, start, end):
+        """
+        Recount [start, end) from the raw log and overwrite those hours in
+        the rollup (after a migration or a crash between the two writes).
+        Returns how many (hour, role) rows were written.
+        """
+        start, end = hour_of(start), hour_of(end)
+        pipeline = [
+            {'$match': {'login_time': {'$gte': start, '$lt': end}}},
+            {'$group': {
+                '_id': {'hour': {'$dateTrunc': {'date': '$login_time', 'unit': 'hour'}},
+                        'role': {'$ifNull': ['$meta.role', '$role']}},
+                'count': {'$sum': 1}
+            }}
+        ]
+        self.counts.delete_many({'hour': {'$gte': start, '$lt': end}})
+        requests = [
+            UpdateOne(
+                {'hour': row['_id']['hour'], 'role': row['_id']['role']},
+                {'$set': {'count': row['count'], 'expire_at': row['_id']['hour'] + self.rollup_retention}},
+                upsert=True
+            )
+            for row in self.logs.aggregate(pipeline)
+        ]
+        if requests:
+            self.counts.bulk_write(requests, ordered=False)
+        return len(requests)
+
+
+def init_login_audit(app, db, config):
+    """Set up the log collection and rollup indexes, before any route touches them"""
+    try:
+        kind = ensure_login_log_collection(db, config.LOGIN_LOG_RETENTION_DAYS, config.LOGIN_LOG_GRANULARITY)
+        ensure_rollup_indexes(db)
+        if kind != 'timeseries':
+            app.logger.warning('%s is a regular collection (time-series need MongoDB 5.0+; '
+                               'migrate_login_logs.py converts existing logs)', LOG_COLLECTION)
+    except OperationFailure as e:
+        app.logger.warning('Could not set up the login log collections: %s', e)
+
+    audit = LoginAudit(db, config.LOGIN_ROLLUP_RETENTION_DAYS)
+    app.extensions['login_audit'] = audit
+    return audit
@@ -0,0 +1,187 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+
+class MemoryThrottleStore:
+    """Failure windows and lockouts for one process"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self.failures = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def locked_until(self, keys, now):
+        with self.lock:
+            until = 0.0
+            for key in keys:
+                entry = self.locks.get(key)
+                if entry and entry[0] > now:
+                    until = max(until, entry[0])
+            return until
+
+    def add_failure(self, key, now, window):
+        """Record a failure and return how many fall inside the window"""
+        with self.lock:
+            failures = self.failures.get(key)
+            if failures is None:
+                if len(self.failures) >= self.max_keys:
+                    self._sweep(now, window)
+                failures = self.failures[key] = deque()
+            failures.append(now)
+            while failures and failures[0] <= now - window:
+                failures.popleft()
+            return len(failures)
+
+    def escalate(self, key, now, base, maximum, reset_after):
+        """Lock a key for base * 2^(strikes - 1) seconds and return the unlock time"""
+        with self.lock:
+            entry = self.locks.get(key)
+            strikes = entry[1] + 1 if entry and entry[2] > now else 1
+            until = now + min(base * 2 ** (strikes - 1), maximum)
+            self.locks[key] = (until, strikes, until + reset_after)
+            self.failures.pop(key, None)
+            return until
+
+    def clear(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+            self.locks.pop(key, None)
+
+    def _sweep(self, now, window):
+        self.failures = {k: f for k, f in self.failures.items() if f and f[-1] > now - window}
+        self.locks = {k: entry for k, entry in self.locks.items() if entry[2] > now}
+
+
+class MongoThrottleStore:
+    """
+    Failure windows and lockouts shared by every worker through two
+    TTL collections: login_failures (one document per failed attempt) and
+    login_locks (one document per locked email or IP). Lockouts seen by this
+    process are also remembered locally, so repeat attempts against a known
+    lock are rejected without a database round trip.
+    """
+
+    def __init__(self, db):
+        self.failures = db.login_failures
+        self.locks = db.login_locks
+        self.failures.create_index([('key', 1), ('at', 1)])
+        self.failures.create_index('expires_at', expireAfterSeconds=0)
+        self.locks.create_index('expires_at', expireAfterSeconds=0)
+        self.known_locks = {}
+        self.lock = threading.Lock()
+
+    def locked_until(self, keys, now):
+        with self.lock:
+            until = 0.0
+            for key in keys:
+                known = self.known_locks.get(key)
+                if known is None:
+                    continue
+                if known > now:
+                    until = max(until, known)
+                else:
+                    # Expired: the key may never log in again to clear it
+                    del self.known_locks[key]
+        if until > now:
+            return until
+
+        for doc in self.locks.find({'_id': {'$in': list(keys)}, 'locked_until': {'$gt': _dt(now)}}):
+            lock_until = _ts(doc['locked_until'])
+            with self.lock:
+                self.known_locks[doc['_id']] = lock_until
+            until = max(until, lock_until)
+        return until
+
+    def add_failure(self, key, now, window):
+        self.failures.insert_one({'key': key, 'at': _dt(now), 'expires_at': _dt(now + window)})
+        return self.failures.count_documents({'key': key, 'at': {'$gt': _dt(now - window)}})
+
+    def escalate(self, key, now, base, maximum, reset_after):
+        doc = self.locks.find_one({'_id': key})
+        strikes = doc['strikes'] + 1 if doc and doc['expires_at'] > _dt(now) else 1
+        until = now + min(base * 2 ** (strikes - 1), maximum)
+        self.locks.replace_one(
+            {'_id': key},
+            {'locked_until': _dt(until), 'strikes': strikes, 'expires_at': _dt(until + reset_after)},
+            upsert=True
+        )
+        self.failures.delete_many({'key': key})
+        with self.lock:
+            self.known_locks = {k: lock_until for k, lock_until in self.known_locks.items() if lock_until > now}
+            self.known_locks[key] = until
+        return until
+
+    def clear(self, key):
+        self.failures.delete_many({'key': key})
+        self.locks.delete_one({'_id': key})
+        with self.lock:
+            self.known_locks.pop(key, None)
+
+
+def _dt(timestamp):
+    return datetime.utcfromtimestamp(timestamp)
+
+
+def _ts(value):
+    return (value - datetime(1970, 1, 1)) / timedelta(seconds=1)
+
+
+class LoginThrottle:
+    """
+    Sliding-window limit on failed logins per email and per client IP.
+    A key that reaches its limit inside the window is locked out, and each
+    repeat lockout within reset_after seconds doubles the lock time.
+    """
+
+    def __init__(self, store, window, max_per_email, max_per_ip,
+                 lockout_base, lockout_max, lockout_reset):
+        self.store = store
+        self.window = window
+        self.max_per_email = max_per_email
+        self.max_per_ip = max_per_ip
+        self.lockout_base = lockout_base
+        self.lockout_max = lockout_max
+        self.lockout_reset = lockout_reset
+        self.counters = {'rejected_email': 0, 'rejected_ip': 0, 'failures': 0, 'lockouts': 0}
+        self.counter_lock = threading.Lock()
+
+    @staticmethod
+    def keys(email, ip):
+        return 'email:' + email.strip().lower(), 'ip:' + (ip or 'unknown')
+
+    def check(self, email, ip):
+        """Seconds until this email/IP may try again, or 0 if it may try now"""
+        email_key, ip_key = self.keys(email, ip)
+        now = time.time()
+        email_until = self.store.locked_until([email_key], now)
+        ip_until = self.store.locked_until([ip_key], now) if not email_until else 0.0
+        until = max(email_until, ip_until)
+        if until <= now:
+            return 0
+        self._count('rejected_email' if email_until else 'rejected_ip')
+        return max(1, int(until - now + 0.999))
+
+    def failure(self, email, ip):
+        """Record a failed attempt, locking the email or IP once it hits its limit"""
+        email_key, ip_key = self.keys(email, ip)
+        now = time.time()
+        self._count('failures')
+        for key, limit in ((email_key, self.max_per_email), (ip_key, self.max_per_ip)):
+            if self.store.add_failure(key, now, self.window) >= limit:
+                self.store.escalate(key, now, self.lockout_base, self.lockout_max, self.lockout_reset)
+                self._count('lockouts')
+
+    def success(self, email):
+        """Forget the email's failures and lockout history (the IP keeps its count)"""
+        self.store.clear(self.keys(email, None)[0])
+
+    def _count(self, name):
+        with self.counter_lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.counter_lock:
+            return dict(self.counters, backend=type(self.store).__name__)
@@ -0,0 +1,259 @@
+"""
+Transactional outbox for booking and payment state changes.
+
+The models pass each change's events to their repository, which stores
+them in the outbox collection in the same unit as the change itself (a
+transaction on a replica set; see storage/mongo.py). OutboxRelay tails the
+outbox and hands events to local sinks, so downstream consumers (emails,
+accounting, rollups, cache invalidation) never poll bookings or payments.
+Delivery is at least once: sinks should ignore an event id they have seen.
+"""
+import json
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_event(event_type, aggregate_id, payload):
+    """Outbox document for one change, e.g. ('booking.created', booking_id, {...})"""
+    return {
+        '_id': ObjectId(),
+        'type': event_type,
+        'aggregate_id': str(aggregate_id),
+        'payload': payload,
+        'created_at': datetime.utcnow(),
+        'status': 'pending',
+        'attempts': 0
+    }
+
+
+def event_payload(doc):
+    """Document fields carried by an event (the id is the event's aggregate_id)"""
+    return {field: value for field, value in doc.items() if field != '_id'}
+
+
+def to_message(event):
+    """What sinks publish: the event without the relay's bookkeeping fields"""
+    return {
+        'id': str(event['_id']),
+        'type': event['type'],
+        'aggregate_id': event['aggregate_id'],
+        'payload': event['payload'],
+        'created_at': event['created_at']
+    }
+
+
+class LogSink:
+    """Logs one line per event; the default, handy for watching the relay"""
+
+    def __init__(self, config):
+        self.logger = logging.getLogger('easestay.outbox')
+
+    def deliver(self, events):
+        for event in events:
+            self.logger.info('%s %s %s', event['_id'], event['type'], event['aggregate_id'])
+
+
+class JsonlSink:
+    """Appends events as JSON lines to OUTBOX_JSONL_PATH for consumers that tail a file"""
+
+    def __init__(self, config):
+        self.path = config.OUTBOX_JSONL_PATH
+
+    def deliver(self, events):
+        lines = ''.join(json.dumps(to_message(event), default=str) + '\n' for event in events)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+# OUTBOX_SINKS names -> factories taking the config; register_sink adds more
+SINKS = {'log': LogSink, 'jsonl': JsonlSink}
+
+
+def register_sink(name, factory):
+    SINKS[name] = factory
+
+
+def build_sinks(names, config):
+    """Sinks for a comma-separated list of registered names"""
+    sinks = []
+    for name in filter(None, (name.strip() for name in names.split(','))):
+        if name not in SINKS:
+            raise ValueError(f'Unknown outbox sink: {name}')
+        sinks.append(SINKS[name](config))
+    return sinks
+
+
+class OutboxRelay:
+    """
+    Delivers pending outbox events to the sinks in _id order, one batch at
+    a time, and marks each delivered batch done with a single update. A
+    lease in the relay state collection keeps one relay active per
+    deployment, and its resume token (the last _id handled) survives
+    restarts. When a pass reaches the end, the next one starts over from
+    the oldest pending event, which picks up events committed after ones
+    with a later _id and events whose delivery failed.
+    """
+
+    def __init__(self, outbox, state, sinks, name='default', batch_size=100, poll_interval=1.0,
+                 lease_seconds=30, max_attempts=10):
+        self.outbox = outbox
+        self.state = state
+        self.sinks = list(sinks)
+        self.name = name
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = uuid.uuid4().hex
+        self.leased = False
+        self.resume_after = None
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def acquire_lease(self):
+        """Take or renew the lease; loads the resume token when taking over"""
+        now = datetime.utcnow()
+        try:
+            doc = self.state.find_one_and_update(
+                {'_id': self.name, '$or': [{'owner': self.owner}, {'lease_until': {'$lt': now}}]},
+                {'$set': {'owner': self.owner, 'lease_until': now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The state document exists and another relay holds an unexpired lease
+            self.leased = False
+            return False
+        if not self.leased:
+            self.resume_after = doc.get('resume_after')
+            self.leased = True
+        return True
+
+    def _next_batch(self):
+        query = {'status': 'pending'}
+        if self.resume_after is not None:
+            query['_id'] = {'$gt': self.resume_after}
+        return list(self.outbox.find(query).sort('_id', ASCENDING).limit(self.batch_size))
+
+    def _checkpoint(self):
+        self.state.update_one(
+            {'_id': self.name, 'owner': self.owner},
+            {'$set': {'resume_after': self.resume_after, 'checkpoint_at': datetime.utcnow()}}
+        )
+
+    def _deliver(self, events):
+        """Hand events to every sink; returns the ids delivered"""
+        try:
+            for sink in self.sinks:
+                sink.deliver(events)
+            return [event['_id'] for event in events]
+        except Exception as e:
+            if len(events) == 1:
+                self._record_failure(events[0], e)
+                return []
+        # Retry one by one so a single bad event cannot hold back its batch
+        delivered = []
+        for event in events:
+            try:
+                for sink in self.sinks:
+                    sink.deliver([event])
+                delivered.append(event['_id'])
+            except Exception as e:
+                self._record_failure(event, e)
+        return delivered
+
+    def _record_failure(self, event, error):
+        """Count a failed attempt; after max_attempts the event is parked as failed"""
+        logger.warning('Outbox event %s (%s) failed: %s', event['_id'], event['type'], error)
+        update = {'$inc': {'attempts': 1}, '$set': {'last_error': str(error)}}
+        if event.get('attempts', 0) + 1 >= self.max_attempts:
+            update['$set']['status'] = 'failed'
+        self.outbox.update_one({'_id': event['_id']}, update)
+
+    def run_once(self):
+        """Deliver one batch; returns how many events were delivered (0 when idle or not leading)"""
+        if not self.acquire_lease():
+            return 0
+
+        batch = self._next_batch()
+        if not batch and self.resume_after is not None:
+            self.resume_after = None
+            batch = self._next_batch()
+        if not batch:
+            self._checkpoint()
+            return 0
+
+        delivered = self._deliver(batch)
+        if delivered:
+            self.outbox.update_many(
+                {'_id': {'$in': delivered}},
+                {'$set': {'status': 'done', 'delivered_at': datetime.utcnow()}}
+            )
+        self.resume_after = batch[-1]['_id']
+        self._checkpoint()
+        return len(delivered)
+
+    def run_forever(self):
+        """Poll until stop(); sleeps only when there was nothing to deliver"""
+        while not self.stopping.is_set():
+            try:
+                delivered = self.run_once()
+            except PyMongoError:
+                logger.exception('Outbox relay pass failed')
+                delivered = 0
+            if not delivered:
+                self.stopping.wait(self.poll_interval)
+
+    def start(self):
+        """Run the relay on a daemon thread in this process"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run_forever, name='outbox-relay', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+
+    def backlog(self):
+        """Number of events waiting for delivery"""
+        return self.outbox.count_documents({'status': 'pending'})
+
+
+def ensure_outbox_indexes(db, retention_hours):
+    """Pending scan in _id order, plus expiry of delivered events after the retention window"""
+    db.outbox.create_index([('status', ASCENDING), ('_id', ASCENDING)])
+    db.outbox.create_index('delivered_at', expireAfterSeconds=int(retention_hours * 3600))
+
+
+def build_relay(db, config):
+    return OutboxRelay(
+        db.outbox, db.outbox_relay, build_sinks(config.OUTBOX_SINKS, config),
+        batch_size=config.OUTBOX_BATCH_SIZE,
+        poll_interval=config.OUTBOX_POLL_SECONDS,
+        lease_seconds=config.OUTBOX_LEASE_SECONDS,
+        max_attempts=config.OUTBOX_MAX_ATTEMPTS
+    )
+
+
+def init_outbox(app, db, config):
+    """Create the outbox indexes and, when OUTBOX_RELAY_ENABLED, run a relay in this process"""
+    try:
+        ensure_outbox_indexes(db, config.OUTBOX_RETENTION_HOURS)
+    except OperationFailure as e:
+        app.logger.warning('Could not create outbox indexes: %s', e)
+
+    relay = build_relay(db, config)
+    app.extensions['outbox_relay'] = relay
+    if config.OUTBOX_RELAY_ENABLED:
+        relay.start()
+    return relay
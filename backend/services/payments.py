@@ -0,0 +1,386 @@
+"""
+Asynchronous payment processing.
+
+POST /payment stores a payment intent and answers 202 straight away. A
+pool of worker threads claims queued intents, charges them through a
+PaymentGateway, then confirms the booking, marks its rooms occupied and
+records the payment. Gateway time never holds a request thread. Intents
+live in the payment_intents collection, so any process running a pool (the
+API with PAYMENT_WORKERS > 0, or payment_worker.py) can pick them up, and
+an intent whose worker died is taken over once its lease expires.
+Intents carry their booking's hotel_id and are settled at that property;
+the queue itself is shared by every property.
+
+Intent status: queued -> processing -> succeeded | failed. Temporary
+gateway errors put the intent back in the queue with exponential backoff
+until PAYMENT_MAX_ATTEMPTS; a decline fails it at once. Every intent but a
+failed one carries active: true, and a unique partial index on that flag
+keeps a booking to one live intent even when two requests race. While an
+intent is live its booking carries payment_intent_id, so the waitlist
+sweeper leaves the hold alone until the payment settles.
+"""
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from models.booking_model import Booking
+from models.payment_model import Payment
+from models.room_model import Room
+from services.read_routing import for_critical
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which an intent never changes again
+TERMINAL_STATUSES = ('succeeded', 'failed')
+
+
+class GatewayError(Exception):
+    """Temporary gateway failure (timeout, outage); the charge may be retried"""
+
+
+class PaymentDeclined(Exception):
+    """The gateway refused the charge; retrying will not help"""
+
+
+class PaymentGateway:
+    def charge(self, intent):
+        """
+        Charge intent['amount'] with intent['payment_method'] and return the
+        gateway's reference. str(intent['_id']) is the idempotency key: a
+        retried charge for the same intent must not bill twice. Raises
+        GatewayError for temporary failures and PaymentDeclined otherwise.
+        """
+        raise NotImplementedError
+
+
+class StubGateway(PaymentGateway):
+    """
+    Local stand-in for a card gateway: every charge takes
+    PAYMENT_STUB_LATENCY_SECONDS and fails temporarily with probability
+    PAYMENT_STUB_FAILURE_RATE. Amounts of PAYMENT_STUB_DECLINE_AMOUNT are
+    declined, so tests can exercise both paths.
+    """
+
+    def __init__(self, config):
+        self.latency = config.PAYMENT_STUB_LATENCY_SECONDS
+        self.failure_rate = config.PAYMENT_STUB_FAILURE_RATE
+        self.decline_amount = config.PAYMENT_STUB_DECLINE_AMOUNT
+        self.charges = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+
+    def charge(self, intent):
+        key = str(intent['_id'])
+        with self.lock:
+            if key in self.charges:
+                return self.charges[key]
+
+        time.sleep(self.latency)
+        if self.rng.random() < self.failure_rate:
+            raise GatewayError('Stub gateway timed out')
+        if self.decline_amount is not None and intent['amount'] == self.decline_amount:
+            raise PaymentDeclined('Card declined')
+
+        reference = 'stub_' + uuid.uuid4().hex[:24]
+        with self.lock:
+            return self.charges.setdefault(key, reference)
+
+
+# PAYMENT_GATEWAY names -> factories taking the config; register_gateway adds more
+GATEWAYS = {'stub': StubGateway}
+
+
+def register_gateway(name, factory):
+    GATEWAYS[name] = factory
+
+
+def build_gateway(name, config):
+    if name not in GATEWAYS:
+        raise ValueError(f'Unknown payment gateway: {name}')
+    return GATEWAYS[name](config)
+
+
+def new_intent(booking_id, group, user_id, amount, payment_method, hotel_id=None):
+    """A queued payment intent document for a booking (group=True for a group booking) at a property"""
+    now = datetime.utcnow()
+    return {
+        'hotel_id': hotel_id,
+        'booking_id': booking_id,
+        'group': group,
+        'user_id': user_id,
+        'amount': amount,
+        'payment_method': payment_method,
+        'status': 'queued',
+        'active': True,
+        'attempts': 0,
+        'next_attempt_at': now,
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def check_payment(booking, group, current_user, amount):
+    """
+    Check a payment request against the booking (or group booking) it pays
+    for. Returns (amount to charge, None) or (None, (error, status code)).
+    The charge is always the stored total_price, which the client's amount
+    must match; guests may only pay for their own bookings.
+    """
+    paid_for = booking if booking is not None else group
+    is_staff = current_user.get('role') in ('admin', 'staff')
+    if paid_for is None or not (is_staff or str(paid_for.get('user_id')) == str(current_user['user_id'])):
+        return None, ('Booking not found', 404)
+    if booking is not None and booking.get('status') == 'expired':
+        return None, ('Booking hold has expired', 400)
+
+    try:
+        requested = float(amount)
+    except (TypeError, ValueError):
+        return None, ('Amount must be a number', 400)
+    total = float(paid_for.get('total_price', 0))
+    if not math.isclose(requested, total, abs_tol=0.005):
+        return None, (f'Amount must equal the booking total of {total:.2f}', 400)
+    return total, None
+
+
+# Intents that block a new one for the same booking
+ACTIVE_INTENT_QUERY = {'$in': ['queued', 'processing', 'succeeded']}
+
+
+def serialize_intent(intent):
+    """JSON-ready view of an intent for the status endpoints"""
+    data = {field: value for field, value in intent.items() if field not in ('lease_until', 'next_attempt_at', 'active')}
+    data['_id'] = str(intent['_id'])
+    return data
+
+
+class PaymentWorkerPool:
+    """Enqueues payment intents and processes them on worker threads"""
+
+    def __init__(self, db, gateway, workers=4, max_attempts=5, retry_base_seconds=2.0,
+                 lease_seconds=60, poll_interval=1.0):
+        self.intents = for_critical(db.payment_intents)
+        self.booking_model = Booking(db.bookings)
+        self.room_model = Room(db.rooms)
+        self.payment_model = Payment(db.payments)
+        self.gateway = gateway
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.threads = []
+        self.stopping = threading.Event()
+        self.wakeup = threading.Condition()
+
+    def enqueue(self, booking_id, group, user_id, amount, payment_method, hotel_id=None):
+        """
+        Store a queued intent for a booking (or group booking) at hotel_id and
+        wake a worker. Returns (intent, created): a booking whose payment is
+        already queued, processing or done gets that intent back instead. A
+        new intent comes back failed if the booking's hold expired first.
+        """
+        query = {'hotel_id': hotel_id, 'booking_id': booking_id, 'status': ACTIVE_INTENT_QUERY}
+        while True:
+            existing = self.intents.find_one(query)
+            if existing:
+                return existing, False
+
+            intent = new_intent(booking_id, group, user_id, amount, payment_method, hotel_id)
+            try:
+                intent['_id'] = self.intents.insert_one(intent).inserted_id
+                break
+            except DuplicateKeyError:
+                # A concurrent request queued one first: go round and return it
+                continue
+
+        # Pin the hold to this intent so the waitlist sweeper cannot expire it mid-payment
+        if not group and not self.booking_model.for_hotel(hotel_id).start_payment(booking_id, str(intent['_id'])):
+            self._abandon(intent, 'Booking hold has expired')
+            return intent, True
+        with self.wakeup:
+            self.wakeup.notify()
+        return intent, True
+
+    def get(self, intent_id):
+        try:
+            return self.intents.find_one({'_id': ObjectId(intent_id)})
+        except:
+            return None
+
+    def claim(self):
+        """Take the next due intent (or one whose worker's lease expired); None when there is none"""
+        now = datetime.utcnow()
+        return self.intents.find_one_and_update(
+            {'$or': [
+                {'status': 'queued', 'next_attempt_at': {'$lte': now}},
+                {'status': 'processing', 'lease_until': {'$lt': now}}
+            ]},
+            {'$set': {'status': 'processing', 'lease_until': now + timedelta(seconds=self.lease_seconds),
+                      'updated_at': now},
+             '$inc': {'attempts': 1}},
+            sort=[('next_attempt_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _abandon(self, intent, error):
+        """Fail an intent no worker has claimed yet"""
+        values = {'status': 'failed', 'error': error, 'updated_at': datetime.utcnow()}
+        self.intents.update_one({'_id': intent['_id'], 'status': 'queued'}, {'$set': values, '$unset': {'active': ''}})
+        intent.update(values)
+        intent.pop('active', None)
+
+    def _finish(self, intent, values):
+        values['updated_at'] = datetime.utcnow()
+        unset = {'lease_until': ''}
+        if values['status'] == 'failed':
+            # Frees the booking for a new intent, and its hold to expire
+            unset['active'] = ''
+            if not intent['group']:
+                self.booking_model.for_hotel(intent.get('hotel_id')).end_payment(intent['booking_id'], str(intent['_id']))
+        self.intents.update_one(
+            {'_id': intent['_id'], 'status': 'processing'},
+            {'$set': values, '$unset': unset}
+        )
+
+    def _retry_or_fail(self, intent, error):
+        """Requeue with exponential backoff, or fail once max_attempts are used up"""
+        if intent['attempts'] >= self.max_attempts:
+            self._finish(intent, {'status': 'failed', 'error': error})
+            return
+        delay = self.retry_base_seconds * 2 ** (intent['attempts'] - 1)
+        self._finish(intent, {
+            'status': 'queued',
+            'last_error': error,
+            'next_attempt_at': datetime.utcnow() + timedelta(seconds=delay)
+        })
+
+    def _confirm(self, intent, reference):
+        """Confirm the booking, occupy its rooms and record the payment, all at the intent's property"""
+        booking_id = intent['booking_id']
+        # Intents from before properties have no hotel_id: settle them unscoped
+        hotel_id = intent.get('hotel_id')
+        booking_model = self.booking_model.for_hotel(hotel_id)
+        room_model = self.room_model.for_hotel(hotel_id)
+        if intent['group']:
+            success = booking_model.update_group_status(booking_id, 'confirmed')
+            room_ids = booking_model.get_group_room_ids(booking_id)
+        else:
+            booking = booking_model.get_booking_by_id(booking_id)
+            # Never revive a hold that expired while the charge was in flight: its dates may be resold
+            success = booking is not None and booking_model.update_booking_status(
+                booking_id, 'confirmed', current=('pending', 'confirmed')
+            )
+            room_ids = [booking.get('room_id')] if booking else []
+
+        payment = self.payment_model.for_hotel(hotel_id).create_payment({
+            'booking_id': booking_id,
+            'user_id': intent['user_id'],
+            'amount': intent['amount'],
+            'payment_method': intent['payment_method'],
+            # Charged, but the booking is gone or expired: the outbox event tells accounting to refund it
+            'status': 'completed' if success else 'refund_required',
+            'intent_id': str(intent['_id']),
+            'gateway_reference': reference
+        })
+        if not success:
+            self._finish(intent, {'status': 'failed', 'error': 'Booking could not be confirmed',
+                                  'payment_id': str(payment['_id'])})
+            return
+
+        for room_id in room_ids:
+            room_model.update_room_status(str(room_id), 'occupied')
+        self._finish(intent, {'status': 'succeeded', 'payment_id': str(payment['_id']),
+                              'gateway_reference': reference})
+
+    def process(self, intent):
+        """Charge one claimed intent and settle it"""
+        try:
+            reference = self.gateway.charge(intent)
+        except PaymentDeclined as e:
+            self._finish(intent, {'status': 'failed', 'error': str(e)})
+            return
+        except Exception as e:
+            logger.warning('Payment intent %s attempt %s failed: %s', intent['_id'], intent['attempts'], e)
+            self._retry_or_fail(intent, str(e))
+            return
+        self._confirm(intent, reference)
+
+    def run_once(self):
+        """Claim and process one intent; False when nothing was due"""
+        intent = self.claim()
+        if intent is None:
+            return False
+        self.process(intent)
+        return True
+
+    def _work(self):
+        while not self.stopping.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception('Payment worker pass failed')
+            with self.wakeup:
+                self.wakeup.wait(self.poll_interval)
+
+    def start(self):
+        """Start the worker threads in this process"""
+        if self.threads:
+            return
+        self.stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'payment-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopping.set()
+        with self.wakeup:
+            self.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
+def ensure_payment_indexes(db):
+    """Claiming due intents (across properties), and the one-active-intent-per-booking lookup and guard"""
+    db.payment_intents.create_index([('status', ASCENDING), ('next_attempt_at', ASCENDING)])
+    db.payment_intents.create_index([('hotel_id', ASCENDING), ('booking_id', ASCENDING), ('status', ASCENDING)])
+    db.payment_intents.create_index(
+        [('hotel_id', ASCENDING), ('booking_id', ASCENDING)],
+        name='one_active_intent_per_booking',
+        unique=True,
+        partialFilterExpression={'active': True}
+    )
+
+
+def build_payment_pool(db, config):
+    return PaymentWorkerPool(
+        db, build_gateway(config.PAYMENT_GATEWAY, config),
+        workers=config.PAYMENT_WORKERS,
+        max_attempts=config.PAYMENT_MAX_ATTEMPTS,
+        retry_base_seconds=config.PAYMENT_RETRY_BASE_SECONDS,
+        lease_seconds=config.PAYMENT_LEASE_SECONDS,
+        poll_interval=config.PAYMENT_POLL_SECONDS
+    )
+
+
+def init_payment_processing(app, db, config):
+    """Create the intent indexes and start PAYMENT_WORKERS worker threads in this process"""
+    try:
+        ensure_payment_indexes(db)
+    except OperationFailure as e:
+        app.logger.warning('Could not create payment intent indexes: %s', e)
+
+    pool = build_payment_pool(db, config)
+    app.extensions['payments'] = pool
+    if config.PAYMENT_WORKERS > 0:
+        pool.start()
+    return pool
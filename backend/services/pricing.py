@@ -0,0 +1,132 @@
+import numpy as np
+
+# Calendar lookups are done on a (month, day) grid so seasonal rules can be
+# painted once and then gathered for any date range with a single index op
+_SEASON_GRID_SIZE = 12 * 31
+
+
+def night_range(checkin_date, checkout_date):
+    """Return the nights of a stay as a datetime64[D] array (checkout excluded)"""
+    start = np.datetime64(checkin_date, 'D')
+    end = np.datetime64(checkout_date, 'D')
+    return np.arange(start, end, dtype='datetime64[D]')
+
+
+def _grid_index(month, day):
+    return (month - 1) * 31 + (day - 1)
+
+
+class PricingEngine:
+    def __init__(self, weekday_multipliers=None, seasons=None, occupancy_tiers=None):
+        """
+        weekday_multipliers: 7 factors, Monday first
+        seasons: list of (start 'MM-DD', end 'MM-DD', multiplier), end inclusive,
+                 ranges may wrap the new year; later rules override earlier ones
+        occupancy_tiers: list of (min occupancy fraction, multiplier)
+        """
+        if weekday_multipliers is None:
+            weekday_multipliers = [1.0] * 7
+        if len(weekday_multipliers) != 7:
+            raise ValueError('weekday_multipliers must have 7 entries')
+        self.weekday = np.asarray(weekday_multipliers, dtype=np.float64)
+
+        self.season = np.ones(_SEASON_GRID_SIZE, dtype=np.float64)
+        for start, end, multiplier in (seasons or []):
+            self._paint_season(start, end, multiplier)
+
+        tiers = sorted(occupancy_tiers or [])
+        self.occupancy_thresholds = np.asarray([t[0] for t in tiers], dtype=np.float64)
+        self.occupancy_multipliers = np.asarray([1.0] + [t[1] for t in tiers], dtype=np.float64)
+
+    @classmethod
+    def from_config(cls, config):
+        """Build an engine from the PRICING_* settings on a Config object"""
+        return cls(
+            weekday_multipliers=config.PRICING_WEEKDAY_MULTIPLIERS,
+            seasons=config.PRICING_SEASONS,
+            occupancy_tiers=config.PRICING_OCCUPANCY_TIERS
+        )
+
+    def _paint_season(self, start, end, multiplier):
+        start_month, start_day = (int(p) for p in start.split('-'))
+        end_month, end_day = (int(p) for p in end.split('-'))
+        lo = _grid_index(start_month, start_day)
+        hi = _grid_index(end_month, end_day)
+
+        if lo <= hi:
+            self.season[lo:hi + 1] = multiplier
+        else:
+            # Range wraps around the new year (e.g. 12-20 to 01-05)
+            self.season[lo:] = multiplier
+            self.season[:hi + 1] = multiplier
+
+    def night_factors(self, nights, occupancy=None):
+        """Combined seasonal, weekday and occupancy multiplier for each night"""
+        days = nights.astype(np.int64)
+        # 1970-01-01 was a Thursday, so shift by 3 to get Monday == 0
+        weekday_idx = (days + 3) % 7
+
+        month_start = nights.astype('datetime64[M]')
+        month = month_start.astype(np.int64) % 12 + 1
+        day = (nights - month_start.astype('datetime64[D]')).astype(np.int64) + 1
+
+        factors = self.weekday[weekday_idx] * self.season[_grid_index(month, day)]
+
+        if occupancy is not None and len(self.occupancy_thresholds):
+            tier = np.searchsorted(self.occupancy_thresholds, occupancy, side='right')
+            factors = factors * self.occupancy_multipliers[tier]
+
+        return factors
+
+    def quote(self, base_prices, checkin_date, checkout_date, occupancy=None):
+        """
+        Price every room for every night of a stay in one pass.
+        Returns (nightly_rates[rooms, nights], totals[rooms])
+        """
+        nights = night_range(checkin_date, checkout_date)
+        factors = self.night_factors(nights, occupancy)
+
+        base = np.asarray(base_prices, dtype=np.float64)
+        nightly_rates = np.round(np.outer(base, factors), 2)
+        totals = np.round(nightly_rates.sum(axis=1), 2)
+        return nightly_rates, totals
+
+
+def occupancy_by_night(bookings, checkin_date, checkout_date, total_rooms):
+    """
+    Fraction of the hotel booked on each night of [checkin_date, checkout_date).
+    Bookings are painted onto the calendar with a difference array so the cost
+    is linear in bookings + nights rather than their product.
+    """
+    nights = night_range(checkin_date, checkout_date)
+    if total_rooms <= 0 or not len(nights):
+        return np.zeros(len(nights), dtype=np.float64)
+
+    starts = []
+    ends = []
+    for booking in bookings:
+        starts.append(booking['checkin_date'])
+        ends.append(booking['checkout_date'])
+
+    if not starts:
+        return np.zeros(len(nights), dtype=np.float64)
+
+    origin = nights[0]
+    start_idx = np.clip((np.array(starts, dtype='datetime64[D]') - origin).astype(np.int64), 0, len(nights))
+    end_idx = np.clip((np.array(ends, dtype='datetime64[D]') - origin).astype(np.int64), 0, len(nights))
+
+    diff = np.zeros(len(nights) + 1, dtype=np.int64)
+    np.add.at(diff, start_idx, 1)
+    np.add.at(diff, end_idx, -1)
+    booked = np.cumsum(diff[:-1])
+
+    return np.minimum(booked / float(total_rooms), 1.0)
+
+
+
+def quote_rooms(engine, rooms, booking_model, total_rooms, checkin_date, checkout_date):
+    """Quote a list of room documents for a stay, using current hotel occupancy"""
+    # Occupancy is a demand signal, a replica a few seconds behind is close enough
+    bookings = booking_model.get_bookings_in_range(checkin_date, checkout_date, stale_ok=True)
+    occupancy = occupancy_by_night(bookings, checkin_date, checkout_date, total_rooms)
+    return engine.quote([room.get('price', 0) for room in rooms], checkin_date, checkout_date, occupancy)
@@ -0,0 +1,126 @@
+"""
+Multi-property partitioning.
+
+Every room, booking, payment, feedback entry, payment intent and waitlist
+entry belongs to one hotel, named by its hotel_id. Each request picks its
+property with the X-Hotel-Id header (or a hotel_id query parameter, for
+EventSource and links), falling back to DEFAULT_HOTEL_ID. The routes wrap
+their models in PerHotel, so every model call goes through the view for
+the request's property (see HotelScoped in storage/base.py): hotel_id
+leads each query and each index, and a property's data can live on its own
+shard once the collections are sharded on it (shard_collections.py).
+Users and login logs stay global: one account books at any property.
+Requests naming a property that is not known are rejected before any view
+or per-property cache is created for it, so those stay bounded.
+"""
+import re
+import threading
+import time
+from flask import g, has_request_context, jsonify, request
+from config import Config
+from models.room_model import Room
+
+HOTEL_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def request_hotel_id():
+    """The property named by the current request, or None if the name is invalid"""
+    hotel_id = request.headers.get('X-Hotel-Id') or request.args.get('hotel_id') or Config.DEFAULT_HOTEL_ID
+    return hotel_id if HOTEL_ID_PATTERN.match(hotel_id) else None
+
+
+def current_hotel_id():
+    """The current request's property; DEFAULT_HOTEL_ID outside a request"""
+    if has_request_context():
+        return g.get('hotel_id', Config.DEFAULT_HOTEL_ID)
+    return Config.DEFAULT_HOTEL_ID
+
+
+class PerHotel:
+    """
+    Stands in for a model inside the routes: attribute access resolves to
+    the model's view for the current request's property. Views are created
+    once per property and reused. current returns the request's property
+    (the async app passes its own).
+    """
+
+    def __init__(self, model, current=None):
+        self.model = model
+        self.current = current or current_hotel_id
+        self.views = {}
+        self.lock = threading.Lock()
+
+    def view(self, hotel_id):
+        view = self.views.get(hotel_id)
+        if view is None:
+            with self.lock:
+                view = self.views.setdefault(hotel_id, self.model.for_hotel(hotel_id))
+        return view
+
+    def __getattr__(self, name):
+        return getattr(self.view(self.current()), name)
+
+
+class PropertyRegistry:
+    """
+    The properties requests may name: the configured list when there is one,
+    otherwise the default property plus every property that has rooms. An
+    unknown id reloads the set, at most once every refresh_seconds, so new
+    properties appear without letting each bogus id cost a query.
+    """
+
+    def __init__(self, room_model, configured=(), default=None, refresh_seconds=10):
+        self.room_model = room_model
+        self.configured = frozenset(configured)
+        self.default = default or Config.DEFAULT_HOTEL_ID
+        self.refresh_seconds = refresh_seconds
+        self.known = frozenset([self.default])
+        self.loaded_at = None
+        self.lock = threading.Lock()
+
+    def may_query(self, hotel_id):
+        """True when is_known(hotel_id) could reload the set from the database"""
+        return not self.configured and hotel_id not in self.known
+
+    def is_known(self, hotel_id):
+        if self.configured:
+            return hotel_id in self.configured
+        if hotel_id in self.known:
+            return True
+        self._reload()
+        return hotel_id in self.known
+
+    def _reload(self):
+        with self.lock:
+            if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.refresh_seconds:
+                return
+            self.loaded_at = time.monotonic()
+            try:
+                self.known = frozenset(self.room_model.get_hotel_ids()) | {self.default}
+            except Exception:
+                # Keep the current set; the next miss after refresh_seconds retries
+                pass
+
+
+def init_properties(app, db, config):
+    """Resolve each request's property before admission control and the handlers see it"""
+    registry = PropertyRegistry(
+        Room(db.rooms), config.HOTEL_IDS,
+        default=config.DEFAULT_HOTEL_ID,
+        refresh_seconds=config.HOTEL_IDS_REFRESH_SECONDS
+    )
+    app.extensions['properties'] = registry
+
+    @app.before_request
+    def select_property():
+        if request.method == 'OPTIONS':
+            return None
+        hotel_id = request_hotel_id()
+        if hotel_id is None:
+            return jsonify({'error': 'Invalid hotel id'}), 400
+        if not registry.is_known(hotel_id):
+            return jsonify({'error': 'Unknown hotel'}), 404
+        g.hotel_id = hotel_id
+        return None
+
+    return registry
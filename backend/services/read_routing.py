@@ -0,0 +1,48 @@
+from pymongo import ReadPreference
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import SecondaryPreferred, Secondary, Nearest, PrimaryPreferred
+from pymongo.write_concern import WriteConcern
+from config import Config
+
+# Modes that accept maxStalenessSeconds (primary does not)
+_STALENESS_MODES = {
+    'primaryPreferred': PrimaryPreferred,
+    'secondaryPreferred': SecondaryPreferred,
+    'secondary': Secondary,
+    'nearest': Nearest
+}
+
+
+def catalog_read_preference(config=Config):
+    """Read preference for catalog style reads (rooms, feedback, reports)"""
+    mode = config.CATALOG_READ_PREFERENCE
+    if mode == 'primary':
+        return ReadPreference.PRIMARY
+    if mode not in _STALENESS_MODES:
+        raise ValueError(f'Unknown read preference: {mode}')
+    return _STALENESS_MODES[mode](max_staleness=config.CATALOG_MAX_STALENESS_SECONDS)
+
+
+def for_catalog(collection, config=Config):
+    """
+    Handle for reads that may be served by a secondary: room listings,
+    search, feedback and reports. Results can lag the primary by up to
+    CATALOG_MAX_STALENESS_SECONDS.
+    """
+    return collection.with_options(
+        read_preference=catalog_read_preference(config),
+        read_concern=ReadConcern(config.CATALOG_READ_CONCERN)
+    )
+
+
+def for_critical(collection, config=Config):
+    """
+    Handle for the booking critical path: overlap checks, payment lookups
+    and the writes they guard. Always reads the primary with majority read
+    concern and acknowledges writes with the configured write concern.
+    """
+    return collection.with_options(
+        read_preference=ReadPreference.PRIMARY,
+        read_concern=ReadConcern(config.CRITICAL_READ_CONCERN),
+        write_concern=WriteConcern(w=config.CRITICAL_WRITE_CONCERN)
+    )
@@ -0,0 +1,169 @@
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+
+class RevocationList:
+    """
+    In-memory view of revoked sessions and users, checked on every
+    authenticated request without a database round trip.
+
+    Revocations are written to a TTL collection and each process pulls new
+    ones at most every sync_interval seconds, piggybacking on whichever
+    request notices the view is stale. Entries only need to outlive the
+    access tokens they cancel, so they expire after the access token
+    lifetime and the view stays small.
+
+    - session:<sid> cancels every access token of one login session
+    - user:<id> cancels access tokens whose generation is below min_generation
+    """
+
+    def __init__(self, sync_interval=5):
+        self.sync_interval = sync_interval
+        self.collection = None
+        self.entries = {}
+        self.synced_at = 0.0
+        self.last_revoked_at = None
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+
+    def bind(self, collection, sync_interval=None):
+        """Attach the shared collection (call once per app)"""
+        self.collection = collection
+        if sync_interval is not None:
+            self.sync_interval = sync_interval
+        collection.create_index('expires_at', expireAfterSeconds=0)
+        collection.create_index('revoked_at')
+        with self.lock:
+            self.entries = {}
+            self.synced_at = 0.0
+            self.last_revoked_at = None
+
+    def revoke_session(self, sid, ttl):
+        self._write('session:' + sid, {}, ttl)
+
+    def revoke_user(self, user_id, min_generation, ttl):
+        self._write('user:' + user_id, {'min_generation': min_generation}, ttl)
+
+    def is_revoked(self, claims):
+        self.sync()
+        now = time.time()
+        with self.lock:
+            session = self.entries.get('session:' + str(claims.get('sid')))
+            if session and session['expires'] > now:
+                return True
+            user = self.entries.get('user:' + str(claims.get('user_id')))
+            if user and user['expires'] > now and claims.get('gen', 0) < user.get('min_generation', 0):
+                return True
+        return False
+
+    def _write(self, key, fields, ttl):
+        now = datetime.utcnow()
+        doc = dict(fields, revoked_at=now, expires_at=now + timedelta(seconds=ttl))
+        if self.collection is not None:
+            self.collection.replace_one({'_id': key}, doc, upsert=True)
+        with self.lock:
+            self.entries[key] = dict(fields, expires=time.time() + ttl)
+
+    def stale(self):
+        """True when the next is_revoked call would query the collection"""
+        return self.collection is not None and time.monotonic() - self.synced_at >= self.sync_interval
+
+    def sync(self):
+        """Pull revocations written since the last sync, if the view is older than sync_interval"""
+        if self.collection is None or time.monotonic() - self.synced_at < self.sync_interval:
+            return
+        # One request per process does the sync; the others keep using the current view
+        if not self.sync_lock.acquire(blocking=False):
+            return
+        try:
+            query = {}
+            if self.last_revoked_at is not None:
+                # Small overlap so revocations written in the same instant are not missed
+                query['revoked_at'] = {'$gte': self.last_revoked_at - timedelta(seconds=1)}
+            docs = list(self.collection.find(query))
+            now = time.time()
+            with self.lock:
+                self.entries = {k: v for k, v in self.entries.items() if v['expires'] > now}
+                for doc in docs:
+                    expires = (doc['expires_at'] - datetime(1970, 1, 1)) / timedelta(seconds=1)
+                    entry = {'expires': expires}
+                    if 'min_generation' in doc:
+                        entry['min_generation'] = doc['min_generation']
+                    self.entries[doc['_id']] = entry
+                    if self.last_revoked_at is None or doc['revoked_at'] > self.last_revoked_at:
+                        self.last_revoked_at = doc['revoked_at']
+            self.synced_at = time.monotonic()
+        except Exception:
+            # Keep serving from the current view; the next request retries
+            pass
+        finally:
+            self.sync_lock.release()
+
+    def size(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class RefreshTokenStore:
+    """
+    Opaque refresh tokens stored as SHA-256 hashes. Every refresh consumes
+    the presented token and issues a new one in the same family (login
+    session); presenting an already used token means it leaked, so the
+    whole family is revoked.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        collection.create_index('expires_at', expireAfterSeconds=0)
+        collection.create_index('family')
+        collection.create_index('user_id')
+
+    @staticmethod
+    def _hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def issue(self, user_id, lifetime, family=None):
+        """Create a refresh token, returning (token, family)"""
+        token = secrets.token_urlsafe(32)
+        family = family or secrets.token_urlsafe(12)
+        now = datetime.utcnow()
+        self.collection.insert_one({
+            '_id': self._hash(token),
+            'user_id': user_id,
+            'family': family,
+            'used': False,
+            'created_at': now,
+            'expires_at': now + lifetime
+        })
+        return token, family
+
+    def consume(self, token):
+        """
+        Mark a refresh token used and return its document. Returns
+        (None, None) for unknown or expired tokens and (None, family) when
+        the token was already used.
+        """
+        token_hash = self._hash(token)
+        doc = self.collection.find_one_and_update(
+            {'_id': token_hash, 'used': False, 'expires_at': {'$gt': datetime.utcnow()}},
+            {'$set': {'used': True, 'used_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            return doc, doc['family']
+        reused = self.collection.find_one({'_id': token_hash, 'used': True}, {'family': 1})
+        return None, reused['family'] if reused else None
+
+    def revoke_family(self, family):
+        self.collection.delete_many({'family': family})
+
+    def revoke_user(self, user_id):
+        self.collection.delete_many({'user_id': user_id})
+
+
+# Shared per-process revocation view used by token_required
+revocations = RevocationList()
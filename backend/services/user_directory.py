@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from models.records import USER_DETAIL_FIELDS
+
+
+class UserDirectory:
+    """
+    Bounded LRU of user summaries (email, names, phone) keyed by user id,
+    for joining users onto bookings and reports. Misses are loaded with one
+    batched query; entries expire after ttl seconds so updates made by other
+    worker processes show up eventually, and User.update_user evicts the
+    entry in its own process straight away.
+    """
+
+    def __init__(self, capacity=10000, ttl=300):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.user_model = None
+        self.entries = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def bind(self, user_model, capacity=None, ttl=None):
+        """Attach the user model used to load misses (call once per app)"""
+        self.user_model = user_model
+        if capacity is not None:
+            self.capacity = capacity
+        if ttl is not None:
+            self.ttl = ttl
+        self.clear()
+
+    def get_many(self, user_ids):
+        """UserRecords for the given ids, keyed by id; unknown ids are left out"""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        with self.lock:
+            for user_id in dict.fromkeys(user_ids):
+                entry = self.entries.get(user_id)
+                if entry and now - entry[1] < self.ttl:
+                    self.entries.move_to_end(user_id)
+                    found[user_id] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.append(user_id)
+                    self.misses += 1
+            version = self.version
+
+        if missing and self.user_model is not None:
+            loaded = self.user_model.get_user_records(missing, fields=USER_DETAIL_FIELDS)
+            with self.lock:
+                # Skip caching if a user was updated while we were loading
+                if version == self.version:
+                    for user_id, user in loaded.items():
+                        self.entries[user_id] = (user, now)
+                        self.entries.move_to_end(user_id)
+                    while len(self.entries) > self.capacity:
+                        self.entries.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    def get(self, user_id):
+        return self.get_many([user_id]).get(user_id)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(str(user_id), None)
+            self.version += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Shared per-process directory used by the booking and admin routes
+user_directory = UserDirectory()
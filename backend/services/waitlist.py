@@ -0,0 +1,277 @@
+"""
+Cancellation waitlist.
+
+A guest whose dates are taken joins the waitlist for a specific room or
+for a room type. When a booking is cancelled, or a pending booking's hold
+expires, the matcher looks up the waiting requests that overlap the freed
+dates with one interval query on the waitlist index, oldest first, and
+turns the first ones that now fit into pending holds on the freed room.
+The guest then has WAITLIST_HOLD_MINUTES to pay before the hold expires
+and the room moves on to the next request in line.
+
+Entry status: waiting -> promoting -> promoted, or cancelled / expired
+(the stay started before a room came free).
+
+Entries belong to a property like the rooms they wait for: the routes use
+the Waitlist view for the request's hotel_id (for_hotel), and the sweep
+runs over each property in turn.
+"""
+import copy
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import OperationFailure
+from models.booking_model import Booking
+from models.room_model import Room
+from services.pricing import PricingEngine, quote_rooms
+
+logger = logging.getLogger(__name__)
+
+
+def room_target(room_id):
+    return f'room:{room_id}'
+
+
+def type_target(room_type):
+    return f'type:{room_type}'
+
+
+def new_entry(user_id, room_id, room_type, checkin_date, checkout_date, guests, hotel_id=None):
+    """A waiting entry for one room, or any room of room_type when room_id is None"""
+    now = datetime.utcnow()
+    return {
+        'hotel_id': hotel_id,
+        'user_id': user_id,
+        'room_id': room_id,
+        'room_type': room_type,
+        'target': room_target(room_id) if room_id else type_target(room_type),
+        'checkin_date': checkin_date,
+        'checkout_date': checkout_date,
+        'guests': guests,
+        'status': 'waiting',
+        'created_at': now,
+        'updated_at': now
+    }
+
+
+def serialize_entry(entry):
+    data = {field: value for field, value in entry.items() if field != 'target'}
+    data['_id'] = str(entry['_id'])
+    return data
+
+
+class Waitlist:
+    """Stores waitlist entries and promotes them to pending holds when rooms come free"""
+
+    hotel_id = None
+
+    def __init__(self, db, pricing_engine, hold_minutes=60, scan_limit=50, sweep_batch=100):
+        self.entries = db.waitlist
+        self.booking_model = Booking(db.bookings)
+        self.room_model = Room(db.rooms)
+        self.pricing_engine = pricing_engine
+        self.hold = timedelta(minutes=hold_minutes)
+        self.scan_limit = scan_limit
+        self.sweep_batch = sweep_batch
+        # Matches in this process run one at a time, so two never hold the same freed nights
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def for_hotel(self, hotel_id):
+        """This waitlist limited to one property, sharing the matcher lock and the sweeper"""
+        view = copy.copy(self)
+        view.hotel_id = hotel_id
+        view.booking_model = self.booking_model.for_hotel(hotel_id)
+        view.room_model = self.room_model.for_hotel(hotel_id)
+        return view
+
+    def _scope(self, query):
+        if self.hotel_id is None:
+            return query
+        return dict({'hotel_id': self.hotel_id}, **query)
+
+    def join(self, user_id, room_id, room_type, checkin_date, checkout_date, guests):
+        entry = new_entry(user_id, room_id, room_type, checkin_date, checkout_date, guests, self.hotel_id)
+        entry['_id'] = self.entries.insert_one(entry).inserted_id
+        return entry
+
+    def find_waiting(self, user_id, target, checkin_date, checkout_date):
+        return self.entries.find_one(self._scope({
+            'user_id': user_id,
+            'status': 'waiting',
+            'target': target,
+            'checkin_date': checkin_date,
+            'checkout_date': checkout_date
+        }))
+
+    def count_waiting(self, user_id):
+        return self.entries.count_documents(self._scope({'user_id': user_id, 'status': 'waiting'}))
+
+    def user_entries(self, user_id):
+        return list(self.entries.find(self._scope({'user_id': user_id})).sort('created_at', -1))
+
+    def cancel(self, entry_id, user_id):
+        """Cancel one of the user's waiting entries; False if there is none"""
+        try:
+            result = self.entries.update_one(
+                self._scope({'_id': ObjectId(entry_id), 'user_id': user_id, 'status': 'waiting'}),
+                {'$set': {'status': 'cancelled', 'updated_at': datetime.utcnow()}}
+            )
+            return result.modified_count > 0
+        except:
+            return False
+
+    def candidates(self, room_id, room_type, checkin_date, checkout_date):
+        """Waiting entries for this room or its type whose stay overlaps the freed dates, oldest first"""
+        return list(self.entries.find(self._scope({
+            'status': 'waiting',
+            'target': {'$in': [room_target(room_id), type_target(room_type)]},
+            'checkin_date': {'$lt': checkout_date, '$gte': date.today().isoformat()},
+            'checkout_date': {'$gt': checkin_date}
+        })).sort('created_at', ASCENDING).limit(self.scan_limit))
+
+    def on_freed(self, room_id, checkin_date, checkout_date):
+        """
+        A booking of room_id over [checkin_date, checkout_date) was cancelled
+        or expired: hold the room for the waiting requests that now fit.
+        Returns the holds created.
+        """
+        room_id = str(room_id)
+        room = self.room_model.get_room_by_id(room_id)
+        if not room or room.get('status') != 'available':
+            return []
+
+        holds = []
+        with self.lock:
+            for entry in self.candidates(room_id, room.get('type', ''), checkin_date, checkout_date):
+                # The entry's stay may reach past the freed nights, or an earlier entry took them
+                if not self.booking_model.check_room_availability(room_id, entry['checkin_date'], entry['checkout_date']):
+                    continue
+                hold = self._promote(entry, room_id, room)
+                if hold:
+                    holds.append(hold)
+        return holds
+
+    def _promote(self, entry, room_id, room):
+        """Claim a waiting entry and book its pending hold; None if the entry changed meanwhile"""
+        claimed = self.entries.find_one_and_update(
+            {'_id': entry['_id'], 'status': 'waiting'},
+            {'$set': {'status': 'promoting', 'updated_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if not claimed:
+            return None
+
+        try:
+            nightly_rates, totals = quote_rooms(
+                self.pricing_engine, [room], self.booking_model, self.room_model.count_rooms(),
+                entry['checkin_date'], entry['checkout_date']
+            )
+            now = datetime.utcnow()
+            booking = self.booking_model.create_booking({
+                'user_id': entry['user_id'],
+                'room_id': room_id,
+                'room_number': room.get('roomNumber', ''),
+                'room_name': room.get('name', ''),
+                'room_type': room.get('type', ''),
+                'checkin_date': entry['checkin_date'],
+                'checkout_date': entry['checkout_date'],
+                'guests': entry['guests'],
+                'rooms': 1,
+                'price_per_night': room.get('price', 0),
+                'nightly_rates': nightly_rates[0].tolist(),
+                'total_price': totals[0].item(),
+                'status': 'pending',
+                'payment_status': 'pending',
+                'waitlist_id': str(entry['_id']),
+                'hold_expires_at': now + self.hold
+            })
+        except Exception:
+            logger.exception('Could not promote waitlist entry %s', entry['_id'])
+            self.entries.update_one(
+                {'_id': entry['_id'], 'status': 'promoting'},
+                {'$set': {'status': 'waiting', 'updated_at': datetime.utcnow()}}
+            )
+            return None
+
+        self.entries.update_one({'_id': entry['_id']}, {'$set': {
+            'status': 'promoted',
+            'booking_id': str(booking['_id']),
+            'promoted_at': now,
+            'updated_at': now
+        }})
+        return booking
+
+    def sweep(self):
+        """
+        Expire overdue holds and offer their dates to the waitlist, then
+        expire waiting entries whose stay has started, property by property
+        unless this is one property's view. Returns (holds expired, holds
+        created).
+        """
+        if self.hotel_id is None:
+            totals = [self.for_hotel(hotel_id).sweep() for hotel_id in self.room_model.get_hotel_ids()]
+            return sum(t[0] for t in totals), sum(t[1] for t in totals)
+
+        expired = created = 0
+        for booking in self.booking_model.get_expired_holds(limit=self.sweep_batch):
+            # Paid, being paid, or expired by another process since the query ran
+            if not self.booking_model.expire_hold(str(booking['_id'])):
+                continue
+            expired += 1
+            created += len(self.on_freed(booking['room_id'], booking['checkin_date'], booking['checkout_date']))
+
+        self.entries.update_many(
+            self._scope({'status': 'waiting', 'checkin_date': {'$lt': date.today().isoformat()}}),
+            {'$set': {'status': 'expired', 'updated_at': datetime.utcnow()}}
+        )
+        return expired, created
+
+    def run_forever(self, interval):
+        while not self.stopping.is_set():
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception('Waitlist sweep failed')
+            self.stopping.wait(interval)
+
+    def start(self, interval):
+        """Run the sweep every interval seconds on a daemon thread in this process"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run_forever, args=(interval,), name='waitlist-sweeper', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread:
+            self.thread.join()
+
+
+def ensure_waitlist_indexes(db):
+    """Interval lookup of waiting entries per room or type, and each user's list, within a property"""
+    db.waitlist.create_index([('hotel_id', ASCENDING), ('status', ASCENDING), ('target', ASCENDING),
+                              ('checkin_date', ASCENDING), ('checkout_date', ASCENDING)])
+    db.waitlist.create_index([('hotel_id', ASCENDING), ('user_id', ASCENDING), ('status', ASCENDING)])
+
+
+def init_waitlist(app, db, config):
+    """Create the waitlist indexes and, when WAITLIST_SWEEP_SECONDS > 0, run the hold sweeper in this process"""
+    try:
+        ensure_waitlist_indexes(db)
+    except OperationFailure as e:
+        app.logger.warning('Could not create waitlist indexes: %s', e)
+
+    waitlist = Waitlist(
+        db, PricingEngine.from_config(config),
+        hold_minutes=config.WAITLIST_HOLD_MINUTES,
+        scan_limit=config.WAITLIST_SCAN_LIMIT
+    )
+    app.extensions['waitlist'] = waitlist
+    if config.WAITLIST_SWEEP_SECONDS > 0:
+        waitlist.start(config.WAITLIST_SWEEP_SECONDS)
+    return waitlist
@@ -0,0 +1,45 @@
+"""
+Shard the per-property collections so each property's data can live on its own shard(s)
+Run once against a mongos, after migrate_hotel_ids.py and after the API has created its indexes:
+python shard_collections.py
+"""
+import argparse
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+from config import Config
+
+# Each key leads with hotel_id and is backed by an index the API creates
+SHARD_KEYS = {
+    'rooms': {'hotel_id': 1, '_id': 1},
+    # A room's bookings stay together, so overlap checks hit one shard
+    'bookings': {'hotel_id': 1, 'room_id': 1},
+    'payments': {'hotel_id': 1, 'created_at': 1},
+    'feedback': {'hotel_id': 1, 'created_at': 1}
+}
+
+def main():
+    """Main sharding function"""
+    parser = argparse.ArgumentParser(description='Shard rooms, bookings, payments and feedback on hotel_id')
+    parser.add_argument('--collections', nargs='*', default=list(SHARD_KEYS), choices=list(SHARD_KEYS))
+    args = parser.parse_args()
+    
+    client = MongoClient(Config.MONGO_URI)
+    try:
+        db = client.get_default_database()
+        try:
+            client.admin.command('enableSharding', db.name)
+        except OperationFailure as e:
+            print(f"Could not enable sharding on {db.name} (is this a mongos?): {e}")
+            return
+        
+        for name in args.collections:
+            try:
+                client.admin.command('shardCollection', f'{db.name}.{name}', key=SHARD_KEYS[name])
+                print(f"Sharded {name} on {SHARD_KEYS[name]}")
+            except OperationFailure as e:
+                print(f"Could not shard {name}: {e}")
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
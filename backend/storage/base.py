@@ -0,0 +1,199 @@
+"""
+Storage interfaces behind the Room, Booking and User models.
+
+Repositories take and return plain documents (dicts whose _id is an
+ObjectId, as MongoDB stores them) and string ids. fields limits the
+returned fields (always with _id); None returns whole documents. Domain
+rules, event publishing and record building stay in the models, so every
+engine shares them: storage/mongo.py talks to MongoDB and
+storage/memory.py keeps everything in-process.
+
+Write methods that take events accept a function of the write's result
+(new id, deleted document or True) returning outbox documents. It is only
+called if the write changed something, and its documents are stored in the
+outbox collection in the same unit as the write (see services/outbox.py).
+
+Rooms, bookings and payments belong to a property. for_hotel returns a
+view of a repository limited to one hotel_id: it leads every filter the
+view sends with hotel_id and stamps it on every document the view stores.
+The repository itself (hotel_id None) spans every property; only
+maintenance jobs and tests use it unscoped.
+"""
+import copy
+
+# Booking statuses that hold a room for their dates
+ACTIVE_STATUSES = ('confirmed', 'pending')
+
+
+class HotelScoped:
+    hotel_id = None
+
+    def for_hotel(self, hotel_id):
+        """A view limited to one property, sharing this repository's connection (or data) and indexes"""
+        view = copy.copy(self)
+        view.hotel_id = hotel_id
+        return view
+
+    def _scope(self, query=None):
+        """query with hotel_id as its leading key (unchanged when unscoped)"""
+        if self.hotel_id is None:
+            return dict(query or {})
+        return dict({'hotel_id': self.hotel_id}, **(query or {}))
+
+    def _tag(self, doc):
+        """Stamp the view's property on a document about to be stored"""
+        if self.hotel_id is not None:
+            doc['hotel_id'] = self.hotel_id
+        return doc
+
+
+class RoomRepository(HotelScoped):
+    def ensure_indexes(self):
+        """Create whatever the engine needs for the queries below"""
+        raise NotImplementedError
+
+    def insert(self, doc):
+        """Store a new room (sets doc['_id']) and return its id"""
+        raise NotImplementedError
+
+    def find_rooms(self, room_ids=None, status=None, fields=None):
+        """Rooms, optionally only the given ids or one status; may lag recent writes"""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def hotel_ids(self):
+        """Every property that has rooms"""
+        raise NotImplementedError
+
+    def get(self, room_id, fields=None):
+        """One room, reflecting every acknowledged write, or None"""
+        raise NotImplementedError
+
+    def get_many(self, room_ids):
+        """Whole documents for the given ids, reflecting every acknowledged write"""
+        raise NotImplementedError
+
+    def update(self, room_id, values):
+        """Set fields on one room; True if anything changed"""
+        raise NotImplementedError
+
+    def needing_cleaning(self, fields=None):
+        """Rooms flagged needs_cleaning or in maintenance"""
+        raise NotImplementedError
+
+    def search(self, filters, sort, skip, limit, price_buckets, fields=None):
+        """
+        One page of rooms matching filters (see Room.search_rooms), the total
+        number of matches and facet counts over all matches:
+        {'types' | 'amenities' | 'capacity': [(value, count), ...] most common first,
+         'price': [(bucket lower bound or 'other', count), ...] in bucket order}
+        """
+        raise NotImplementedError
+
+
+class BookingRepository(HotelScoped):
+    def ensure_indexes(self):
+        raise NotImplementedError
+
+    def insert(self, doc, events=None):
+        """Store a new booking (sets doc['_id']) and return its id"""
+        raise NotImplementedError
+
+    def insert_group(self, group, items, events=None):
+        """
+        Store a group booking's items and its parent document all-or-nothing.
+        Returns False, storing nothing, if any item's room is held by another
+        active booking for the group's dates. Sets group['item_ids'].
+        """
+        raise NotImplementedError
+
+    def get(self, booking_id):
+        raise NotImplementedError
+
+    def get_group(self, group_id):
+        raise NotImplementedError
+
+    def group_room_ids(self, group_id):
+        """Room ids of a group booking's items"""
+        raise NotImplementedError
+
+    def update(self, booking_id, values, events=None, status=None, conditions=None):
+        """
+        Set fields on one booking; True if anything changed. With status
+        (one status or a tuple of them) the booking is only updated while
+        its current status matches, and with conditions (field -> value)
+        only while those fields hold those values.
+        """
+        raise NotImplementedError
+
+    def update_group(self, group_id, values, events=None):
+        """Set fields on a group and its items; returns (group changed, item ids)"""
+        raise NotImplementedError
+
+    def delete(self, booking_id, user_id=None, events=None, room_id=None):
+        """
+        Delete a booking (only if it belongs to user_id, when given); returns
+        the deleted document or None. Pass the booking's room_id when known:
+        with hotel_id it completes the bookings shard key, which
+        find_one_and_delete needs on a sharded cluster before MongoDB 7.1.
+        """
+        raise NotImplementedError
+
+    def find_sorted(self, user_id=None, include_archived=False, fields=None):
+        """A user's (or every) booking, newest first, optionally with archived ones"""
+        raise NotImplementedError
+
+    def has_overlap(self, room_id, checkin_date, checkout_date):
+        """True if an active booking holds room_id for any night in [checkin, checkout)"""
+        raise NotImplementedError
+
+    def find_overlapping(self, checkin_date, checkout_date, room_ids=None, fields=None, stale_ok=False):
+        """Active bookings with a night in [checkin, checkout), optionally for some rooms only"""
+        raise NotImplementedError
+
+    def expired_holds(self, now, limit=100, fields=None):
+        """Pending bookings whose hold_expires_at is before now and with no payment in flight, oldest expiry first"""
+        raise NotImplementedError
+
+    def archive_before(self, checkout_before, batch_size=1000):
+        """Move bookings that checked out before the date to the archive; returns how many moved"""
+        raise NotImplementedError
+
+
+class UserRepository:
+    def ensure_indexes(self):
+        raise NotImplementedError
+
+    def insert(self, doc):
+        """Store a new user (sets doc['_id']); raises DuplicateKeyError for a taken email"""
+        raise NotImplementedError
+
+    def find_by_email(self, email):
+        raise NotImplementedError
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def get_many(self, user_ids, fields=None):
+        """Users with the given ids (invalid ids are skipped); may lag recent writes"""
+        raise NotImplementedError
+
+    def page(self, limit, after=None, fields=None):
+        """Up to limit users ordered by id, starting after the given id"""
+        raise NotImplementedError
+
+    def update(self, user_id, values):
+        """Set fields on one user; True if anything changed"""
+        raise NotImplementedError
+
+    def increment(self, user_id, field):
+        """Add one to a counter field and return its new value (None if no such user)"""
+        raise NotImplementedError
+
+
+class PaymentRepository(HotelScoped):
+    def insert(self, doc, events=None):
+        """Store a new payment (sets doc['_id']) and return its id"""
+        raise NotImplementedError
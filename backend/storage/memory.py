@@ -0,0 +1,862 @@
+"""
+In-process storage engine. Every collection lives in a dict guarded by a
+lock, and the rooms, bookings and users collections keep by hand the
+secondary indexes their hot queries need. Meant for development, demos and
+measuring the API itself without a mongod (see benchmarks/bench_memory_api.py):
+data is lost on restart and is not shared between worker processes.
+
+Stored documents are never modified in place; writes replace them, so
+readers can iterate a snapshot without holding the lock. Returned documents
+are shallow copies, so nested lists must not be mutated by callers.
+"""
+import bisect
+import re
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+from storage.base import ACTIVE_STATUSES, BookingRepository, PaymentRepository, RoomRepository, UserRepository
+
+_MISSING = object()
+_WORD = re.compile(r'\w+')
+
+
+def _get(doc, path):
+    value = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _equals(value, arg):
+    if value is _MISSING:
+        return arg is None
+    if isinstance(value, list) and not isinstance(arg, list):
+        return arg in value
+    return value == arg
+
+
+def _ordered(value, arg, compare):
+    for item in (value if isinstance(value, list) else [value]):
+        if item is _MISSING or item is None:
+            continue
+        try:
+            if compare(item, arg):
+                return True
+        except TypeError:
+            continue
+    return False
+
+
+_OPERATORS = {
+    '$eq': _equals,
+    '$ne': lambda value, arg: not _equals(value, arg),
+    '$in': lambda value, arg: any(_equals(value, item) for item in arg),
+    '$nin': lambda value, arg: not any(_equals(value, item) for item in arg),
+    '$gt': lambda value, arg: _ordered(value, arg, lambda a, b: a > b),
+    '$gte': lambda value, arg: _ordered(value, arg, lambda a, b: a >= b),
+    '$lt': lambda value, arg: _ordered(value, arg, lambda a, b: a < b),
+    '$lte': lambda value, arg: _ordered(value, arg, lambda a, b: a <= b),
+    '$exists': lambda value, arg: (value is not _MISSING) == bool(arg),
+    '$all': lambda value, arg: isinstance(value, list) and all(item in value for item in arg)
+}
+
+
+def _is_operator_dict(cond):
+    return isinstance(cond, dict) and cond and all(key.startswith('$') for key in cond)
+
+
+def _matches(doc, query):
+    """Evaluate the subset of the Mongo query language the application uses"""
+    for key, cond in query.items():
+        if key == '$or':
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+        elif key == '$and':
+            if not all(_matches(doc, sub) for sub in cond):
+                return False
+        elif _is_operator_dict(cond):
+            value = _get(doc, key)
+            for op, arg in cond.items():
+                if op not in _OPERATORS:
+                    raise OperationFailure(f'Unsupported query operator in memory storage: {op}')
+                if not _OPERATORS[op](value, arg):
+                    return False
+        elif not _equals(_get(doc, key), cond):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    """Shallow copy of doc limited by an inclusion or exclusion projection"""
+    if not projection:
+        return dict(doc)
+    include = [field for field, flag in projection.items() if flag and not isinstance(flag, dict)]
+    if include:
+        result = {field: doc[field] for field in include if field in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    return {field: value for field, value in doc.items() if field not in projection}
+
+
+def _projection(fields):
+    return {field: 1 for field in fields} if fields else None
+
+
+def _sort_key(value):
+    # Missing and null sort first, as in MongoDB
+    return (0,) if value is None or value is _MISSING else (1, value)
+
+
+def _sorted(docs, sort):
+    """Stable multi-key sort for [(field, direction), ...]"""
+    for field, direction in reversed(sort):
+        docs = sorted(docs, key=lambda doc: _sort_key(doc.get(field)), reverse=direction < 0)
+    return docs
+
+
+def _apply_update(doc, update):
+    """New document resulting from an update document or a replacement"""
+    if not any(key.startswith('$') for key in update):
+        return dict(update, _id=doc['_id'])
+    new = dict(doc)
+    for op, fields in update.items():
+        if op == '$set':
+            new.update(fields)
+        elif op == '$unset':
+            for field in fields:
+                new.pop(field, None)
+        elif op == '$inc':
+            for field, amount in fields.items():
+                new[field] = new.get(field, 0) + amount
+        elif op != '$setOnInsert':
+            raise OperationFailure(f'Unsupported update operator in memory storage: {op}')
+    return new
+
+
+def _upsert_doc(query, update):
+    doc = {key: cond for key, cond in query.items() if not key.startswith('$') and not _is_operator_dict(cond)}
+    doc.setdefault('_id', ObjectId())
+    doc.update(update.get('$setOnInsert', {}))
+    return _apply_update(doc, update)
+
+
+def _object_ids(ids):
+    return [ObjectId(value) for value in ids if ObjectId.is_valid(value)]
+
+
+class MemoryCursor:
+    """The part of the pymongo Cursor API the application uses"""
+
+    def __init__(self, docs, projection=None):
+        self.docs = docs
+        self.projection = projection
+        self.sort_keys = []
+        self.skip_count = 0
+        self.limit_count = 0
+
+    def sort(self, key, direction=1):
+        self.sort_keys = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def skip(self, count):
+        self.skip_count = count
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        docs = _sorted(self.docs, self.sort_keys) if self.sort_keys else self.docs
+        end = self.skip_count + self.limit_count if self.limit_count else None
+        return (_project(doc, self.projection) for doc in docs[self.skip_count:end])
+
+
+class MemoryCollection:
+    """
+    A collection with the pymongo Collection methods the application calls.
+    Subclasses maintain their own indexes through _index/_unindex and narrow
+    scans through _candidates.
+    """
+
+    def __init__(self, name, database=None):
+        self.name = name
+        self.database = database
+        self.lock = threading.RLock()
+        self.docs = {}
+
+    def with_options(self, **kwargs):
+        # One copy of the data: read preferences and concerns have nothing to choose between
+        return self
+
+    def create_index(self, keys, **kwargs):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        return kwargs.get('name') or '_'.join(f'{field}_{direction}' for field, direction in keys)
+
+    def drop(self):
+        with self.lock:
+            self.docs = {}
+            self._reset()
+
+    def _reset(self):
+        pass
+
+    def _index(self, doc):
+        pass
+
+    def _unindex(self, doc):
+        pass
+
+    def _candidates(self, query):
+        """Documents that may match query (a superset); called with the lock held"""
+        key = query.get('_id', _MISSING)
+        if isinstance(key, ObjectId):
+            return [self.docs[key]] if key in self.docs else []
+        if isinstance(key, dict) and set(key) == {'$in'}:
+            return [self.docs[value] for value in key['$in'] if value in self.docs]
+        return self.docs.values()
+
+    def _select(self, query):
+        with self.lock:
+            candidates = list(self._candidates(query))
+        return [doc for doc in candidates if _matches(doc, query)]
+
+    def _store(self, doc):
+        if doc['_id'] in self.docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']}")
+        self._index(doc)
+        self.docs[doc['_id']] = doc
+
+    def _replace(self, old, new):
+        self._unindex(old)
+        try:
+            self._index(new)
+        except DuplicateKeyError:
+            self._index(old)
+            raise
+        self.docs[new['_id']] = new
+
+    def _remove(self, doc):
+        self._unindex(doc)
+        del self.docs[doc['_id']]
+
+    def insert_one(self, doc):
+        doc.setdefault('_id', ObjectId())
+        with self.lock:
+            self._store(dict(doc))
+        return InsertOneResult(doc['_id'], True)
+
+    def insert_many(self, docs, ordered=True):
+        return InsertManyResult([self.insert_one(doc).inserted_id for doc in docs], True)
+
+    def find(self, filter=None, projection=None, sort=None, skip=0, limit=0, **kwargs):
+        cursor = MemoryCursor(self._select(filter or {}), projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
+
+    def find_one(self, filter=None, projection=None, **kwargs):
+        return next(iter(self.find(filter, projection, **kwargs).limit(1)), None)
+
+    def count_documents(self, filter, **kwargs):
+        return len(self._select(filter))
+
+    def estimated_document_count(self):
+        return len(self.docs)
+
+    def _write(self, query, update, many=False, upsert=False):
+        with self.lock:
+            matched = [doc for doc in self._candidates(query) if _matches(doc, query)]
+            if not many:
+                matched = matched[:1]
+            modified = 0
+            for old in matched:
+                new = _apply_update(old, update)
+                if new != old:
+                    self._replace(old, new)
+                    modified += 1
+            upserted = None
+            if not matched and upsert:
+                doc = _upsert_doc(query, update)
+                self._store(doc)
+                upserted = doc['_id']
+        return UpdateResult({'n': len(matched) or int(upserted is not None), 'nModified': modified,
+                             'upserted': upserted}, True)
+
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        return self._write(filter, update, upsert=upsert)
+
+    def update_many(self, filter, update, upsert=False, **kwargs):
+        return self._write(filter, update, many=True, upsert=upsert)
+
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        return self._write(filter, replacement, upsert=upsert)
+
+    def find_one_and_update(self, filter, update, projection=None, return_document=ReturnDocument.BEFORE,
+                            upsert=False, sort=None, **kwargs):
+        with self.lock:
+            matched = (doc for doc in self._candidates(filter) if _matches(doc, filter))
+            if sort:
+                matched = iter(_sorted(list(matched), sort))
+            old = next(matched, None)
+            if old is None:
+                if not upsert:
+                    return None
+                new = _upsert_doc(filter, update)
+                self._store(new)
+            else:
+                new = _apply_update(old, update)
+                self._replace(old, new)
+        result = new if return_document == ReturnDocument.AFTER else old
+        return _project(result, projection) if result is not None else None
+
+    def _delete(self, query, many):
+        with self.lock:
+            matched = [doc for doc in self._candidates(query) if _matches(doc, query)]
+            if not many:
+                matched = matched[:1]
+            for doc in matched:
+                self._remove(doc)
+        return DeleteResult({'n': len(matched)}, True)
+
+    def delete_one(self, filter, **kwargs):
+        return self._delete(filter, many=False)
+
+    def find_one_and_delete(self, filter, projection=None, **kwargs):
+        with self.lock:
+            doc = next((doc for doc in self._candidates(filter) if _matches(doc, filter)), None)
+            if doc is not None:
+                self._remove(doc)
+        return _project(doc, projection) if doc is not None else None
+
+    def delete_many(self, filter, **kwargs):
+        return self._delete(filter, many=True)
+
+
+def _with_events(store, write, events):
+    """Run write() and store events(result) in the outbox, both under the store's lock"""
+    with store.lock:
+        result = write()
+        if result and events:
+            docs = events(result)
+            if docs:
+                store.database['outbox'].insert_many(docs)
+        return result
+
+
+class MemoryRoomStore(MemoryCollection, RoomRepository):
+    """
+    Rooms indexed by property and by (property, status), plus the set of
+    rooms on the cleaning list. Index hits are returned in _id (insertion)
+    order, as MongoDB returns rooms in natural order.
+    """
+
+    def _reset(self):
+        self.by_hotel = {}
+        self.by_status = {}
+        self.cleaning = set()
+
+    def __init__(self, name, database=None):
+        super().__init__(name, database)
+        self._reset()
+
+    def _index(self, doc):
+        hotel_id = doc.get('hotel_id')
+        self.by_hotel.setdefault(hotel_id, set()).add(doc['_id'])
+        self.by_status.setdefault((hotel_id, doc.get('status')), set()).add(doc['_id'])
+        if doc.get('needs_cleaning') is True or doc.get('status') == 'maintenance':
+            self.cleaning.add(doc['_id'])
+
+    def _unindex(self, doc):
+        hotel_id = doc.get('hotel_id')
+        self.by_hotel.get(hotel_id, set()).discard(doc['_id'])
+        self.by_status.get((hotel_id, doc.get('status')), set()).discard(doc['_id'])
+        self.cleaning.discard(doc['_id'])
+
+    def _ids(self, status=None):
+        """Ids of the view's rooms (with status, if given); called with the lock held"""
+        if self.hotel_id is not None:
+            ids = self.by_status.get((self.hotel_id, status), ()) if status else self.by_hotel.get(self.hotel_id, ())
+        elif status:
+            ids = set().union(*(ids for (_, room_status), ids in self.by_status.items() if room_status == status))
+        else:
+            ids = self.docs
+        return sorted(ids)
+
+    def _candidates(self, query):
+        status = query.get('status')
+        if '_id' not in query and (isinstance(status, str) or 'hotel_id' in query):
+            return [self.docs[room_id] for room_id in self._ids(status if isinstance(status, str) else None)]
+        return super()._candidates(query)
+
+    def ensure_indexes(self):
+        pass
+
+    def insert(self, doc):
+        return self.insert_one(self._tag(doc)).inserted_id
+
+    def find_rooms(self, room_ids=None, status=None, fields=None):
+        query = self._scope()
+        if room_ids is not None:
+            query['_id'] = {'$in': _object_ids(room_ids)}
+        if status is not None:
+            query['status'] = status
+        return self.find(query, _projection(fields))
+
+    def count(self):
+        with self.lock:
+            return len(self.docs) if self.hotel_id is None else len(self.by_hotel.get(self.hotel_id, ()))
+
+    def hotel_ids(self):
+        with self.lock:
+            return sorted(hotel_id for hotel_id, ids in self.by_hotel.items() if hotel_id is not None and ids)
+
+    def get(self, room_id, fields=None):
+        return self.find_one(self._scope({'_id': ObjectId(room_id)}), _projection(fields))
+
+    def get_many(self, room_ids):
+        return list(self.find(self._scope({'_id': {'$in': [ObjectId(room_id) for room_id in room_ids]}})))
+
+    def update(self, room_id, values):
+        return self.update_one(self._scope({'_id': ObjectId(room_id)}), {'$set': values}).modified_count > 0
+
+    def needing_cleaning(self, fields=None):
+        with self.lock:
+            docs = [self.docs[room_id] for room_id in sorted(self.cleaning)]
+        if self.hotel_id is not None:
+            docs = [doc for doc in docs if doc.get('hotel_id') == self.hotel_id]
+        return MemoryCursor(docs, _projection(fields))
+
+    def search(self, filters, sort, skip, limit, price_buckets, fields=None):
+        """
+        Same results and facets as the $facet pipeline. Keywords match whole
+        words (no stemming), scored like the room_text index: 3 per hit in the
+        name, 1 per hit in the description.
+        """
+        with self.lock:
+            docs = [self.docs[room_id] for room_id in self._ids(filters.get('status'))]
+
+        types = filters.get('types')
+        amenities = filters.get('amenities')
+        min_price, max_price = filters.get('min_price'), filters.get('max_price')
+        min_capacity = filters.get('min_capacity')
+        terms = set(_WORD.findall(filters['q'].lower())) if filters.get('q') else None
+
+        matches = []
+        for doc in docs:
+            price = doc.get('price')
+            if types and doc.get('type') not in types:
+                continue
+            if min_price is not None and not _ordered(price, min_price, lambda a, b: a >= b):
+                continue
+            if max_price is not None and not _ordered(price, max_price, lambda a, b: a <= b):
+                continue
+            if min_capacity is not None and not _ordered(doc.get('capacity'), min_capacity, lambda a, b: a >= b):
+                continue
+            if amenities and not all(amenity in (doc.get('amenities') or ()) for amenity in amenities):
+                continue
+            if terms is not None:
+                score = 3 * _hits(doc.get('name'), terms) + _hits(doc.get('description'), terms)
+                if not score:
+                    continue
+                doc = dict(doc, score=float(score))
+            matches.append(doc)
+
+        facets = {
+            'types': Counter(doc.get('type') for doc in matches),
+            'amenities': Counter(amenity for doc in matches for amenity in (doc.get('amenities') or ())),
+            'capacity': Counter(doc.get('capacity') for doc in matches)
+        }
+        facets = {name: sorted(counts.items(), key=lambda item: (-item[1], _sort_key(item[0])))
+                  for name, counts in facets.items()}
+        buckets = Counter(_bucket(doc.get('price'), price_buckets) for doc in matches)
+        facets['price'] = [(lower, buckets[lower]) for lower in price_buckets[:-1] if buckets[lower]]
+        if buckets['other']:
+            facets['price'].append(('other', buckets['other']))
+
+        # Relevance follows the requested sort keys, and _id breaks ties, as in the pipeline
+        sort = list((sort or {}).items())
+        if terms is not None:
+            sort.append(('score', -1))
+        sort.append(('_id', 1))
+
+        projection = _projection(fields)
+        if projection and terms is not None:
+            projection['score'] = 1
+        page = [_project(doc, projection) for doc in _sorted(matches, sort)[skip:skip + limit]]
+        return page, len(matches), facets
+
+
+def _hits(text, terms):
+    return sum(1 for word in _WORD.findall(text.lower()) if word in terms) if isinstance(text, str) else 0
+
+
+def _bucket(price, boundaries):
+    """Lower bound of the $bucket holding price, or 'other'"""
+    if not isinstance(price, (int, float)) or not boundaries or price < boundaries[0] or price >= boundaries[-1]:
+        return 'other'
+    return boundaries[bisect.bisect_right(boundaries, price) - 1]
+
+
+class IntervalIndex:
+    """
+    Stays sorted by check-in date. An overlap query only scans stays that
+    check in before the range ends and no earlier than the range start minus
+    the longest stay seen, instead of every booking of the room.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self.longest = 0
+
+    def add(self, checkin, checkout, doc_id):
+        bisect.insort(self.entries, (checkin, checkout, doc_id))
+        try:
+            nights = (date.fromisoformat(checkout) - date.fromisoformat(checkin)).days
+        except ValueError:
+            nights = None
+        # Unparseable dates disable the lower bound rather than risk missing a stay
+        self.longest = float('inf') if nights is None else max(self.longest, nights)
+
+    def remove(self, checkin, checkout, doc_id):
+        index = bisect.bisect_left(self.entries, (checkin, checkout, doc_id))
+        if index < len(self.entries) and self.entries[index] == (checkin, checkout, doc_id):
+            del self.entries[index]
+
+    def overlapping(self, checkin, checkout):
+        """Ids of stays with a night in [checkin, checkout)"""
+        start = 0
+        if self.longest != float('inf'):
+            try:
+                earliest = (date.fromisoformat(checkin) - timedelta(days=self.longest)).isoformat()
+                start = bisect.bisect_left(self.entries, (earliest,))
+            except ValueError:
+                pass
+        end = bisect.bisect_left(self.entries, (checkout,))
+        return [doc_id for _, stay_checkout, doc_id in self.entries[start:end] if stay_checkout > checkin]
+
+
+def _stay(doc):
+    checkin, checkout = doc.get('checkin_date'), doc.get('checkout_date')
+    if isinstance(checkin, str) and isinstance(checkout, str):
+        return checkin, checkout
+    return None
+
+
+class MemoryBookingStore(MemoryCollection, BookingRepository):
+    """Bookings indexed by user, by group and by stay dates, per room and per property"""
+
+    def _reset(self):
+        self.by_user = {}
+        self.by_group = {}
+        self.by_room = {}
+        self.stays = {}
+
+    def __init__(self, name, database=None):
+        super().__init__(name, database)
+        self._reset()
+
+    @property
+    def groups(self):
+        return self.database['booking_groups']
+
+    @property
+    def archive(self):
+        return self.database['bookings_archive']
+
+    def _index(self, doc):
+        self.by_user.setdefault(doc.get('user_id'), set()).add(doc['_id'])
+        if doc.get('group_id'):
+            self.by_group.setdefault(doc['group_id'], set()).add(doc['_id'])
+        stay = _stay(doc)
+        if stay:
+            self.by_room.setdefault(doc.get('room_id'), IntervalIndex()).add(*stay, doc['_id'])
+            self.stays.setdefault(doc.get('hotel_id'), IntervalIndex()).add(*stay, doc['_id'])
+
+    def _unindex(self, doc):
+        self.by_user.get(doc.get('user_id'), set()).discard(doc['_id'])
+        if doc.get('group_id'):
+            self.by_group.get(doc['group_id'], set()).discard(doc['_id'])
+        stay = _stay(doc)
+        if stay:
+            self.by_room[doc.get('room_id')].remove(*stay, doc['_id'])
+            self.stays[doc.get('hotel_id')].remove(*stay, doc['_id'])
+
+    def _candidates(self, query):
+        if isinstance(query.get('group_id'), str):
+            return [self.docs[doc_id] for doc_id in self.by_group.get(query['group_id'], ())]
+        if isinstance(query.get('user_id'), str):
+            return [self.docs[doc_id] for doc_id in self.by_user.get(query['user_id'], ())]
+        return super()._candidates(query)
+
+    def _overlapping(self, checkin_date, checkout_date, room_ids=None):
+        """Active bookings of the view's property with a night in the range; called with the lock held"""
+        if room_ids is None:
+            indexes = self.stays.values() if self.hotel_id is None else [self.stays.get(self.hotel_id, IntervalIndex())]
+            ids = [doc_id for index in indexes for doc_id in index.overlapping(checkin_date, checkout_date)]
+        else:
+            ids = [doc_id for room_id in set(room_ids) if room_id in self.by_room
+                   for doc_id in self.by_room[room_id].overlapping(checkin_date, checkout_date)]
+        docs = (self.docs[doc_id] for doc_id in ids)
+        return [doc for doc in docs if doc.get('status') in ACTIVE_STATUSES
+                and (self.hotel_id is None or doc.get('hotel_id') == self.hotel_id)]
+
+    def ensure_indexes(self):
+        pass
+
+    def insert(self, doc, events=None):
+        return _with_events(self, lambda: self.insert_one(self._tag(doc)).inserted_id, events)
+
+    def insert_group(self, group, items, events=None):
+        """The overlap check and the inserts happen under one lock, so nothing is rolled back"""
+        self._tag(group)
+        for item in items:
+            self._tag(item)
+
+        def write():
+            room_ids = [item['room_id'] for item in items]
+            if self._overlapping(group['checkin_date'], group['checkout_date'], room_ids):
+                return False
+            group['item_ids'] = [str(item_id) for item_id in self.insert_many(items).inserted_ids]
+            self.groups.insert_one(group)
+            return True
+        return _with_events(self, write, events)
+
+    def get(self, booking_id):
+        return self.find_one(self._scope({'_id': ObjectId(booking_id)}))
+
+    def get_group(self, group_id):
+        return self.groups.find_one(self._scope({'_id': ObjectId(group_id)}))
+
+    def group_room_ids(self, group_id):
+        return [item['room_id'] for item in self.find(self._scope({'group_id': str(group_id)}), {'room_id': 1})]
+
+    def update(self, booking_id, values, events=None, status=None, conditions=None):
+        query = self._scope({'_id': ObjectId(booking_id)})
+        if status is not None:
+            query['status'] = {'$in': list(status)} if isinstance(status, (list, tuple)) else status
+        query.update(conditions or {})
+        return _with_events(self, lambda: self.update_one(query, {'$set': values}).modified_count > 0, events)
+
+    def update_group(self, group_id, values, events=None):
+        def write():
+            result = self.groups.update_one(self._scope({'_id': ObjectId(group_id)}), {'$set': values})
+            self.update_many(self._scope({'group_id': str(group_id)}), {'$set': values})
+            return result.modified_count > 0
+        changed = _with_events(self, write, events)
+        item_ids = [item['_id'] for item in self.find(self._scope({'group_id': str(group_id)}), {'_id': 1})]
+        return changed, item_ids
+
+    def delete(self, booking_id, user_id=None, events=None, room_id=None):
+        query = self._scope({'_id': ObjectId(booking_id)})
+        if room_id is not None:
+            query['room_id'] = room_id
+        if user_id:
+            query['user_id'] = user_id
+        return _with_events(self, lambda: self.find_one_and_delete(query), events)
+
+    def find_sorted(self, user_id=None, include_archived=False, fields=None):
+        query = self._scope({'user_id': user_id} if user_id is not None else {})
+        projection = _projection(fields)
+        bookings = list(self.find(query, projection).sort('created_at', -1))
+        if include_archived:
+            bookings.extend(self.archive.find(query, projection))
+            bookings = _sorted(bookings, [('created_at', -1)])
+        return bookings
+
+    def has_overlap(self, room_id, checkin_date, checkout_date):
+        with self.lock:
+            return bool(self._overlapping(checkin_date, checkout_date, [room_id]))
+
+    def find_overlapping(self, checkin_date, checkout_date, room_ids=None, fields=None, stale_ok=False):
+        with self.lock:
+            docs = self._overlapping(checkin_date, checkout_date, room_ids)
+        projection = _projection(fields)
+        return [_project(doc, projection) for doc in docs]
+
+    def expired_holds(self, now, limit=100, fields=None):
+        # Holds are few and short-lived; a scan is fine in memory
+        return list(self.find(self._scope({'status': 'pending', 'payment_intent_id': None, 'hold_expires_at': {'$lt': now}}), _projection(fields))
+                    .sort('hold_expires_at', 1).limit(limit))
+
+    def archive_before(self, checkout_before, batch_size=1000):
+        moved = 0
+        while True:
+            batch = list(self.find(self._scope({'checkout_date': {'$lt': checkout_before}}))
+                         .sort('checkout_date', 1).limit(batch_size))
+            if not batch:
+                return moved
+            archived_at = datetime.utcnow()
+            for booking in batch:
+                booking['archived_at'] = archived_at
+                self.archive.replace_one({'_id': booking['_id']}, booking, upsert=True)
+            moved += self.delete_many({'_id': {'$in': [b['_id'] for b in batch]}}).deleted_count
+
+
+class MemoryUserStore(MemoryCollection, UserRepository):
+    """Users with a unique email index and ids kept sorted for keyset paging"""
+
+    def _reset(self):
+        self.by_email = {}
+        self.ids = []
+
+    def __init__(self, name, database=None):
+        super().__init__(name, database)
+        self._reset()
+
+    def _index(self, doc):
+        email = doc.get('email')
+        if email is not None:
+            if self.by_email.get(email, doc['_id']) != doc['_id']:
+                raise DuplicateKeyError(f'E11000 duplicate key error collection: {self.name} index: email_1')
+            self.by_email[email] = doc['_id']
+        index = bisect.bisect_left(self.ids, doc['_id'])
+        if index == len(self.ids) or self.ids[index] != doc['_id']:
+            self.ids.insert(index, doc['_id'])
+
+    def _unindex(self, doc):
+        if self.by_email.get(doc.get('email')) == doc['_id']:
+            del self.by_email[doc['email']]
+        index = bisect.bisect_left(self.ids, doc['_id'])
+        if index < len(self.ids) and self.ids[index] == doc['_id']:
+            del self.ids[index]
+
+    def _candidates(self, query):
+        email = query.get('email', _MISSING)
+        if isinstance(email, str):
+            return [self.docs[self.by_email[email]]] if email in self.by_email else []
+        return super()._candidates(query)
+
+    def ensure_indexes(self):
+        pass
+
+    def insert(self, doc):
+        return self.insert_one(doc).inserted_id
+
+    def find_by_email(self, email):
+        return self.find_one({'email': email})
+
+    def get(self, user_id):
+        return self.find_one({'_id': ObjectId(user_id)})
+
+    def get_many(self, user_ids, fields=None):
+        return self.find({'_id': {'$in': _object_ids(user_ids)}}, _projection(fields))
+
+    def page(self, limit, after=None, fields=None):
+        with self.lock:
+            start = bisect.bisect_right(self.ids, ObjectId(after)) if after else 0
+            docs = [self.docs[user_id] for user_id in self.ids[start:start + limit]]
+        return MemoryCursor(docs, _projection(fields))
+
+    def update(self, user_id, values):
+        return self.update_one({'_id': ObjectId(user_id)}, {'$set': values}).modified_count > 0
+
+    def increment(self, user_id, field):
+        user = self.find_one_and_update(
+            {'_id': ObjectId(user_id)},
+            {'$inc': {field: 1}},
+            projection={field: 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return user[field] if user else None
+
+
+class MemoryPaymentStore(MemoryCollection, PaymentRepository):
+    def insert(self, doc, events=None):
+        return _with_events(self, lambda: self.insert_one(self._tag(doc)).inserted_id, events)
+
+
+class MemoryIntentStore(MemoryCollection):
+    """Payment intents with the unique index on (hotel_id, booking_id) of active intents"""
+
+    def _reset(self):
+        self.active = {}
+
+    def __init__(self, name, database=None):
+        super().__init__(name, database)
+        self._reset()
+
+    def _index(self, doc):
+        if doc.get('active') is True:
+            key = (doc.get('hotel_id'), doc.get('booking_id'))
+            if self.active.get(key, doc['_id']) != doc['_id']:
+                raise DuplicateKeyError(f'E11000 duplicate key error collection: {self.name} index: one_active_intent_per_booking')
+            self.active[key] = doc['_id']
+
+    def _unindex(self, doc):
+        key = (doc.get('hotel_id'), doc.get('booking_id'))
+        if self.active.get(key) == doc['_id']:
+            del self.active[key]
+
+
+class MemoryDatabase:
+    """
+    Stands in for a pymongo Database: attribute or item access returns a
+    collection, created on first use. rooms, bookings and users are the
+    indexed stores above, which the models use as their repositories
+    (payments too, for their outbox events); payment_intents enforces the
+    one-active-intent-per-booking index.
+    """
+    STORES = {'rooms': MemoryRoomStore, 'bookings': MemoryBookingStore, 'users': MemoryUserStore,
+              'payments': MemoryPaymentStore, 'payment_intents': MemoryIntentStore}
+
+    def __init__(self, name='easestay'):
+        self.name = name
+        self.collections = {}
+        self.options = {}
+        self.lock = threading.Lock()
+
+    def __getitem__(self, name):
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = self.STORES.get(name, MemoryCollection)(name, self)
+            return self.collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self):
+        return list(self.collections)
+
+    def list_collections(self, filter=None):
+        names = [filter['name']] if filter and 'name' in filter else list(self.collections)
+        return [{'name': name, 'type': self.options.get(name, {}).get('type', 'collection'),
+                 'options': self.options.get(name, {}).get('options', {})}
+                for name in names if name in self.collections]
+
+    def create_collection(self, name, **options):
+        """Options are only recorded: a time-series collection is a plain collection here"""
+        with self.lock:
+            if name in self.collections:
+                raise CollectionInvalid(f'collection {name} already exists')
+        self.options[name] = {'type': 'timeseries' if 'timeseries' in options else 'collection', 'options': options}
+        return self[name]
+
+    def command(self, command, *args, **kwargs):
+        if command == 'ping':
+            return {'ok': 1.0}
+        if command == 'collMod' and args and args[0] in self.options:
+            # Recorded like create_collection's options; TTLs are not enforced in memory
+            self.options[args[0]]['options'].update(kwargs)
+            return {'ok': 1.0}
+        raise OperationFailure(f'Unsupported command in memory storage: {command}')
+
+    def watch(self, *args, **kwargs):
+        # The events watcher falls back to the models' local publishes
+        raise OperationFailure('Change streams are not available in memory storage')
@@ -0,0 +1,403 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, ReplaceOne, ReturnDocument
+from pymongo.errors import PyMongoError
+from services.read_routing import for_catalog, for_critical
+from storage.base import ACTIVE_STATUSES, BookingRepository, PaymentRepository, RoomRepository, UserRepository
+
+
+def _projection(fields):
+    return {field: 1 for field in fields} if fields else None
+
+
+def _object_ids(ids):
+    return [ObjectId(value) for value in ids if ObjectId.is_valid(value)]
+
+
+def _count_by(field):
+    """Facet stages counting matches per value of field, most common first"""
+    return [{'$group': {'_id': field, 'count': {'$sum': 1}}}, {'$sort': {'count': -1, '_id': 1}}]
+
+
+class OutboxWriter:
+    """Appends outbox events in the same unit as the write they describe"""
+
+    def __init__(self, collection):
+        self.outbox = for_critical(collection.database.outbox)
+        self.transactions = None
+
+    def supports_transactions(self):
+        """Transactions need a replica set or mongos; checked once per repository"""
+        if self.transactions is None:
+            try:
+                hello = self.outbox.database.command('hello')
+                self.transactions = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+            except PyMongoError:
+                self.transactions = False
+        return self.transactions
+
+    def write(self, collection, write, events):
+        """
+        Run write(session) and, if it changed anything, store events(result)
+        in the outbox. On a replica set both happen in one transaction; a
+        standalone server has none, so the events are stored right after
+        the write and a crash in between loses them.
+        """
+        def unit(session):
+            result = write(session)
+            if result and events:
+                docs = events(result)
+                if docs:
+                    self.outbox.insert_many(docs, session=session)
+            return result
+
+        if not events or not self.supports_transactions():
+            return unit(None)
+        with self.outbox.database.client.start_session() as session:
+            return session.with_transaction(
+                unit, read_concern=collection.read_concern, write_concern=collection.write_concern
+            )
+
+
+class MongoRoomRepository(RoomRepository):
+    def __init__(self, collection):
+        self.collection = collection
+        # Listings and counts tolerate replica lag; single-room reads stay on the primary
+        self.catalog = for_catalog(collection)
+
+    def ensure_indexes(self):
+        """
+        Indexes behind /rooms/search (property and equality fields first, then
+        the price sort/range) and the cleaning list. hotel_id leads every one.
+        """
+        # Id lookups within a property; also supports the {hotel_id, _id} shard key
+        self.collection.create_index([('hotel_id', ASCENDING), ('_id', ASCENDING)])
+        self.collection.create_index([('hotel_id', ASCENDING), ('status', ASCENDING), ('type', ASCENDING), ('price', ASCENDING)])
+        self.collection.create_index([('hotel_id', ASCENDING), ('status', ASCENDING), ('price', ASCENDING)])
+        self.collection.create_index([('hotel_id', ASCENDING), ('status', ASCENDING), ('capacity', ASCENDING)])
+        # Multikey: one index entry per amenity
+        self.collection.create_index([('hotel_id', ASCENDING), ('amenities', ASCENDING), ('price', ASCENDING)])
+        # A collection has a single text index: replace the one from before properties
+        if 'room_text' in self.collection.index_information():
+            self.collection.drop_index('room_text')
+        # hotel_id prefix: $text searches must name the property
+        self.collection.create_index(
+            [('hotel_id', ASCENDING), ('name', TEXT), ('description', TEXT)],
+            weights={'name': 3, 'description': 1},
+            name='room_text_by_hotel'
+        )
+        # Serves the needs_cleaning branch of the cleaning list's $or; status is covered above
+        self.collection.create_index(
+            [('hotel_id', ASCENDING), ('needs_cleaning', ASCENDING)],
+            partialFilterExpression={'needs_cleaning': True}
+        )
+
+    def insert(self, doc):
+        return self.collection.insert_one(self._tag(doc)).inserted_id
+
+    def find_rooms(self, room_ids=None, status=None, fields=None):
+        query = self._scope()
+        if room_ids is not None:
+            query['_id'] = {'$in': _object_ids(room_ids)}
+        if status is not None:
+            query['status'] = status
+        return self.catalog.find(query, _projection(fields))
+
+    def count(self):
+        return self.catalog.count_documents(self._scope())
+
+    def hotel_ids(self):
+        # Walks the distinct leading keys of a hotel_id index
+        return sorted(hotel_id for hotel_id in self.catalog.distinct('hotel_id') if hotel_id is not None)
+
+    def get(self, room_id, fields=None):
+        return self.collection.find_one(self._scope({'_id': ObjectId(room_id)}), _projection(fields))
+
+    def get_many(self, room_ids):
+        return list(self.collection.find(self._scope({'_id': {'$in': [ObjectId(room_id) for room_id in room_ids]}})))
+
+    def update(self, room_id, values):
+        result = self.collection.update_one(self._scope({'_id': ObjectId(room_id)}), {'$set': values})
+        return result.modified_count > 0
+
+    def needing_cleaning(self, fields=None):
+        # The property goes in each branch so both can use their own index
+        query = {
+            '$or': [
+                self._scope({'needs_cleaning': True}),
+                self._scope({'status': 'maintenance'})
+            ]
+        }
+        return self.collection.find(query, _projection(fields))
+
+    def search(self, filters, sort, skip, limit, price_buckets, fields=None):
+        """All filtering, paging and facet counting happens in one $facet aggregation"""
+        match = self._scope()
+        if filters.get('q'):
+            match['$text'] = {'$search': filters['q']}
+        if filters.get('status'):
+            match['status'] = filters['status']
+        if filters.get('types'):
+            match['type'] = {'$in': filters['types']}
+        price = {}
+        if filters.get('min_price') is not None:
+            price['$gte'] = filters['min_price']
+        if filters.get('max_price') is not None:
+            price['$lte'] = filters['max_price']
+        if price:
+            match['price'] = price
+        if filters.get('min_capacity') is not None:
+            match['capacity'] = {'$gte': filters['min_capacity']}
+        if filters.get('amenities'):
+            match['amenities'] = {'$all': filters['amenities']}
+
+        projection = _projection(fields) or {}
+        if filters.get('q'):
+            projection['score'] = {'$meta': 'textScore'}
+            sort = dict(sort, score={'$meta': 'textScore'}) if sort else {'score': {'$meta': 'textScore'}}
+        # _id last keeps pages stable when sort keys tie
+        sort = dict(sort or {}, _id=1)
+
+        results = [{'$sort': sort}, {'$skip': skip}, {'$limit': limit}]
+        if projection:
+            results.append({'$project': projection})
+
+        pipeline = [
+            {'$match': match},
+            {'$facet': {
+                'results': results,
+                'total': [{'$count': 'count'}],
+                'types': _count_by('$type'),
+                'amenities': [{'$unwind': '$amenities'}] + _count_by('$amenities'),
+                'capacity': _count_by('$capacity'),
+                'price': [{'$bucket': {
+                    'groupBy': '$price',
+                    'boundaries': price_buckets,
+                    'default': 'other'
+                }}]
+            }}
+        ]
+        result = next(self.catalog.aggregate(pipeline), {})
+
+        total = result.get('total')
+        facets = {
+            name: [(f['_id'], f['count']) for f in result.get(name, [])]
+            for name in ('types', 'amenities', 'capacity', 'price')
+        }
+        return result.get('results', []), total[0]['count'] if total else 0, facets
+
+
+class MongoBookingRepository(BookingRepository):
+    def __init__(self, collection):
+        # Overlap checks, payment lookups and booking writes go to the primary
+        # with majority concerns; only demand estimates read the catalog handle
+        self.collection = for_critical(collection)
+        self.catalog = for_catalog(collection)
+        self.groups = self.collection.database.booking_groups
+        # Cold collection holding bookings whose stay ended long ago
+        self.archive = self.collection.database.bookings_archive
+        self.outbox = OutboxWriter(self.collection)
+
+    def ensure_indexes(self):
+        """Indexes behind the overlap checks, date-range scans and per-user lists"""
+        # hotel_id leads every index; (hotel_id, room_id) is also the shard key
+        # Overlap checks bound checkout_date from below, so only a room's
+        # current and future stays are scanned rather than its whole history
+        self.collection.create_index([('hotel_id', ASCENDING), ('room_id', ASCENDING),
+                                      ('checkout_date', ASCENDING), ('checkin_date', ASCENDING)])
+        # Occupancy ranges for pricing/calendars and the archive sweep
+        self.collection.create_index([('hotel_id', ASCENDING), ('checkout_date', ASCENDING), ('checkin_date', ASCENDING)])
+        self.collection.create_index([('hotel_id', ASCENDING), ('user_id', ASCENDING), ('created_at', DESCENDING)])
+        self.collection.create_index([('hotel_id', ASCENDING), ('group_id', ASCENDING)])
+        # Pending holds with an expiry, for the expiry sweep
+        self.collection.create_index([('hotel_id', ASCENDING), ('status', ASCENDING), ('hold_expires_at', ASCENDING)])
+        self.archive.create_index([('hotel_id', ASCENDING), ('user_id', ASCENDING), ('created_at', DESCENDING)])
+
+    def insert(self, doc, events=None):
+        self._tag(doc)
+        return self.outbox.write(
+            self.collection, lambda session: self.collection.insert_one(doc, session=session).inserted_id, events
+        )
+
+    def insert_group(self, group, items, events=None):
+        """
+        Items are written in one bulk insert and then re-checked for overlaps
+        with other bookings; if another request won the race for any room the
+        whole group is removed again. The re-check must see other requests'
+        inserts, so this is not a transaction and the group's events are
+        stored with the parent document.
+        """
+        group_id = str(group['_id'])
+        self._tag(group)
+        for item in items:
+            self._tag(item)
+        try:
+            result = self.collection.insert_many(items, ordered=True)
+        except Exception:
+            self.collection.delete_many(self._scope({'group_id': group_id}))
+            raise
+
+        conflict = self.collection.find_one(self._scope({
+            'room_id': {'$in': [item['room_id'] for item in items]},
+            'status': {'$in': list(ACTIVE_STATUSES)},
+            'checkin_date': {'$lt': group['checkout_date']},
+            'checkout_date': {'$gt': group['checkin_date']},
+            'group_id': {'$ne': group_id}
+        }), {'_id': 1})
+        if conflict:
+            self.collection.delete_many(self._scope({'group_id': group_id}))
+            return False
+
+        group['item_ids'] = [str(item_id) for item_id in result.inserted_ids]
+        self.outbox.write(self.groups, lambda session: self.groups.insert_one(group, session=session).inserted_id, events)
+        return True
+
+    def get(self, booking_id):
+        return self.collection.find_one(self._scope({'_id': ObjectId(booking_id)}))
+
+    def get_group(self, group_id):
+        return self.groups.find_one(self._scope({'_id': ObjectId(group_id)}))
+
+    def group_room_ids(self, group_id):
+        return [item['room_id'] for item in self.collection.find(self._scope({'group_id': str(group_id)}), {'room_id': 1})]
+
+    def update(self, booking_id, values, events=None, status=None, conditions=None):
+        query = self._scope({'_id': ObjectId(booking_id)})
+        if status is not None:
+            query['status'] = {'$in': list(status)} if isinstance(status, (list, tuple)) else status
+        query.update(conditions or {})
+
+        def write(session):
+            result = self.collection.update_one(query, {'$set': values}, session=session)
+            return result.modified_count > 0
+        return self.outbox.write(self.collection, write, events)
+
+    def update_group(self, group_id, values, events=None):
+        def write(session):
+            result = self.groups.update_one(self._scope({'_id': ObjectId(group_id)}), {'$set': values}, session=session)
+            self.collection.update_many(self._scope({'group_id': str(group_id)}), {'$set': values}, session=session)
+            return result.modified_count > 0
+        changed = self.outbox.write(self.collection, write, events)
+        item_ids = [item['_id'] for item in self.collection.find(self._scope({'group_id': str(group_id)}), {'_id': 1})]
+        return changed, item_ids
+
+    def delete(self, booking_id, user_id=None, events=None, room_id=None):
+        query = self._scope({'_id': ObjectId(booking_id)})
+        if room_id is not None:
+            query['room_id'] = room_id
+        if user_id:
+            query['user_id'] = user_id
+        return self.outbox.write(
+            self.collection, lambda session: self.collection.find_one_and_delete(query, session=session), events
+        )
+
+    def find_sorted(self, user_id=None, include_archived=False, fields=None):
+        query = self._scope({'user_id': user_id} if user_id is not None else {})
+        projection = _projection(fields)
+        bookings = list(self.collection.find(query, projection).sort('created_at', -1))
+        if include_archived:
+            bookings.extend(self.archive.find(query, projection).sort('created_at', -1))
+            bookings.sort(key=lambda b: b.get('created_at') or datetime.min, reverse=True)
+        return bookings
+
+    def has_overlap(self, room_id, checkin_date, checkout_date):
+        overlapping = self.collection.find_one(self._scope({
+            'room_id': room_id,
+            'status': {'$in': list(ACTIVE_STATUSES)},
+            'checkin_date': {'$lt': checkout_date},
+            'checkout_date': {'$gt': checkin_date}
+        }), {'_id': 1})
+        return overlapping is not None
+
+    def find_overlapping(self, checkin_date, checkout_date, room_ids=None, fields=None, stale_ok=False):
+        query = self._scope({
+            'status': {'$in': list(ACTIVE_STATUSES)},
+            'checkin_date': {'$lt': checkout_date},
+            'checkout_date': {'$gt': checkin_date}
+        })
+        if room_ids is not None:
+            query['room_id'] = {'$in': list(room_ids)}
+
+        collection = self.catalog if stale_ok else self.collection
+        return list(collection.find(query, _projection(fields)))
+
+    def expired_holds(self, now, limit=100, fields=None):
+        return list(self.collection.find(
+            self._scope({'status': 'pending', 'payment_intent_id': None, 'hold_expires_at': {'$lt': now}}), _projection(fields)
+        ).sort('hold_expires_at', ASCENDING).limit(limit))
+
+    def archive_before(self, checkout_before, batch_size=1000):
+        """
+        Each batch is copied first and only then deleted from the hot
+        collection, and copies are upserts keyed by _id, so a run
+        interrupted between the two steps is safe to repeat.
+        """
+        moved = 0
+        while True:
+            batch = list(self.collection.find(
+                self._scope({'checkout_date': {'$lt': checkout_before}})
+            ).sort('checkout_date', 1).limit(batch_size))
+            if not batch:
+                return moved
+
+            archived_at = datetime.utcnow()
+            requests = []
+            for booking in batch:
+                booking['archived_at'] = archived_at
+                requests.append(ReplaceOne({'_id': booking['_id']}, booking, upsert=True))
+            self.archive.bulk_write(requests, ordered=False)
+
+            result = self.collection.delete_many(self._scope({'_id': {'$in': [b['_id'] for b in batch]}}))
+            moved += result.deleted_count
+
+
+class MongoUserRepository(UserRepository):
+    def __init__(self, collection):
+        self.collection = collection
+        self.catalog = for_catalog(collection)
+
+    def ensure_indexes(self):
+        """Unique email index: registration relies on it instead of a lookup first"""
+        self.collection.create_index('email', unique=True)
+
+    def insert(self, doc):
+        return self.collection.insert_one(doc).inserted_id
+
+    def find_by_email(self, email):
+        return self.collection.find_one({'email': email})
+
+    def get(self, user_id):
+        return self.collection.find_one({'_id': ObjectId(user_id)})
+
+    def get_many(self, user_ids, fields=None):
+        return self.catalog.find({'_id': {'$in': _object_ids(user_ids)}}, _projection(fields))
+
+    def page(self, limit, after=None, fields=None):
+        query = {'_id': {'$gt': ObjectId(after)}} if after else {}
+        return self.catalog.find(query, _projection(fields)).sort('_id', 1).limit(limit)
+
+    def update(self, user_id, values):
+        result = self.collection.update_one({'_id': ObjectId(user_id)}, {'$set': values})
+        return result.modified_count > 0
+
+    def increment(self, user_id, field):
+        user = self.collection.find_one_and_update(
+            {'_id': ObjectId(user_id)},
+            {'$inc': {field: 1}},
+            projection={field: 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return user[field] if user else None
+
+
+class MongoPaymentRepository(PaymentRepository):
+    def __init__(self, collection):
+        # Payments are written next to the booking they confirm, with the same guarantees
+        self.collection = for_critical(collection)
+        self.outbox = OutboxWriter(self.collection)
+
+    def insert(self, doc, events=None):
+        self._tag(doc)
+        return self.outbox.write(
+            self.collection, lambda session: self.collection.insert_one(doc, session=session).inserted_id, events
+        )
@@ -0,0 +1,181 @@
+"""
+The booking, payment and waitlist flows through the Flask test client on the
+in-memory storage engine (no MongoDB needed). Background threads are off:
+tests run the payment worker and waitlist steps themselves.
+"""
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+import pytest
+from config import Config
+from app import create_app
+from routes.auth import generate_token
+from storage.memory import MemoryDatabase
+
+
+class ApiTestConfig(Config):
+    PAYMENT_WORKERS = 0
+    PAYMENT_STUB_LATENCY_SECONDS = 0
+    PAYMENT_STUB_FAILURE_RATE = 0
+    WAITLIST_SWEEP_SECONDS = 0
+    ADMISSION_CONTROL_ENABLED = False
+
+
+def day(offset):
+    return (date.today() + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def db():
+    return MemoryDatabase()
+
+
+@pytest.fixture
+def app(db):
+    return create_app(ApiTestConfig, db=db)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_room(db, number):
+    return str(db.rooms.insert_one({
+        'hotel_id': Config.DEFAULT_HOTEL_ID, 'name': f'Standard {number}', 'type': 'standard', 'roomNumber': number,
+        'price': 3500, 'capacity': 2, 'amenities': ['WiFi'], 'status': 'available', 'created_at': datetime.utcnow()
+    }).inserted_id)
+
+
+@pytest.fixture
+def room_id(db):
+    return add_room(db, '101')
+
+
+@pytest.fixture
+def guests(db):
+    """Two guests as (user id, auth headers)"""
+    users = []
+    for i in range(2):
+        email = f'guest{i}@example.com'
+        user_id = str(db.users.insert_one({'email': email, 'password': '-', 'firstName': 'Guest',
+                                           'lastName': str(i), 'role': 'guest'}).inserted_id)
+        users.append((user_id, {'Authorization': 'Bearer ' + generate_token(user_id, 'guest', email)}))
+    return users
+
+
+def book(client, headers, room_id, checkin, checkout):
+    return client.post('/api/book', headers=headers, json={
+        'room_id': room_id, 'checkin_date': checkin, 'checkout_date': checkout, 'guests': 1})
+
+
+def test_overlapping_booking_is_rejected(client, room_id, guests):
+    assert book(client, guests[0][1], room_id, day(10), day(14)).status_code == 201
+
+    response = book(client, guests[1][1], room_id, day(11), day(13))
+    assert response.status_code == 400
+    assert response.get_json()['waitlist_available']
+
+    # Back-to-back stays share no night
+    assert book(client, guests[1][1], room_id, day(14), day(16)).status_code == 201
+
+
+def test_payment_is_queued_then_settled_by_worker(app, client, db, room_id, guests):
+    booking = book(client, guests[0][1], room_id, day(10), day(12)).get_json()['booking']
+
+    response = client.post('/api/payment', headers=guests[0][1], json={
+        'booking_id': booking['_id'], 'amount': booking['total_price']})
+    assert response.status_code == 202
+    intent = response.get_json()['payment_intent']
+    assert intent['status'] == 'queued'
+
+    # A second request for the same booking gets the same intent back
+    again = client.post('/api/payment', headers=guests[0][1], json={
+        'booking_id': booking['_id'], 'amount': booking['total_price']})
+    assert again.get_json()['payment_intent']['_id'] == intent['_id']
+
+    assert app.extensions['payments'].run_once()
+
+    status = client.get(f"/api/payment/{intent['_id']}", headers=guests[0][1]).get_json()
+    assert status['payment_intent']['status'] == 'succeeded'
+    stored = client.get('/api/bookings', headers=guests[0][1]).get_json()['bookings'][0]
+    assert stored['status'] == 'confirmed'
+    assert db.payments.find_one({'intent_id': intent['_id']})['status'] == 'completed'
+
+
+def test_payment_is_charged_the_booking_total_for_its_owner_only(client, room_id, guests):
+    booking = book(client, guests[0][1], room_id, day(10), day(12)).get_json()['booking']
+
+    def pay(headers, amount):
+        return client.post('/api/payment', headers=headers, json={'booking_id': booking['_id'], 'amount': amount})
+
+    assert pay(guests[0][1], 1).status_code == 400
+    assert pay(guests[0][1], 'lots').status_code == 400
+    assert pay(guests[1][1], booking['total_price']).status_code == 404
+
+    response = pay(guests[0][1], booking['total_price'])
+    assert response.status_code == 202
+    assert response.get_json()['payment_intent']['amount'] == booking['total_price']
+
+
+def test_hold_does_not_expire_while_its_payment_is_queued(app, client, db, room_id, guests):
+    booking = book(client, guests[0][1], room_id, day(10), day(12)).get_json()['booking']
+    db.bookings.update_one({'_id': ObjectId(booking['_id'])},
+                           {'$set': {'hold_expires_at': datetime.utcnow() + timedelta(minutes=1)}})
+
+    response = client.post('/api/payment', headers=guests[0][1], json={
+        'booking_id': booking['_id'], 'amount': booking['total_price']})
+    assert response.status_code == 202
+
+    # The hold runs out before a worker gets to the intent
+    db.bookings.update_one({'_id': ObjectId(booking['_id'])},
+                           {'$set': {'hold_expires_at': datetime.utcnow() - timedelta(minutes=1)}})
+    assert app.extensions['waitlist'].sweep() == (0, 0)
+
+    assert app.extensions['payments'].run_once()
+    intent = response.get_json()['payment_intent']
+    assert db.payment_intents.find_one({'_id': ObjectId(intent['_id'])})['status'] == 'succeeded'
+    assert db.bookings.find_one({'_id': ObjectId(booking['_id'])})['status'] == 'confirmed'
+    assert db.payments.find_one({'intent_id': intent['_id']})['status'] == 'completed'
+
+
+def test_cancellation_promotes_waitlisted_guest(client, db, room_id, guests):
+    booking = book(client, guests[0][1], room_id, day(10), day(14)).get_json()['booking']
+
+    response = client.post('/api/waitlist', headers=guests[1][1], json={
+        'room_id': room_id, 'checkin_date': day(11), 'checkout_date': day(13), 'guests': 1})
+    assert response.status_code == 201
+    entry = response.get_json()['entry']
+
+    assert client.delete(f"/api/booking/{booking['_id']}", headers=guests[0][1]).status_code == 200
+
+    entries = client.get('/api/waitlist', headers=guests[1][1]).get_json()['entries']
+    assert entries[0]['status'] == 'promoted'
+    hold = db.bookings.find_one({'waitlist_id': entry['_id']})
+    assert hold['status'] == 'pending'
+    assert hold['user_id'] == guests[1][0]
+    assert hold['hold_expires_at'] > datetime.utcnow()
+
+
+def test_unknown_property_is_rejected(client, room_id):
+    assert client.get('/api/rooms', headers={'X-Hotel-Id': 'nowhere'}).status_code == 404
+    assert client.get('/api/rooms', headers={'X-Hotel-Id': 'bad id!'}).status_code == 400
+
+    rooms = client.get('/api/rooms', headers={'X-Hotel-Id': Config.DEFAULT_HOTEL_ID}).get_json()['rooms']
+    assert [room['_id'] for room in rooms] == [room_id]
+
+
+def test_group_booking_is_all_or_nothing(client, db, room_id, guests):
+    second = add_room(db, '102')
+    assert book(client, guests[0][1], room_id, day(10), day(12)).status_code == 201
+
+    response = client.post('/api/book/group', headers=guests[1][1], json={
+        'room_ids': [room_id, second], 'checkin_date': day(11), 'checkout_date': day(13), 'guests': 2})
+    assert response.status_code == 400
+    assert response.get_json()['unavailable'] == [room_id]
+    assert db.bookings.count_documents({'user_id': guests[1][0]}) == 0
+    assert db.booking_groups.count_documents({}) == 0
+
+    for room_types in (['standard'], {'standard': 'two'}, {'standard': 0}):
+        response = client.post('/api/book/group', headers=guests[1][1], json={
+            'room_types': room_types, 'checkin_date': day(11), 'checkout_date': day(13), 'guests': 2})
+        assert response.status_code == 400
@@ -0,0 +1,80 @@
+"""
+OutboxRelay on the in-memory storage engine: the lease, parking of events
+that keep failing, and the wrap-around that picks up late commits.
+"""
+from bson import ObjectId
+import pytest
+from services.outbox import OutboxRelay, outbox_event
+from storage.memory import MemoryDatabase
+
+
+class RecordingSink:
+    """Collects delivered event ids; raises for the aggregate ids in failing"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.delivered = []
+
+    def deliver(self, events):
+        if any(event['aggregate_id'] in self.failing for event in events):
+            raise RuntimeError('sink unavailable')
+        self.delivered.extend(event['_id'] for event in events)
+
+
+@pytest.fixture
+def db():
+    return MemoryDatabase()
+
+
+def relay(db, sink, **kwargs):
+    return OutboxRelay(db.outbox, db.outbox_relay, [sink], **kwargs)
+
+
+def add_events(db, *aggregate_ids):
+    events = [outbox_event('booking.created', aggregate_id, {}) for aggregate_id in aggregate_ids]
+    db.outbox.insert_many(events)
+    return [event['_id'] for event in events]
+
+
+def test_second_relay_is_refused_the_lease(db):
+    add_events(db, 'a')
+    leader, standby = relay(db, RecordingSink()), relay(db, RecordingSink())
+
+    assert leader.acquire_lease()
+    assert not standby.acquire_lease()
+    assert standby.run_once() == 0
+    assert leader.run_once() == 1
+
+
+def test_failing_event_is_parked_after_max_attempts(db):
+    good, bad, also_good = add_events(db, 'a', 'b', 'c')
+    sink = RecordingSink(failing={'b'})
+    outbox_relay = relay(db, sink, max_attempts=2)
+
+    assert outbox_relay.run_once() == 2
+    assert sink.delivered == [good, also_good]
+    assert db.outbox.find_one({'_id': good})['status'] == 'done'
+    assert db.outbox.find_one({'_id': also_good})['status'] == 'done'
+    assert db.outbox.find_one({'_id': bad})['status'] == 'pending'
+
+    # The next pass wraps around to the failed event and gives up on it
+    outbox_relay.run_once()
+    outbox_relay.run_once()
+    parked = db.outbox.find_one({'_id': bad})
+    assert parked['status'] == 'failed'
+    assert parked['attempts'] == 2
+    assert 'sink unavailable' in parked['last_error']
+
+
+def test_event_committed_behind_resume_token_is_delivered_on_wrap_around(db):
+    sink = RecordingSink()
+    outbox_relay = relay(db, sink)
+    # An _id allocated before the delivered event, committed after it was handled
+    late = outbox_event('booking.created', 'late', {})
+    late['_id'] = ObjectId.from_datetime(late['created_at'].replace(year=2000))
+    add_events(db, 'a')
+
+    assert outbox_relay.run_once() == 1
+    db.outbox.insert_one(late)
+    assert outbox_relay.run_once() == 1
+    assert sink.delivered[-1] == late['_id']
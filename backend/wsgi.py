@@ -0,0 +1,9 @@
+"""
+Production WSGI entry point
+Run from the backend directory: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+# Imported separately by every gunicorn worker (preload_app is off), so each
+# worker process creates its own MongoDB client after the fork
+app = create_app()
@@ -4,9 +4,13 @@ let currentUser = null;
 let rooms = [];
 let currentBooking = null;
 let currentFilter = 'all';
+let adminBookings = [];
+let liveEvents = null;
 
 // API Configuration
 const API_BASE_URL = 'http://localhost:5000/api';
+// Property this page works with (?hotel=<id>); without it the API uses its default property
+const HOTEL_ID = new URLSearchParams(window.location.search).get('hotel');
 
 // Initialize Application
 document.addEventListener('DOMContentLoaded', function() {
@@ -16,9 +20,10 @@ document.addEventListener('DOMContentLoaded', function() {
 function initializeApp() {
     setupEventListeners();
     initializeDatePickers();
-    checkExistingLogin();
+    const loggedIn = checkExistingLogin();
     checkBackendConnection().then(isConnected => {
-        if (isConnected) {
+        // Logged-in dashboards get their rooms from /bootstrap
+        if (isConnected && !loggedIn) {
             loadRoomsFromAPI();
         }
     });
@@ -78,7 +83,7 @@ function setupEventListeners() {
 }
 
 // API Helper Function
-async function apiRequest(endpoint, method = 'GET', data = null, requiresAuth = false) {
+async function apiRequest(endpoint, method = 'GET', data = null, requiresAuth = false, retried = false) {
     const options = {
         method: method,
         headers: {
@@ -94,9 +99,18 @@ async function apiRequest(endpoint, method = 'GET', data = null, requiresAuth =
         options.headers['Authorization'] = `Bearer ${currentUser.token}`;
     }
 
+    if (HOTEL_ID) {
+        options.headers['X-Hotel-Id'] = HOTEL_ID;
+    }
+
     try {
         const response = await fetch(`${API_BASE_URL}${endpoint}`, options);
         
+        // Access tokens are short-lived: renew once and retry
+        if (response.status === 401 && requiresAuth && !retried && await refreshAccessToken()) {
+            return apiRequest(endpoint, method, data, requiresAuth, true);
+        }
+        
         // Check if response is ok before trying to parse JSON
         if (!response.ok) {
             let errorMessage = 'API request failed';
@@ -207,27 +221,36 @@ function initializeDatePickers() {
     }
 }
 
+// Normalize a room from the API for local state
+function normalizeRoom(room) {
+    return {
+        id: room._id,
+        _id: room._id,
+        name: room.name,
+        type: room.type,
+        price: room.price,
+        image: room.image,
+        description: room.description,
+        capacity: room.capacity,
+        amenities: room.amenities || [],
+        status: room.status,
+        roomNumber: room.roomNumber,
+        needs_cleaning: room.needs_cleaning || false
+    };
+}
+
+// Replace the room list and refresh the landing page grid
+function setRooms(roomList) {
+    rooms = (roomList || []).map(normalizeRoom);
+    renderRooms();
+    updateAvailableRoomsCount();
+}
+
 // Load Rooms from API
 async function loadRoomsFromAPI() {
     try {
         const response = await apiRequest('/rooms');
-        rooms = response.rooms.map(room => ({
-            id: room._id,
-            _id: room._id,
-            name: room.name,
-            type: room.type,
-            price: room.price,
-            image: room.image,
-            description: room.description,
-            capacity: room.capacity,
-            amenities: room.amenities || [],
-            status: room.status,
-            roomNumber: room.roomNumber,
-            needs_cleaning: room.needs_cleaning || false
-        }));
-
-        renderRooms();
-        updateAvailableRoomsCount();
+        setRooms(response.rooms);
         
         // Update interfaces if they're active
         if (document.getElementById('adminInterface')?.classList.contains('active')) {
@@ -313,31 +336,67 @@ async function handleLogin(e) {
         currentUser = {
             ...response.user,
             token: response.token,
+            refresh_token: response.refresh_token,
             name: `${response.user.firstName} ${response.user.lastName}`
         };
 
         localStorage.setItem('currentUser', JSON.stringify(currentUser));
         closeLoginModal();
         
-        // Save login details
+        // Save login details and load the dashboard in one round trip
+        let bootstrap = null;
         try {
-            await apiRequest('/user/login-log', 'POST', {
-                login_time: new Date().toISOString(),
-                email: email,
-                role: role
+            const batch = await apiRequest('/batch', 'POST', {
+                requests: [
+                    {
+                        id: 'login_log',
+                        method: 'POST',
+                        path: '/user/login-log',
+                        body: { login_time: new Date().toISOString(), email: email, role: role }
+                    },
+                    { id: 'bootstrap', method: 'GET', path: '/bootstrap' }
+                ]
             }, true);
+            const [loginLog, dashboard] = batch.responses;
+            if (loginLog.status !== 200) {
+                console.error('Failed to save login log:', loginLog.body?.error);
+            }
+            if (dashboard.status === 200) {
+                bootstrap = dashboard.body;
+            }
         } catch (error) {
-            console.error('Failed to save login log:', error);
+            console.error('Batch request failed:', error);
         }
         
-        redirectToInterface(role);
+        redirectToInterface(role, bootstrap);
         showNotification(`Welcome back, ${currentUser.name}!`, 'success');
-        await loadRoomsFromAPI();
     } catch (error) {
         showNotification(error.message || 'Login failed', 'error');
     }
 }
 
+// Swap the stored refresh token for a new token pair; false if the session is over
+async function refreshAccessToken() {
+    if (!currentUser?.refresh_token) return false;
+
+    try {
+        const response = await fetch(`${API_BASE_URL}/token/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: currentUser.refresh_token })
+        });
+        if (!response.ok) return false;
+
+        const result = await response.json();
+        currentUser.token = result.token;
+        currentUser.refresh_token = result.refresh_token;
+        localStorage.setItem('currentUser', JSON.stringify(currentUser));
+        return true;
+    } catch (error) {
+        return false;
+    }
+}
+
 // Handle Register
 async function handleRegister(e) {
     e.preventDefault();
@@ -366,6 +425,7 @@ async function handleRegister(e) {
         currentUser = {
             ...response.user,
             token: response.token,
+            refresh_token: response.refresh_token,
             name: `${response.user.firstName} ${response.user.lastName}`
         };
 
@@ -476,14 +536,21 @@ async function handlePayment(e) {
     }
 
     try {
-        const response = await apiRequest('/payment', 'POST', {
+        const accepted = await apiRequest('/payment', 'POST', {
             booking_id: currentBooking._id,
             amount: currentBooking.total_price,
             payment_method: 'card'
         }, true);
 
+        // The charge runs in the background: wait for the payment to settle
+        showNotification('Processing payment...', 'info');
+        const intent = await waitForPayment(accepted.payment_intent);
+        if (intent.status !== 'succeeded') {
+            throw new Error(intent.error || 'Payment failed');
+        }
+
         closePaymentModal();
-        showNotification(response.message || 'Room booked successfully!', 'success');
+        showNotification('Room booked successfully!', 'success');
         currentBooking = null;
 
         // Refresh rooms and bookings
@@ -506,30 +573,78 @@ async function handlePayment(e) {
     }
 }
 
+// Follow a payment intent until it succeeds or fails: stream its status
+// where EventSource is available, otherwise poll the status endpoint
+function waitForPayment(intent, timeoutMs = 120000) {
+    const settled = i => i.status === 'succeeded' || i.status === 'failed';
+    if (settled(intent)) return Promise.resolve(intent);
+
+    return new Promise((resolve, reject) => {
+        const deadline = Date.now() + timeoutMs;
+        let stream = null;
+
+        const poll = async () => {
+            try {
+                const response = await apiRequest(`/payment/${intent._id}`, 'GET', null, true);
+                if (settled(response.payment_intent)) return resolve(response.payment_intent);
+                if (Date.now() > deadline) return reject(new Error('Payment is still processing; check your bookings shortly'));
+                setTimeout(poll, 1000);
+            } catch (error) {
+                reject(error);
+            }
+        };
+
+        if (!window.EventSource || !currentUser?.token) return poll();
+
+        stream = new EventSource(`${API_BASE_URL}/payment/${intent._id}/events?token=${encodeURIComponent(currentUser.token)}`);
+        stream.addEventListener('payment', e => {
+            const update = JSON.parse(e.data);
+            if (settled(update)) {
+                stream.close();
+                resolve(update);
+            }
+        });
+        // Stream dropped (expired token, proxy timeout): fall back to polling
+        stream.onerror = () => {
+            stream.close();
+            poll();
+        };
+    });
+}
+
 // Redirect to Interface
-function redirectToInterface(role) {
+async function redirectToInterface(role, bootstrap = null) {
     document.querySelectorAll('.page').forEach(page => page.classList.remove('active'));
 
-    if (role === 'guest') {
-        document.getElementById('userInterface').classList.add('active');
-        loadUserInterface();
-    } else if (role === 'admin') {
-        document.getElementById('adminInterface').classList.add('active');
-        loadAdminInterface();
-    } else if (role === 'staff') {
-        document.getElementById('staffInterface').classList.add('active');
-        loadStaffInterface();
+    const pages = { guest: 'userInterface', admin: 'adminInterface', staff: 'staffInterface' };
+    if (!pages[role]) return;
+    document.getElementById(pages[role]).classList.add('active');
+
+    // One /bootstrap call returns the rooms and everything else this role's view needs
+    try {
+        const data = bootstrap || await apiRequest('/bootstrap', 'GET', null, true);
+        setRooms(data.rooms);
+        if (role === 'guest') {
+            loadUserInterface(data);
+        } else if (role === 'admin') {
+            loadAdminInterface(data);
+        } else {
+            loadStaffInterface(data);
+        }
+    } catch (error) {
+        console.error('Failed to load dashboard:', error);
+        showNotification('Failed to load dashboard', 'error');
     }
 }
 
 // Load User Interface
-async function loadUserInterface() {
+function loadUserInterface(data) {
     const userNameEl = document.getElementById('userName');
     if (userNameEl && currentUser) {
         userNameEl.textContent = currentUser.name || currentUser.firstName || 'Guest';
     }
-    await loadUserBookings();
-    await loadUserRooms();
+    renderUserBookings(data.bookings || []);
+    loadUserRooms();
 }
 
 // Load User Bookings
@@ -539,39 +654,45 @@ async function loadUserBookings() {
 
     try {
         const response = await apiRequest('/bookings', 'GET', null, true);
-        const bookings = response.bookings || [];
-
-        if (bookings.length === 0) {
-            bookingsList.innerHTML = '<div class="empty-state">No bookings found</div>';
-            return;
-        }
-
-        bookingsList.innerHTML = bookings.map(booking => `
-            <div class="booking-card">
-                <div class="booking-header">
-                    <h4>${booking.room_name || 'Room'}</h4>
-                    <span class="status-badge ${booking.status}">${booking.status}</span>
-                </div>
-                <div class="booking-details">
-                    <p><i class="fas fa-calendar-check"></i> Check-in: ${booking.checkin_date}</p>
-                    <p><i class="fas fa-calendar-times"></i> Check-out: ${booking.checkout_date}</p>
-                    <p><i class="fas fa-user-friends"></i> Guests: ${booking.guests}</p>
-                    <p><i class="fas fa-rupee-sign"></i> Total: ₹${booking.total_price}</p>
-                </div>
-                ${booking.status === 'pending' ? `
-                <div class="booking-actions">
-                    <button class="btn-danger btn-sm" onclick="deleteBooking('${booking._id}')">
-                        <i class="fas fa-trash"></i> Delete
-                    </button>
-                </div>
-                ` : ''}
-            </div>
-        `).join('');
+        renderUserBookings(response.bookings || []);
     } catch (error) {
         bookingsList.innerHTML = '<div class="error-state">Failed to load bookings</div>';
     }
 }
 
+// Render User Bookings
+function renderUserBookings(bookings) {
+    const bookingsList = document.getElementById('userBookingsList');
+    if (!bookingsList) return;
+
+    if (bookings.length === 0) {
+        bookingsList.innerHTML = '<div class="empty-state">No bookings found</div>';
+        return;
+    }
+
+    bookingsList.innerHTML = bookings.map(booking => `
+        <div class="booking-card">
+            <div class="booking-header">
+                <h4>${booking.room_name || 'Room'}</h4>
+                <span class="status-badge ${booking.status}">${booking.status}</span>
+            </div>
+            <div class="booking-details">
+                <p><i class="fas fa-calendar-check"></i> Check-in: ${booking.checkin_date}</p>
+                <p><i class="fas fa-calendar-times"></i> Check-out: ${booking.checkout_date}</p>
+                <p><i class="fas fa-user-friends"></i> Guests: ${booking.guests}</p>
+                <p><i class="fas fa-rupee-sign"></i> Total: ₹${booking.total_price}</p>
+            </div>
+            ${booking.status === 'pending' ? `
+            <div class="booking-actions">
+                <button class="btn-danger btn-sm" onclick="deleteBooking('${booking._id}')">
+                    <i class="fas fa-trash"></i> Delete
+                </button>
+            </div>
+            ` : ''}
+        </div>
+    `).join('');
+}
+
 // Update Available Rooms Count
 function updateAvailableRoomsCount() {
     const countElement = document.getElementById('availableRoomsCount');
@@ -660,10 +781,12 @@ async function loadUserRooms() {
 }
 
 // Load Admin Interface
-async function loadAdminInterface() {
+function loadAdminInterface(data) {
     loadAdminStats();
     updateAdminRooms();
-    await loadAdminBookings();
+    adminBookings = data.bookings || [];
+    renderAdminBookings();
+    subscribeToLiveUpdates();
 }
 
 // Load Admin Stats
@@ -935,34 +1058,41 @@ async function loadAdminBookings() {
 
     try {
         const response = await apiRequest('/bookings/all', 'GET', null, true);
-        const bookings = response.bookings || [];
-
-        if (bookings.length === 0) {
-            bookingsTable.innerHTML = '<tr><td colspan="6" class="empty-state">No bookings</td></tr>';
-            return;
-        }
-
-        bookingsTable.innerHTML = bookings.map(booking => {
-            const userDetails = booking.user_details || {};
-            const userName = userDetails.firstName && userDetails.lastName 
-                ? `${userDetails.firstName} ${userDetails.lastName}` 
-                : userDetails.email || (booking.user_id || '').substring(0, 8) + '...';
-            return `
-            <tr>
-                <td>${(booking._id || '').substring(0, 8)}...</td>
-                <td>${booking.room_name || booking.room_details?.name || 'N/A'} (${booking.room_number || booking.room_details?.roomNumber || ''})</td>
-                <td>${userName}</td>
-                <td>${booking.checkin_date || ''}</td>
-                <td>${booking.checkout_date || ''}</td>
-                <td><span class="status-badge ${booking.status || 'pending'}">${booking.status || 'pending'}</span></td>
-            </tr>
-        `;
-        }).join('');
+        adminBookings = response.bookings || [];
+        renderAdminBookings();
     } catch (error) {
         bookingsTable.innerHTML = '<tr><td colspan="6" class="error-state">Failed to load</td></tr>';
     }
 }
 
+// Render Admin Bookings
+function renderAdminBookings() {
+    const bookingsTable = document.getElementById('adminBookingsTable');
+    if (!bookingsTable) return;
+
+    if (adminBookings.length === 0) {
+        bookingsTable.innerHTML = '<tr><td colspan="6" class="empty-state">No bookings</td></tr>';
+        return;
+    }
+
+    bookingsTable.innerHTML = adminBookings.map(booking => {
+        const userDetails = booking.user_details || {};
+        const userName = userDetails.firstName && userDetails.lastName 
+            ? `${userDetails.firstName} ${userDetails.lastName}` 
+            : userDetails.email || (booking.user_id || '').substring(0, 8) + '...';
+        return `
+        <tr>
+            <td>${(booking._id || '').substring(0, 8)}...</td>
+            <td>${booking.room_name || booking.room_details?.name || 'N/A'} (${booking.room_number || booking.room_details?.roomNumber || ''})</td>
+            <td>${userName}</td>
+            <td>${booking.checkin_date || ''}</td>
+            <td>${booking.checkout_date || ''}</td>
+            <td><span class="status-badge ${booking.status || 'pending'}">${booking.status || 'pending'}</span></td>
+        </tr>
+    `;
+    }).join('');
+}
+
 // Delete Booking
 async function deleteBooking(bookingId) {
     if (!confirm('Are you sure you want to delete this booking?')) {
@@ -982,8 +1112,9 @@ async function deleteBooking(bookingId) {
 }
 
 // Load Staff Interface
-async function loadStaffInterface() {
-    await loadStaffTasks();
+function loadStaffInterface(data) {
+    renderStaffTasks(data.cleaning || []);
+    subscribeToLiveUpdates();
 }
 
 // Load Staff Tasks
@@ -994,36 +1125,42 @@ async function loadStaffTasks() {
     try {
         // Get only rooms that need cleaning from API
         const response = await apiRequest('/rooms/cleaning', 'GET', null, true);
-        const cleaningRooms = response.rooms || [];
-        
-        document.getElementById('cleaningTasks').textContent = cleaningRooms.length;
-        document.getElementById('occupiedRooms').textContent = cleaningRooms.length;
-
-        if (cleaningRooms.length === 0) {
-            tasksList.innerHTML = '<div class="empty-state">No cleaning tasks</div>';
-            return;
-        }
-
-        tasksList.innerHTML = cleaningRooms.map(room => `
-            <div class="task-card">
-                <div class="task-info">
-                    <h4><i class="fas fa-door-open"></i> Room ${room.roomNumber || 'N/A'}</h4>
-                    <p>${room.name || 'Room'}</p>
-                    <span><i class="fas fa-user-friends"></i> ${room.capacity || 0} guests</span>
-                    <span class="status-badge ${room.status || 'maintenance'}">${room.status || 'maintenance'}</span>
-                    ${room.needs_cleaning ? '<span class="status-badge cleaning">Needs Cleaning</span>' : ''}
-                </div>
-                <button class="btn-complete" onclick="markTaskComplete('${room._id}')">
-                    <i class="fas fa-check"></i> Mark Clean
-                </button>
-            </div>
-        `).join('');
+        renderStaffTasks(response.rooms || []);
     } catch (error) {
         console.error('Failed to load cleaning tasks:', error);
         tasksList.innerHTML = `<div class="error-state">Failed to load tasks: ${error.message || 'Unknown error'}</div>`;
     }
 }
 
+// Render Staff Tasks
+function renderStaffTasks(cleaningRooms) {
+    const tasksList = document.getElementById('staffTasksList');
+    if (!tasksList) return;
+
+    document.getElementById('cleaningTasks').textContent = cleaningRooms.length;
+    document.getElementById('occupiedRooms').textContent = cleaningRooms.length;
+
+    if (cleaningRooms.length === 0) {
+        tasksList.innerHTML = '<div class="empty-state">No cleaning tasks</div>';
+        return;
+    }
+
+    tasksList.innerHTML = cleaningRooms.map(room => `
+        <div class="task-card">
+            <div class="task-info">
+                <h4><i class="fas fa-door-open"></i> Room ${room.roomNumber || 'N/A'}</h4>
+                <p>${room.name || 'Room'}</p>
+                <span><i class="fas fa-user-friends"></i> ${room.capacity || 0} guests</span>
+                <span class="status-badge ${room.status || 'maintenance'}">${room.status || 'maintenance'}</span>
+                ${room.needs_cleaning ? '<span class="status-badge cleaning">Needs Cleaning</span>' : ''}
+            </div>
+            <button class="btn-complete" onclick="markTaskComplete('${room._id}')">
+                <i class="fas fa-check"></i> Mark Clean
+            </button>
+        </div>
+    `).join('');
+}
+
 // Mark Task Complete
 async function markTaskComplete(roomId) {
     try {
@@ -1066,6 +1203,70 @@ async function loadStaffBookedRooms() {
     }
 }
 
+// Live Updates (Server-Sent Events)
+// Admin and staff dashboards load once, then apply room and booking deltas
+function subscribeToLiveUpdates() {
+    if (liveEvents || !currentUser?.token || !window.EventSource) return;
+
+    // EventSource cannot send headers: name the property in the query string
+    const hotelParam = HOTEL_ID ? `&hotel_id=${encodeURIComponent(HOTEL_ID)}` : '';
+    liveEvents = new EventSource(`${API_BASE_URL}/events?token=${encodeURIComponent(currentUser.token)}${hotelParam}`);
+    liveEvents.addEventListener('room', e => applyRoomDelta(JSON.parse(e.data)));
+    liveEvents.addEventListener('booking', e => applyBookingDelta(JSON.parse(e.data)));
+    // Sent when we were disconnected too long to replay the missed deltas
+    liveEvents.addEventListener('reset', () => {
+        loadRoomsFromAPI();
+        if (currentUser?.role === 'admin') loadAdminBookings();
+    });
+    // The browser gives up when the token in the URL expires: renew it and reconnect
+    liveEvents.onerror = async () => {
+        if (liveEvents?.readyState !== EventSource.CLOSED) return;
+        closeLiveUpdates();
+        if (await refreshAccessToken()) subscribeToLiveUpdates();
+    };
+}
+
+function closeLiveUpdates() {
+    if (liveEvents) {
+        liveEvents.close();
+        liveEvents = null;
+    }
+}
+
+function applyRoomDelta(delta) {
+    const room = rooms.find(r => r._id === delta._id);
+    if (delta.op === 'delete') {
+        rooms = rooms.filter(r => r._id !== delta._id);
+    } else if (room) {
+        Object.assign(room, delta.fields);
+    } else if (delta.op === 'insert') {
+        rooms.push({ id: delta._id, _id: delta._id, amenities: [], ...delta.fields });
+    }
+
+    if (document.getElementById('adminInterface')?.classList.contains('active')) {
+        updateAdminRooms();
+        loadAdminStats();
+    }
+    if (document.getElementById('staffInterface')?.classList.contains('active')) {
+        renderStaffTasks(rooms.filter(r => r.needs_cleaning || r.status === 'maintenance'));
+    }
+}
+
+function applyBookingDelta(delta) {
+    const booking = adminBookings.find(b => b._id === delta._id);
+    if (delta.op === 'delete') {
+        adminBookings = adminBookings.filter(b => b._id !== delta._id);
+    } else if (booking) {
+        Object.assign(booking, delta.fields);
+    } else if (delta.op === 'insert') {
+        adminBookings.unshift({ _id: delta._id, ...delta.fields });
+    }
+
+    if (document.getElementById('adminInterface')?.classList.contains('active')) {
+        renderAdminBookings();
+    }
+}
+
 // Show Main Page
 function showMainPage() {
     document.querySelectorAll('.page').forEach(page => page.classList.remove('active'));
@@ -1075,6 +1276,11 @@ function showMainPage() {
 
 // Logout
 function logout() {
+    closeLiveUpdates();
+    if (currentUser?.token) {
+        // End the session server-side too; the local logout does not wait for it
+        apiRequest('/logout', 'POST', null, true, true).catch(() => {});
+    }
     currentUser = null;
     currentBooking = null;
     localStorage.removeItem('currentUser');
@@ -1082,7 +1288,7 @@ function logout() {
     showNotification('Logged out successfully', 'info');
 }
 
-// Check Existing Login
+// Check Existing Login (true if a saved session was restored)
 function checkExistingLogin() {
     const savedUser = localStorage.getItem('currentUser');
     if (savedUser) {
@@ -1090,11 +1296,13 @@ function checkExistingLogin() {
             currentUser = JSON.parse(savedUser);
             if (currentUser && currentUser.token) {
                 redirectToInterface(currentUser.role);
+                return true;
             }
         } catch (e) {
             localStorage.removeItem('currentUser');
         }
     }
+    return false;
 }
 
 // Modal Functions